@@ -0,0 +1,356 @@
+"""
+Performance benchmarks of the calculation pipeline.
+
+Generates a reproducible synthetic set of systems and times every stage of the
+pipeline: the prototype, the scoring of the combinations by every engine, the
+re-scoring of a prototype change and of a system edit, the sorting of the results, the results files
+and the offscreen results table:
+
+    python benchmark.py --systems 4 --features 12 --alternatives 20 -o bench.json
+    python benchmark.py --compare bench.json
+
+Every stage reports its best and median time over the repeats, its throughput and
+the peak memory allocated during one more, separately traced, run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+import numpy as np
+
+from momo.model import MoMoModel
+from momo.prototype import Prototype
+from momo.system_models.system_models import MultiSystemModel, SystemModel
+
+from src.dtypes import EngineType, ResultsMap, SimilarityMenshureType
+from src.engines import IncrementalScorer, create_engine
+
+
+@dataclass
+class BenchmarkResult:
+    """Timings of one stage of the pipeline"""
+    name: str
+    repeats: int
+    seconds_min: float
+    seconds_median: float
+    items: int
+    unit: str
+    items_per_second: float | None
+    peak_memory_mb: float | None
+
+
+def generate_systems(systems: int, features: int, alternatives: int, density: float, seed: int = 0) -> list[SystemModel]:
+    """
+    Generate random systems of the given shape.
+
+    Every feature of every alternative is set with the `density` probability.
+    The same seed always gives the same systems.
+    """
+    rng = np.random.default_rng(seed)
+
+    return [
+        SystemModel(
+            f"System {i + 1}",
+            (rng.random((features, alternatives)) < density).astype(int).tolist(),
+            [f"Feature {i + 1}.{j + 1}" for j in range(features)],
+            [f"Alternative {i + 1}.{k + 1}" for k in range(alternatives)],
+        )
+        for i in range(systems)
+    ]
+
+
+def generate_prototype(systems: list[SystemModel], density: float, seed: int = 0) -> Prototype:
+    """Generate a random prototype of the systems, every feature wanted with the `density` probability"""
+    prototype = MultiSystemModel(systems).get_prototype()
+    prototype[:] = (np.random.default_rng(seed + 1).random(len(prototype)) < density).astype(int)
+    return prototype
+
+
+def measure(name: str,
+            run: Callable[[], None],
+            setup: Callable[[], None] | None = None,
+            items: int = 0,
+            unit: str = "combinations",
+            repeats: int = 3,
+            trace_memory: bool = True) -> BenchmarkResult:
+    """
+    Time a stage of the pipeline.
+
+    `setup` is called before every run and is not timed. Memory is traced in a
+    separate run, since tracing slows down the allocations.
+    """
+    timings = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    peak_memory_mb = None
+    if trace_memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            run()
+            peak_memory_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+
+    best = min(timings)
+    return BenchmarkResult(
+        name=name,
+        repeats=repeats,
+        seconds_min=best,
+        seconds_median=statistics.median(timings),
+        items=items,
+        unit=unit,
+        items_per_second=items / best if items and best else None,
+        peak_memory_mb=peak_memory_mb,
+    )
+
+
+def run_suite(args: argparse.Namespace) -> list[BenchmarkResult]:
+    """Run every stage of the pipeline on the synthetic systems"""
+    systems = generate_systems(args.systems, args.features, args.alternatives, args.density, args.seed)
+    prototype = generate_prototype(systems, args.prototype_density, args.seed)
+    combinations_count = args.alternatives ** args.systems
+    measure_type = SimilarityMenshureType(args.measure)
+
+    options = dict(repeats=args.repeats, trace_memory=not args.no_memory)
+    results = []
+
+    def report(result: BenchmarkResult):
+        results.append(result)
+        print(format_result(result), flush=True)
+
+    report(measure("prototype", lambda: MoMoModel(systems).get_prototype(), items=len(prototype), unit="features", **options))
+
+    scored = {}
+    for engine_type in args.engines:
+        engine = create_engine(engine_type)
+        top_k = args.top_k if engine_type == EngineType.BranchAndBound.value else None
+
+        def score(engine=engine, top_k=top_k, engine_type=engine_type):
+            scored[engine_type] = engine.score(systems, prototype, measure_type, top_k)
+
+        name = f"scoring[{engine_type}]" + (f" top {top_k}" if top_k else "")
+        report(measure(name, score, items=combinations_count, **options))
+
+    # The other stages use the full results of the first engine which keeps them all
+    full_engine = next((engine for engine in args.engines if engine != EngineType.BranchAndBound.value), None)
+    if full_engine is None:
+        return results
+
+    combinations, similarity, evaluated_combinations = scored[full_engine]
+
+    # Flipping one feature of the prototype, from the partial sums of the full scoring
+    scorer = IncrementalScorer()
+    flipped = prototype.copy()
+    flipped.iloc[0] = 1 - flipped.iloc[0]
+    flipped = Prototype(flipped.to_numpy(), index=flipped.index)
+
+    def reset_scorer():
+        scorer.reset(systems, prototype, measure_type, combinations, similarity)
+
+    report(measure("rescore_prototype", lambda: scorer.score(systems, flipped, measure_type),
+                   setup=reset_scorer, items=combinations_count, **options))
+
+    # Flipping one feature of one alternative of the last system
+    edited = systems[:-1] + [SystemModel(systems[-1].name, systems[-1].data.copy())]
+    edited[-1].data.iloc[0, 0] = 1 - edited[-1].data.iloc[0, 0]
+
+    report(measure("rescore_system_edit", lambda: scorer.score(edited, prototype, measure_type),
+                   setup=reset_scorer, items=combinations_count // args.alternatives, **options))
+
+    def make_results_map(rows: slice = slice(None)) -> ResultsMap:
+        return ResultsMap(
+            systems=MultiSystemModel(systems),
+            combinations=combinations[rows],
+            similarity=similarity[rows],
+            prototype=prototype,
+            similarity_measure_type=measure_type,
+            evaluated_combinations=evaluated_combinations
+        )
+
+    state = {}
+
+    def new_results_map():
+        state["results_map"] = make_results_map()
+
+    report(measure("results_sort", lambda: state["results_map"].results, setup=new_results_map,
+                   items=len(similarity), **options))
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Excel sheets hold at most a million rows, and openpyxl is slow, so only the best rows are saved
+        excel_path = os.path.join(directory, "results.xlsx")
+        excel_rows = min(args.excel_rows, len(similarity))
+        excel_results = make_results_map(np.argsort(-similarity, kind="stable")[:excel_rows])
+
+        report(measure("to_excel", lambda: excel_results.to_excel(excel_path), items=excel_rows, **options))
+        report(measure("from_excel", lambda: ResultsMap.from_excel(excel_path), items=excel_rows, **options))
+
+        momo_path = os.path.join(directory, "results.momo")
+        new_results_map()
+        report(measure("to_momo", lambda: state["results_map"].to_momo(momo_path), items=len(similarity), **options))
+        report(measure("from_momo", lambda: ResultsMap.from_momo(momo_path).results, items=len(similarity), **options))
+
+    if not args.no_gui:
+        results_tab = results_tab_benchmark(make_results_map, len(similarity), options)
+        if results_tab is not None:
+            report(results_tab)
+
+    return results
+
+
+def results_tab_benchmark(make_results_map: Callable[[], ResultsMap], rows: int, options: dict) -> BenchmarkResult | None:
+    """Time the creation of a results tab, with an offscreen Qt platform"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    try:
+        from PyQt5.QtWidgets import QApplication
+        from gui.widgets.tabs.result_tab import ResultsTab
+    except ImportError as e:
+        print(f"Skipping results_tab: {e}", file=sys.stderr)
+        return None
+
+    app = QApplication.instance() or QApplication([])
+    state = {}
+
+    def setup():
+        state["results_map"] = make_results_map()
+
+    def run():
+        tab = ResultsTab(state["results_map"])
+        tab.show()
+        app.processEvents()
+        tab.close()
+        tab.deleteLater()
+
+    return measure("results_tab", run, setup=setup, items=rows, unit="rows", **options)
+
+
+def format_result(result: BenchmarkResult) -> str:
+    throughput = f"{result.items_per_second:>14,.0f} {result.unit}/s" if result.items_per_second else ""
+    memory = f"{result.peak_memory_mb:9.1f} MB" if result.peak_memory_mb is not None else ""
+    return (f"{result.name:<36} {result.seconds_min:9.4f} s (median {result.seconds_median:9.4f} s)"
+            f" {memory:>12} {throughput}")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Options which change the measured work, runs are only comparable if they are equal
+WORKLOAD_OPTIONS = ("systems", "features", "alternatives", "density", "prototype_density", "seed",
+                    "measure", "top_k", "excel_rows")
+
+
+def compare(results: list[BenchmarkResult], config: dict, baseline_path: str, tolerance: float) -> list[str]:
+    """
+    Compare the best times with a previous run.
+
+    Returns:
+    --------
+    list[str]
+        The stages slower than the baseline by more than the tolerance.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline_run = json.load(file)
+
+    baseline = {result["name"]: result for result in baseline_run["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline_path} (commit {baseline_run.get('commit')}):")
+
+    different = [option for option in WORKLOAD_OPTIONS if baseline_run["config"].get(option) != config.get(option)]
+    if different:
+        print(f"Warning: the runs have different {', '.join(different)}, the times are not comparable", file=sys.stderr)
+
+    for result in results:
+        if result.name not in baseline:
+            continue
+
+        ratio = result.seconds_min / baseline[result.name]["seconds_min"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(result.name)
+            flag = "  REGRESSION"
+        print(f"{result.name:<36} {ratio:6.2f}x{flag}")
+
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the MoMo calculation pipeline on synthetic systems.")
+    parser.add_argument("--systems", type=int, default=4, help="Number of systems.")
+    parser.add_argument("--features", type=int, default=12, help="Number of features of every system.")
+    parser.add_argument("--alternatives", type=int, default=20, help="Number of alternatives of every system.")
+    parser.add_argument("--density", type=float, default=0.5, help="Probability of a feature of an alternative.")
+    parser.add_argument("--prototype-density", type=float, default=0.5, help="Probability of a wanted feature.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic systems.")
+    parser.add_argument("-m", "--measure", default=SimilarityMenshureType.Sorensen_Dice.value,
+                        choices=[measure.value for measure in SimilarityMenshureType],
+                        help="Similarity measure.")
+    parser.add_argument("-e", "--engines", nargs="+",
+                        default=[EngineType.NumPy.value, EngineType.BranchAndBound.value],
+                        choices=[engine.value for engine in EngineType],
+                        help="Scoring engines to time, the momo engine is very slow on large inputs.")
+    parser.add_argument("-k", "--top-k", type=int, default=1000, help="Number of combinations kept by the branch and bound engine.")
+    parser.add_argument("--excel-rows", type=int, default=20000, help="Number of rows saved to and loaded from Excel.")
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="Number of timed runs of every stage.")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace the peak memory.")
+    parser.add_argument("--no-gui", action="store_true", help="Do not time the results tab.")
+    parser.add_argument("-o", "--output", help="Save the results to this JSON file.")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Relative slowdown reported as a regression, 0.1 by default.")
+
+    args = parser.parse_args(argv)
+
+    if min(args.systems, args.features, args.alternatives, args.repeats) <= 0:
+        parser.error("--systems, --features, --alternatives and --repeats must be positive")
+
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+
+    print(f"{args.systems} systems x {args.features} features x {args.alternatives} alternatives, "
+          f"{args.alternatives ** args.systems:,} combinations\n")
+    results = run_suite(args)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({
+                "commit": git_commit(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+                "results": [asdict(result) for result in results],
+            }, file, indent=4)
+
+    if args.compare and compare(results, vars(args), args.compare, args.tolerance):
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Headless batch runner.
+
+Scores the combinations of the systems of one or more workbooks against a
+prototype and writes the results, without the graphical interface:
+
+    python cli.py systems.xlsx --prototype prototype.xlsx --measure jaccard --top-k 1000 -o results.parquet
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from momo.prototype import Prototype
+from momo.system_models.system_models import MultiSystemModel, SystemModel
+
+from src.dtypes import EngineType, ResultsMap, SimilarityMenshureType
+from src.engines import ParallelCalculation
+from src.excel_workbook import ExcelWorkbook
+from src.file_validator import ExcelFileValidator, load_systems_data
+from src.logging_config import configure_logging
+
+
+OUTPUT_FORMATS = {
+    "xlsx": ResultsMap.to_excel,
+    "momo": ResultsMap.to_momo,
+    "csv": ResultsMap.to_csv,
+    "parquet": ResultsMap.to_parquet,
+}
+
+
+def load_prototype(file_path: str, systems: list[SystemModel]) -> Prototype:
+    """
+    Build the prototype of the systems with the states read from a file.
+
+    The file is either a results file, whose prototype is used, or a workbook whose
+    "Prototype" sheet (or first sheet) holds the system, feature and state columns.
+    Features missing from the file are left off.
+    """
+    prototype = MultiSystemModel(systems).get_prototype()
+
+    if ExcelFileValidator().is_results_file(file_path):
+        states = ResultsMap.from_file(file_path).prototype
+    else:
+        with ExcelWorkbook(file_path) as workbook:
+            sheet_name = "Prototype" if "Prototype" in workbook.sheet_names else workbook.sheet_names[0]
+            states = workbook.parse(sheet_name, index_col=(0, 1)).iloc[:, 0]
+
+    overlapping_idx = prototype.index.intersection(states.index)
+    prototype.loc[overlapping_idx] = states.loc[overlapping_idx].astype(int).values
+    return prototype
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Score the combinations of MoMo systems without the GUI.")
+    parser.add_argument("systems", nargs="+", help="Excel workbooks (or results files) with the systems.")
+    parser.add_argument("-p", "--prototype", help="File with the prototype states, every feature is off by default.")
+    parser.add_argument("-m", "--measure", default=SimilarityMenshureType.Sorensen_Dice.value,
+                        choices=[measure.value for measure in SimilarityMenshureType],
+                        help="Similarity measure.")
+    parser.add_argument("-e", "--engine", default=EngineType.NumPy.value,
+                        choices=[engine.value for engine in EngineType],
+                        help="Scoring engine.")
+    parser.add_argument("-k", "--top-k", type=int, help="Keep only the K most similar combinations.")
+    parser.add_argument("-w", "--workers", type=int, help="Number of worker processes, the number of CPUs by default.")
+    parser.add_argument("-o", "--output", required=True, help="Path of the results file.")
+    parser.add_argument("-f", "--format", choices=list(OUTPUT_FORMATS),
+                        help="Format of the results file, guessed from the output extension by default.")
+    parser.add_argument("--report", help="Also write the run report to this JSON file.")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], type=str.upper,
+                        help="Level of the logged messages, MOMO_LOG_LEVEL or WARNING by default.")
+
+    args = parser.parse_args(argv)
+
+    if args.format is None:
+        args.format = os.path.splitext(args.output)[1].lstrip(".").lower()
+        if args.format not in OUTPUT_FORMATS:
+            parser.error(f"cannot guess the output format of '{args.output}', use --format")
+
+    if args.top_k is not None and args.top_k <= 0:
+        parser.error("--top-k must be positive")
+
+    return args
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Run the batch evaluation and return its report"""
+    timings = {}
+
+    start = time.perf_counter()
+    systems = [system for file_path in args.systems for system in load_systems_data(file_path)]
+    if not systems:
+        raise ValueError("No systems found in the input files.")
+
+    prototype = load_prototype(args.prototype, systems) if args.prototype else MultiSystemModel(systems).get_prototype()
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calculation = ParallelCalculation(
+        engine_type=args.engine,
+        systems=systems,
+        prototype=prototype,
+        similarity_measure_type=args.measure,
+        top_k=args.top_k,
+        workers=args.workers
+    )
+    combinations, similarity, evaluated_combinations = calculation.run()
+    timings["scoring"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results_map = ResultsMap(
+        systems=MultiSystemModel(systems),
+        combinations=combinations,
+        similarity=similarity,
+        prototype=prototype,
+        similarity_measure_type=SimilarityMenshureType(args.measure),
+        evaluated_combinations=evaluated_combinations
+    )
+    OUTPUT_FORMATS[args.format](results_map, args.output)
+    timings["save"] = time.perf_counter() - start
+
+    report = {
+        "systems": [system.name for system in systems],
+        "engine": args.engine,
+        "measure": args.measure,
+        "top_k": args.top_k,
+        "workers": calculation.workers,
+        "shards": calculation.shards_count,
+        "evaluated_combinations": evaluated_combinations,
+        "kept_combinations": len(similarity),
+        "combinations_per_second": evaluated_combinations / timings["scoring"] if timings["scoring"] else None,
+        "timings": {**timings, "total": sum(timings.values())},
+        "output": args.output,
+        "format": args.format,
+    }
+
+    if calculation.stats is not None:
+        report["search_stats"] = vars(calculation.stats)
+
+    return report
+
+
+def print_report(report: dict) -> None:
+    timings = report["timings"]
+    print(f"Systems:      {', '.join(report['systems'])}")
+    print(f"Engine:       {report['engine']} ({report['measure']}), {report['workers']} workers, {report['shards']} shards")
+    print(f"Combinations: {report['kept_combinations']:,} kept of {report['evaluated_combinations']:,} evaluated")
+    if report["combinations_per_second"] is not None:
+        print(f"Throughput:   {report['combinations_per_second']:,.0f} combinations/s")
+    print(f"Timings:      load {timings['load']:.3f} s, scoring {timings['scoring']:.3f} s, "
+          f"save {timings['save']:.3f} s, total {timings['total']:.3f} s")
+    print(f"Output:       {report['output']} ({report['format']})")
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    configure_logging(args.log_level)
+
+    try:
+        report = run(args)
+    except (ValueError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print_report(report)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -36,6 +36,14 @@ class ChatBubble(QWidget):
         self.bubble_layout.setContentsMargins(0, 0, 0, 0)
 
 
+    def set_title(self, title):
+        """Replace the title shown above the bubble"""
+        self.title_label.setText(title)
+
+    def set_markdown(self, text_markdown):
+        """Replace the text of the bubble"""
+        self.label.setText(self._get_html_text(text_markdown))
+
     def _get_html_text(self, text_markdown):
         table_style = """
         <style>
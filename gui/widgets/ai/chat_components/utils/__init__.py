@@ -1,6 +0,0 @@
-from .chat_worker import ChatbotWorker
-
-
-__all__ = [
-    "ChatbotWorker"
-]
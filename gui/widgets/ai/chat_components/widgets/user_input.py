@@ -9,7 +9,8 @@ from PyQt5.QtWidgets import (
 
 class UserInputWidget(QWidget):
     """
-    A widget that contains a QLineEdit and a QPushButton for user input.
+    A widget that contains a QLineEdit and a QPushButton for user input,
+    and a button to cancel the pending answers.
     """
     def __init__(self):
         """
@@ -18,10 +19,13 @@ class UserInputWidget(QWidget):
         super().__init__()
         self.text_input = QLineEdit(self)
         self.send_button = QPushButton("Send", self)
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.hide()
 
         layout = QHBoxLayout()
         layout.addWidget(self.text_input)
         layout.addWidget(self.send_button)
+        layout.addWidget(self.cancel_button)
         self.setLayout(layout)
 
     def get_user_input(self):
@@ -54,6 +58,15 @@ class UserInputWidget(QWidget):
         """
         self.text_input.setPlaceholderText(text)
 
+    def set_waiting(self, waiting):
+        """
+        Shows the cancel button while answers are pending.
+
+        Parameters:
+            waiting (bool): True if answers are pending.
+        """
+        self.cancel_button.setVisible(waiting)
+
     def is_input_empty(self):
         """
         Returns True if the input field is empty, False otherwise.
@@ -1,3 +1,6 @@
+import asyncio
+from functools import partial
+
 from PyQt5.QtCore import pyqtSignal, QTimer, Qt
 from PyQt5.QtWidgets import (
     QVBoxLayout,
@@ -7,35 +10,59 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QIcon
 
 from .chat_bubble import ChatBubble
-from .chat_components.utils import ChatbotWorker
 from .chat_components.widgets import (
     WelcomeScreenWidget, ChatScreenWidget, UserInputWidget
 )
 
-from src.assistant import MoMoAgent
+from src.assistant import AgentProvider, AssistantRequest, AssistantRequestScheduler
+from src.assistant.core import ResultsContextBuilder
+from src.assistant._api_keys import get_configs
 from gui.widgets.tabs.result_tab import ResultsTab
 from gui.styles import load_momo_agent_style
 
 
+class PendingAnswer:
+    """The bubble of an answer, from the thinking message to the streamed response"""
+
+    def __init__(self, bubble: ChatBubble):
+        self.bubble = bubble
+        self.text = ""
+        self.is_streaming = False
+        self.needs_render = False
+
+
 class ChatAssistantWindow(QWidget):
     """Main widget for the AI assistant chat interface"""
 
     # Signal emitted when chat window is closed
     finished = pyqtSignal()
 
-    def __init__(self, parent=None):
+    # Minimum time between two renders of a streamed response
+    RENDER_INTERVAL_MS = 100
+
+    def __init__(self, agent_provider: AgentProvider, parent=None):
         super().__init__()
 
         # Initialize window properties
         self.parent_widget = parent
-        self.momo_agent = MoMoAgent()
-        self.worker = None
-        self.thinking_message = None
+        # The agent is shared by the session and may still be building in the background
+        self.agent_provider = agent_provider
+        self.agent_provider.warm_up()
+
+        # Questions are queued and answered one at a time, on the asyncio event loop
+        self.scheduler = AssistantRequestScheduler(agent_provider)
+        self.answers: dict[AssistantRequest, PendingAnswer] = {}
 
         # Setup the thinking animation
         self.thinking_timer = QTimer(self)
+        self.thinking_timer.timeout.connect(self._update_thinking_message)
         self.thinking_dots = 0
 
+        # Streamed responses, rendered at most once per RENDER_INTERVAL_MS
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.timeout.connect(self._render_streamed_text)
+
         # Setup UI components
         self.main_layout = QVBoxLayout(self)
         self.stacked_layout = QStackedLayout()
@@ -53,6 +80,7 @@ class ChatAssistantWindow(QWidget):
         self.input_widget.set_input_placeholder("Ask your question, I am waiting...")
         self.input_widget.text_input.returnPressed.connect(self._send_message)
         self.input_widget.send_button.clicked.connect(self._send_message)
+        self.input_widget.cancel_button.clicked.connect(self.scheduler.cancel_all)
 
         # Setup stacked layout for welcome and chat screens
         self.stacked_layout.addWidget(self.welcome_widget)
@@ -67,9 +95,8 @@ class ChatAssistantWindow(QWidget):
 
     def closeEvent(self, event):
         """Handle window close event"""
-        # Clean up background workers
-        if self.worker:
-            self.worker.terminate()
+        # Stop the pending answers, their thread finishes at the next generated part
+        self.scheduler.cancel_all()
 
         # Notify parent that window is closing
         self.finished.emit()
@@ -78,6 +105,14 @@ class ChatAssistantWindow(QWidget):
     def _send_message(self):
         """Handle sending a message from the user"""
         if user_input := self.input_widget.get_user_input():
+            self.input_widget.clear_input()
+
+            # The same question about the same results is already being answered
+            answer = PendingAnswer(None)
+            request = self._start_asking(user_input, answer)
+            if request in self.answers:
+                return
+
             # Switch from welcome to chat screen if needed
             if self._is_welcome_screen_active():
                 self._switch_to_chat_screen()
@@ -86,10 +121,13 @@ class ChatAssistantWindow(QWidget):
             self._add_chat_bubble(user_input, is_user=True)
 
             # Add thinking indicator
-            self._add_chat_bubble("AI is thinking", is_user=False, is_thinking=True)
+            answer.bubble = self._add_chat_bubble("AI is thinking", is_user=False)
+            self.answers[request] = answer
+            self.thinking_timer.start(500)
+            self.input_widget.set_waiting(True)
+            self._scroll_to_bottom()
 
-            # Start processing the user's message
-            self._start_asking(user_input)
+            asyncio.ensure_future(self._wait_for_answer(request))
 
     def _is_welcome_screen_active(self):
         """Check if welcome screen is currently displayed"""
@@ -99,91 +137,107 @@ class ChatAssistantWindow(QWidget):
         """Switch from welcome to chat screen"""
         self.stacked_layout.setCurrentWidget(self.chat_widget)
 
-    def _add_chat_bubble(self, text, is_user, is_thinking=False):
+    def _add_chat_bubble(self, text, is_user, title=None):
         """Add a chat bubble to the conversation"""
-        if is_thinking:
-            # Store reference to thinking bubble for animation
-            self.thinking_message = ChatBubble(text, is_user, "You" if is_user else "MoMo Assistant")
-            self.chat_widget.chat_layout.insertWidget(self.chat_widget.chat_layout.count() - 1, self.thinking_message)
-            return
-
-        # Create and add a normal chat bubble
-        chat_bubble = ChatBubble(text, is_user, "You" if is_user else "MoMo Assistant")
+        chat_bubble = ChatBubble(text, is_user, title or ("You" if is_user else "MoMo Assistant"))
         self.chat_widget.chat_layout.insertWidget(self.chat_widget.chat_layout.count() - 1, chat_bubble)
+        return chat_bubble
 
-    def _start_asking(self, user_input):
-        """Start the process of getting a response from the AI"""
-        # Setup thinking animation
-        self.thinking_timer.timeout.connect(self._update_thinking_message)
-        self.thinking_timer.start(500)
-
-        # Create worker to process request in background
-        self.worker = ChatbotWorker(self.momo_agent, user_input)
-        self.worker.finished.connect(self._display_assistance_response)
+    def _start_asking(self, user_input, answer):
+        """Queue the question, with the current result data as context"""
+        result_tab = self.parent_widget.get_current_result_tab()
 
-        # Load current result data for context
-        self._set_current_tab_results()
+        return self.scheduler.submit(
+            user_input,
+            build_context=self._get_current_tab_results(user_input),
+            context_key=result_tab.results_id if result_tab else None,
+            on_token=partial(self._on_response_token, answer)
+        )
 
-        # Start worker and clear input
-        self.worker.start()
-        self.input_widget.clear_input()
-        self._scroll_to_bottom()
+    async def _wait_for_answer(self, request):
+        """Display the answer of a request once it is done"""
+        try:
+            response, from_cache = await request.future
+        except asyncio.CancelledError:
+            # Keep the part of the answer streamed before the cancellation
+            answer = self.answers.get(request)
+            streamed = answer.text + "\n\n" if answer and answer.is_streaming else ""
+            self._display_assistance_response(request, streamed + "<p><i>The answer has been cancelled.</i></p>", "MoMo Assistant")
+        except asyncio.TimeoutError as e:
+            self._display_assistance_response(request, f"The assistant did not answer in time: {e}", "MoMo Assistant")
+        except Exception as e:
+            self._display_assistance_response(request, str(e), "MoMo Assistant")
+        else:
+            # Tell whether the answer has been generated or reused from the response cache
+            title = "MoMo Assistant (cached answer)" if from_cache else "MoMo Assistant (new answer)"
+            self._display_assistance_response(request, response, title)
 
     def _scroll_to_bottom(self):
         """Scroll the chat area to show the latest messages"""
         v_scroll = self.chat_widget.scroll_area.verticalScrollBar()
         QTimer.singleShot(100, lambda: v_scroll.setValue(v_scroll.maximum()))
 
-    def _set_current_tab_results(self):
-        """Set current results data as context for the AI assistant"""
+    def _get_current_tab_results(self, user_input):
+        """Get the builder of the current results data, as context for the AI assistant"""
         result_tab = self.parent_widget.get_current_result_tab()
 
         # Check if we have valid results data
-        if not result_tab or result_tab.table_results.empty:
-            return
+        if not result_tab or not len(result_tab.results.similarity):
+            return None
 
-        # Maximum number of rows to send to the AI assistant to avoid overloading
-        MAX_ROWS = 35
-
-        # Get the DataFrame with results
-        df = result_tab.table_results[:MAX_ROWS]
-
-        # Convert DataFrame to the desired format: list of arrays [alt1, alt2, ..., similarity]
-        results_list = []
-        for _, row in df.iterrows():
-            # Extract all values from the row into a list
-            row_data = row.values.tolist()
-            results_list.append(row_data)
-
-        # Convert the list to JSON string
-        import json
-        results_json = json.dumps(results_list)
-
-        # Pass results data to the AI assistant
-        self.momo_agent.set_results(
-            prototype=result_tab.results.prototype.__str__(),
-            results=results_json,
-            metric=result_tab.results.similarity_menshure_type.__str__(),
-            systems="\n\n".join(result_tab.results.systems)
-        )
+        # The context is summarized and its rows chosen for the question, within the token budget
+        context_builder = ResultsContextBuilder(get_configs().context_token_budget)
+        return partial(context_builder.build, result_tab.results, user_input)
 
     def _update_thinking_message(self):
-        """Animate the thinking message with dots"""
+        """Animate the thinking messages with dots"""
         self.thinking_dots = (self.thinking_dots + 1) % 4
         dots = '.' * self.thinking_dots
-        self.thinking_message.label.setText(f"AI is thinking{dots}")
 
-    def _display_assistance_response(self, response):
+        for answer in self.answers.values():
+            if not answer.is_streaming:
+                answer.bubble.label.setText(f"AI is thinking{dots}")
+
+    def _on_response_token(self, answer, token):
+        """Append a part of a streamed response"""
+        answer.text += token
+        answer.needs_render = True
+
+        if not answer.is_streaming:
+            # Show the first part right away, in place of the thinking message
+            answer.is_streaming = True
+            self._render_streamed_text()
+        elif not self.render_timer.isActive():
+            self.render_timer.start(self.RENDER_INTERVAL_MS)
+
+    def _render_streamed_text(self):
+        """Render the streamed responses received so far"""
+        # Follow the responses only if the user has not scrolled up
+        v_scroll = self.chat_widget.scroll_area.verticalScrollBar()
+        at_bottom = v_scroll.value() >= v_scroll.maximum()
+
+        for answer in self.answers.values():
+            if answer.needs_render:
+                answer.bubble.set_markdown(answer.text)
+                answer.needs_render = False
+
+        if at_bottom:
+            self._scroll_to_bottom()
+
+    def _display_assistance_response(self, request, response, title):
         """Display the AI's response in the chat"""
-        # Stop thinking animation
-        self.thinking_timer.stop()
+        answer = self.answers.pop(request, None)
+        if answer is None:
+            return
+
+        # Replace the thinking message or the streamed text with the complete response
+        answer.bubble.set_markdown(response)
+        answer.bubble.set_title(title)
 
-        # Remove thinking message
-        if self.thinking_message:
-            self.chat_widget.chat_layout.removeWidget(self.thinking_message)
-            self.thinking_message.deleteLater()
-            self.thinking_message = None
+        if not any(not pending.is_streaming for pending in self.answers.values()):
+            self.thinking_timer.stop()
+        if not self.answers:
+            self.render_timer.stop()
+            self.input_widget.set_waiting(False)
 
-        # Add the AI's response
-        self._add_chat_bubble(response, is_user=False)
         self._scroll_to_bottom()
@@ -1,4 +1,13 @@
-from PyQt5.QtWidgets import QWidget, QCheckBox, QHBoxLayout
+from PyQt5.QtWidgets import (
+    QWidget,
+    QCheckBox,
+    QHBoxLayout,
+    QApplication,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionButton,
+    QStyleOptionViewItem,
+)
 from PyQt5.QtCore import Qt
 
 
@@ -24,3 +33,28 @@ class CenteredCheckbox(QWidget):
 
     def stateChanged(self, callback):
         self.checkbox.stateChanged.connect(callback)
+
+
+class CenteredCheckboxDelegate(QStyledItemDelegate):
+    """Draws the check state of a cell as a checkbox in the middle of the cell"""
+
+    def paint(self, painter, option, index):
+        option = QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        style = option.widget.style() if option.widget else QApplication.style()
+
+        # Draw the selection and the background without the default left aligned indicator.
+        check_state = option.checkState
+        option.features &= ~QStyleOptionViewItem.HasCheckIndicator
+        style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+
+        indicator = QStyleOptionButton()
+        indicator.state = QStyle.State_Enabled
+        indicator.state |= QStyle.State_On if check_state == Qt.Checked else QStyle.State_Off
+        indicator.rect = style.subElementRect(QStyle.SE_CheckBoxIndicator, indicator, option.widget)
+        indicator.rect.moveCenter(option.rect.center())
+        style.drawPrimitive(QStyle.PE_IndicatorCheckBox, indicator, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        # Toggling is done by the view on click.
+        return False
@@ -0,0 +1,8 @@
+from .results_table_model import ResultsTableModel
+from .system_table_model import SystemTableModel
+
+
+__all__ = [
+    "ResultsTableModel",
+    "SystemTableModel",
+]
@@ -0,0 +1,64 @@
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from src.dtypes import ResultsMap
+
+
+class ResultsTableModel(QAbstractTableModel):
+    """
+    Table model which reads the cells straight from the columnar storage of a ResultsMap.
+
+    Only the cells of the visible rows are ever converted to text, and sorting
+    reorders a NumPy array of row positions instead of the rows themselves.
+    """
+
+    def __init__(self, results: ResultsMap, parent=None):
+        super().__init__(parent)
+        self._results = results
+        self._headers = list(results.systems_names) + ["Similarity"]
+        self._similarity_column = len(results.systems_names)
+        self._order = results.sorted_indices()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+
+        position = self._order[index.row()]
+        column = index.column()
+
+        if column == self._similarity_column:
+            return str(self._results.similarity[position])
+
+        alternatives = self._results.alternatives[column]
+        return str(alternatives[self._results.combinations[position, column]])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+
+        if orientation == Qt.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+
+        if column == self._similarity_column:
+            descending = self._results.sorted_indices()
+            self._order = descending if order == Qt.DescendingOrder else descending[::-1]
+        else:
+            # Rank the alternatives names once, then sort the rows by the rank of their alternative.
+            alternatives = self._results.alternatives[column]
+            ranks = np.empty(len(alternatives), dtype=np.int64)
+            ranks[np.argsort(alternatives.astype(str), kind="stable")] = np.arange(len(alternatives))
+
+            keys = ranks[self._results.combinations[:, column]]
+            self._order = np.argsort(-keys if order == Qt.DescendingOrder else keys, kind="stable")
+
+        self.layoutChanged.emit()
@@ -0,0 +1,112 @@
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from momo.system_models.system_models import SystemModel
+
+
+class SystemTableModel(QAbstractTableModel):
+    """
+    Table model of a system, whose cells are the states of the features of every alternative.
+
+    The states are kept in a NumPy bool matrix of shape (features, alternatives),
+    so reading the whole system back is a single array conversion.
+    """
+
+    def __init__(self, system: SystemModel | None = None, parent=None):
+        super().__init__(parent)
+
+        if system is None:
+            self._values = np.zeros((0, 0), dtype=bool)
+            self._features = []
+            self._alternatives = []
+        else:
+            # A system may have features and no alternatives yet, or the other way around.
+            self._features = [str(feature) for feature in system.data.index]
+            self._alternatives = [str(alternative) for alternative in system.data.columns]
+            self._values = (system.data.to_numpy() != 0).reshape(len(self._features), len(self._alternatives))
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values
+
+    @property
+    def features(self) -> list[str]:
+        return self._features
+
+    @property
+    def alternatives(self) -> list[str]:
+        return self._alternatives
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._features)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._alternatives)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return None
+        return Qt.Checked if self._values[index.row(), index.column()] else Qt.Unchecked
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+
+        self._values[index.row(), index.column()] = value == Qt.Checked
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def toggle(self, index):
+        state = Qt.Unchecked if self._values[index.row(), index.column()] else Qt.Checked
+        self.setData(index, state, Qt.CheckStateRole)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+
+        if orientation == Qt.Horizontal:
+            return self._alternatives[section]
+        return self._features[section]
+
+    def setHeaderData(self, section, orientation, value, role=Qt.EditRole):
+        if role not in (Qt.DisplayRole, Qt.EditRole):
+            return False
+
+        if orientation == Qt.Horizontal:
+            self._alternatives[section] = value
+        else:
+            self._features[section] = value
+
+        self.headerDataChanged.emit(orientation, section, section)
+        return True
+
+    def insert_feature(self, row: int, name: str):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._values = np.insert(self._values, row, False, axis=0)
+        self._features.insert(row, name)
+        self.endInsertRows()
+
+    def insert_alternative(self, column: int, name: str):
+        self.beginInsertColumns(QModelIndex(), column, column)
+        self._values = np.insert(self._values, column, False, axis=1)
+        self._alternatives.insert(column, name)
+        self.endInsertColumns()
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        self.beginRemoveRows(parent, row, row + count - 1)
+        self._values = np.delete(self._values, np.s_[row:row + count], axis=0)
+        del self._features[row:row + count]
+        self.endRemoveRows()
+        return True
+
+    def removeColumns(self, column, count, parent=QModelIndex()):
+        self.beginRemoveColumns(parent, column, column + count - 1)
+        self._values = np.delete(self._values, np.s_[column:column + count], axis=1)
+        del self._alternatives[column:column + count]
+        self.endRemoveColumns()
+        return True
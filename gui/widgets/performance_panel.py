@@ -0,0 +1,125 @@
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtWidgets import (
+    QDockWidget,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QCheckBox,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QFileDialog,
+    QMessageBox,
+)
+
+from src.tracing import Span, Tracer
+
+
+class PerformancePanel(QDockWidget):
+    """
+    Dockable panel of the spans recorded by the tracer.
+
+    Recording is switched on and off from the panel, and the recorded spans can be
+    exported as a Chrome trace-event file (chrome://tracing, Perfetto).
+    """
+
+    spanFinished = pyqtSignal(object)
+
+    MAX_ROWS = 500
+    COLUMNS = ["Operation", "Wall (ms)", "CPU (ms)", "Memory (KB)", "Thread"]
+
+    def __init__(self, tracer: Tracer, parent=None):
+        super().__init__("Performance", parent)
+        self.tracer = tracer
+        self.setObjectName("performance_panel")
+
+        self._init_ui()
+
+        # Spans finish in any thread, the table is updated in the GUI thread.
+        self.spanFinished.connect(self._add_span_row, Qt.QueuedConnection)
+        listener = self.spanFinished.emit
+        tracer.add_listener(listener)
+        self.destroyed.connect(lambda: tracer.remove_listener(listener))
+
+        for span in self.tracer.spans[-self.MAX_ROWS:]:
+            self._add_span_row(span)
+
+    def _init_ui(self):
+        self.record_checkbox = QCheckBox("Record")
+        self.record_checkbox.setChecked(self.tracer.enabled)
+        self.record_checkbox.toggled.connect(self._set_recording)
+
+        self.memory_checkbox = QCheckBox("Trace memory")
+        self.memory_checkbox.setChecked(self.tracer.trace_memory)
+        self.memory_checkbox.setToolTip("Slows down the application while it is on")
+        self.memory_checkbox.toggled.connect(self._set_trace_memory)
+
+        self.clear_button = QPushButton("Clear")
+        self.clear_button.clicked.connect(self._clear)
+
+        self.export_button = QPushButton("Export Trace")
+        self.export_button.clicked.connect(self._export_trace)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(self.record_checkbox)
+        buttons_layout.addWidget(self.memory_checkbox)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(self.clear_button)
+        buttons_layout.addWidget(self.export_button)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+
+        layout = QVBoxLayout()
+        layout.addLayout(buttons_layout)
+        layout.addWidget(self.table)
+
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+
+    def _set_recording(self, recording: bool):
+        if recording:
+            self.tracer.enable()
+            self.tracer.set_trace_memory(self.memory_checkbox.isChecked())
+        else:
+            self.tracer.disable()
+
+    def _set_trace_memory(self, trace_memory: bool):
+        if self.tracer.enabled:
+            self.tracer.set_trace_memory(trace_memory)
+
+    def _add_span_row(self, span: Span):
+        """Show the span on top of the table, dropping the oldest rows"""
+        self.table.insertRow(0)
+
+        memory = "" if span.memory_delta is None else f"{span.memory_delta / 1024:,.1f}"
+        values = [span.name, f"{span.wall_time * 1000:,.2f}", f"{span.cpu_time * 1000:,.2f}", memory, span.thread_name]
+
+        for column, value in enumerate(values):
+            item = QTableWidgetItem(value)
+            if column:
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.table.setItem(0, column, item)
+
+        if self.table.rowCount() > self.MAX_ROWS:
+            self.table.removeRow(self.table.rowCount() - 1)
+
+    def _clear(self):
+        self.tracer.clear()
+        self.table.setRowCount(0)
+
+    def _export_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Trace", "momo_trace.json", "Chrome Trace (*.json)")
+        if not file_path:
+            return
+
+        try:
+            self.tracer.export_chrome_trace(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to export the trace: {e}")
@@ -1,3 +1,5 @@
+import os
+
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     ##########################
@@ -9,15 +11,20 @@ from PyQt5.QtWidgets import (
         QLabel,
         QPushButton,
         QComboBox,
+        QSpinBox,
+        QHBoxLayout,
         QSizePolicy,
         QHeaderView,
     )
 
 from momo.prototype import Prototype
 from gui.widgets.centered_checkbox import CenteredCheckbox
+from src.tracing import traced
 
 
 class PrototypeGUI(QWidget):
+    DEFAULT_TOP_K = 500
+
     def __init__(self, prototype: Prototype, parent=None):
         super().__init__(parent)
         self.prototype = prototype
@@ -46,6 +53,41 @@ class PrototypeGUI(QWidget):
         self.u_type.addItems(["Sorensen-Dice", "Jaccard"])
 
         similarity_layout.addRow(self.u_label, self.u_type)
+
+        self.mode_label = QLabel("Calculation mode:")
+        self.mode_label.setFont(font)
+
+        self.mode_type = QComboBox()
+        self.mode_type.addItems(["All combinations", "Top K"])
+
+        self.top_k = QSpinBox()
+        self.top_k.setRange(1, 1_000_000)
+        self.top_k.setValue(self.DEFAULT_TOP_K)
+        self.top_k.setEnabled(False)
+        self.mode_type.currentIndexChanged.connect(lambda index: self.top_k.setEnabled(index == 1))
+
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(self.mode_type)
+        mode_layout.addWidget(self.top_k)
+
+        similarity_layout.addRow(self.mode_label, mode_layout)
+
+        self.workers_label = QLabel("Workers:")
+        self.workers_label.setFont(font)
+
+        self.workers = QSpinBox()
+        self.workers.setRange(1, max(1, os.cpu_count() or 1) * 4)
+        self.workers.setValue(os.cpu_count() or 1)
+
+        similarity_layout.addRow(self.workers_label, self.workers)
+
+        self.engine_label = QLabel("Engine:")
+        self.engine_label.setFont(font)
+
+        self.engine_type = QComboBox()
+        self.engine_type.addItems(["NumPy", "MoMo", "Branch and bound"])
+
+        similarity_layout.addRow(self.engine_label, self.engine_type)
         self.main_layout.addLayout(similarity_layout)
 
         self.calculate_button = QPushButton("Calculate combinations")
@@ -54,8 +96,8 @@ class PrototypeGUI(QWidget):
 
         self.populate_table()
 
+    @traced()
     def populate_table(self):
-        self.table.setRowCount(len(self.prototype))
         self.table.setColumnCount(3)
 
         self.table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -66,9 +108,23 @@ class PrototypeGUI(QWidget):
         self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.table.verticalHeader().setDefaultSectionSize(30)
 
+        self._fill_rows()
+        self.table.cellClicked.connect(self.on_cell_clicked)
+
+    def _fill_rows(self):
+        # Existing rows are reused, only the missing ones get new items and checkboxes.
+        existing_rows = self.table.rowCount()
+        self.table.setRowCount(len(self.prototype))
+
         for row_index, (index, state) in enumerate(self.prototype.items()):
             system, feature = index
 
+            if row_index < existing_rows:
+                self.table.item(row_index, 0).setText(system)
+                self.table.item(row_index, 1).setText(feature)
+                self.table.cellWidget(row_index, 2).setChecked(bool(state))
+                continue
+
             system_item = QTableWidgetItem(system)
             system_item.setFlags(system_item.flags() & ~Qt.ItemIsEditable)
             self.table.setItem(row_index, 0, system_item)
@@ -78,13 +134,22 @@ class PrototypeGUI(QWidget):
             self.table.setItem(row_index, 1, feature_item)
 
             checkbox = CenteredCheckbox(state=bool(state))
-            checkbox.stateChanged(lambda state, index=index: self.on_state_changed(index, state))
+            checkbox.stateChanged(lambda state, row_index=row_index: self.on_state_changed(row_index, state))
             self.table.setCellWidget(row_index, 2, checkbox)
 
-        self.table.cellClicked.connect(self.on_cell_clicked)
+    def update_prototype(self, prototype: Prototype):
+        if prototype.index.equals(self.prototype.index):
+            return
 
-    def on_state_changed(self, index, state):
-        self.prototype[index] = 1 if state == Qt.Checked else 0
+        # Keep the states of the features which are still there.
+        overlapping_idx = prototype.index.intersection(self.prototype.index)
+        prototype.loc[overlapping_idx] = self.prototype.loc[overlapping_idx]
+
+        self.prototype = prototype
+        self._fill_rows()
+
+    def on_state_changed(self, row_index, state):
+        self.prototype.iloc[row_index] = 1 if state == Qt.Checked else 0
 
     def on_cell_clicked(self, row, column):
         if column == 2:  # State column
@@ -104,3 +169,14 @@ class PrototypeGUI(QWidget):
 
     def get_similarity_measure_type(self):
         return self.u_type.currentText().replace("-", "_").lower()
+
+    def get_engine_type(self):
+        return self.engine_type.currentText().replace(" ", "_").lower()
+
+    def get_top_k(self):
+        if self.mode_type.currentIndex() == 1:
+            return self.top_k.value()
+        return None
+
+    def get_workers(self):
+        return self.workers.value()
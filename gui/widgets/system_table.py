@@ -2,19 +2,20 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtWidgets import (
     ##########################
         QHeaderView,
-        QTableWidget,
+        QTableView,
         QWidget,
         QPushButton,
         QHBoxLayout,
         QVBoxLayout,
         QMenu,
         QInputDialog,
-        QTableWidgetItem,
         QMessageBox
     )
 
 from momo.system_models.system_models import SystemModel
-from gui.widgets.centered_checkbox import CenteredCheckbox
+from gui.widgets.centered_checkbox import CenteredCheckboxDelegate
+from gui.widgets.models import SystemTableModel
+from src.tracing import traced
 
 from .utils import InputText
 
@@ -25,7 +26,8 @@ class SystemTable(QWidget):
 
     def __init__(self, system: SystemModel | None = None, parent=None):
         super().__init__(parent=parent)
-        self.table_widget = QTableWidget()
+        self.table_widget = QTableView()
+        self.table_widget.setItemDelegate(CenteredCheckboxDelegate(self.table_widget))
 
         if system:
             self._constructor_system(system)
@@ -54,31 +56,26 @@ class SystemTable(QWidget):
         self.setLayout(main_layout)
 
     def _constructor_system(self, system: SystemModel):
-        self.table_widget.setRowCount(len(system.data.index))
-        self.table_widget.setColumnCount(len(system.data.columns))
-        self.table_widget.setHorizontalHeaderLabels(system.data.columns)
-        self.table_widget.setVerticalHeaderLabels(system.data.index)
+        self._set_model(SystemTableModel(system))
         header = self.table_widget.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        # Every cell is a checkbox of the same size, so measuring the visible rows is enough.
+        header.setResizeContentsPrecision(0)
 
         self._name = system.name
-        self._fill_table(system)
-
-    def _fill_table(self, system: SystemModel):
-        for i, row in enumerate(system.data.iterrows()):
-            for j, value in enumerate(row[1]):
-                self.table_widget.setCellWidget(i, j, CenteredCheckbox(value))
-
         self._notify_data_change()
 
     def _constructor_empty(self):
-        self.table_widget.clearContents()
-        self.table_widget.setRowCount(0)
-        self.table_widget.setColumnCount(0)
+        self._set_model(SystemTableModel())
         self._name = "system_model"
 
+    def _set_model(self, model: SystemTableModel):
+        self.model = model
+        self.model.setParent(self.table_widget)
+        self.table_widget.setModel(self.model)
+
     def _connect_handlers(self):
-        self.table_widget.cellClicked.connect(self.on_cell_clicked)
+        self.table_widget.clicked.connect(self.on_cell_clicked)
         self.table_widget.horizontalHeader().setContextMenuPolicy(Qt.CustomContextMenu)
         self.table_widget.horizontalHeader().customContextMenuRequested.connect(self.show_column_context_menu)
         self.table_widget.verticalHeader().setContextMenuPolicy(Qt.CustomContextMenu)
@@ -86,32 +83,32 @@ class SystemTable(QWidget):
         self.table_widget.horizontalHeader().sectionDoubleClicked.connect(self._edit_column_header)
         self.table_widget.verticalHeader().sectionDoubleClicked.connect(self._edit_row_header)
 
-    def on_cell_clicked(self, row, column):
-        self.table_widget.cellWidget(row, column).toggle()
+    def on_cell_clicked(self, index):
+        self.model.toggle(index)
         self._notify_data_change()
 
     def _edit_row_header(self, index):
-        current_text = self.table_widget.verticalHeaderItem(index).text()
+        current_text = self.model.features[index]
         new_text, ok = InputText.getText(self, 'Edit Row Header', 'Enter new header text:', text=current_text)
 
         if ok and new_text:
-            self.table_widget.verticalHeaderItem(index).setText(new_text)
+            self.model.setHeaderData(index, Qt.Vertical, new_text)
             self._notify_data_change()
 
     def _edit_column_header(self, index):
-        current_text = self.table_widget.horizontalHeaderItem(index).text()
+        current_text = self.model.alternatives[index]
         new_text, ok = InputText.getText(self, 'Edit Column Header', 'Enter new header text:', text=current_text)
 
         if ok and new_text:
-            self.table_widget.horizontalHeaderItem(index).setText(new_text)
+            self.model.setHeaderData(index, Qt.Horizontal, new_text)
             self._notify_data_change()
 
     def delete_row(self, index):
-        self.table_widget.removeRow(index)
+        self.model.removeRow(index)
         self._notify_data_change()
 
     def delete_column(self, index):
-        self.table_widget.removeColumn(index)
+        self.model.removeColumn(index)
         self._notify_data_change()
 
     def show_column_context_menu(self, pos):
@@ -146,7 +143,7 @@ class SystemTable(QWidget):
         name, ok = self._get_name_for("feature")
 
         if ok and name:
-            index = self.table_widget.currentRow() + 1
+            index = self.table_widget.currentIndex().row() + 1
             self._add_and_fill("feature", name, index)
             self._notify_data_change()
 
@@ -154,7 +151,7 @@ class SystemTable(QWidget):
         name, ok = self._get_name_for("alternative")
 
         if ok and name:
-            index = self.table_widget.currentColumn() + 1
+            index = self.table_widget.currentIndex().column() + 1
             self._add_and_fill("alternative", name, index)
             self._notify_data_change()
 
@@ -162,9 +159,9 @@ class SystemTable(QWidget):
         existing_names = set()
 
         if type == "alternative":
-            existing_names = {self.table_widget.horizontalHeaderItem(i).text() for i in range(self.table_widget.columnCount())}
+            existing_names = set(self.model.alternatives)
         elif type == "feature":
-            existing_names = {self.table_widget.verticalHeaderItem(i).text() for i in range(self.table_widget.rowCount())}
+            existing_names = set(self.model.features)
 
         while True:
             name, ok = InputText.getText(self, f'Add {type}', f'Enter new {type} name:')
@@ -179,20 +176,14 @@ class SystemTable(QWidget):
 
     def _add_and_fill(self, type, name, index):
         if type == "alternative":
-            self.table_widget.insertColumn(index)
-            self.table_widget.setHorizontalHeaderItem(index, QTableWidgetItem(name))
-            for i in range(self.table_widget.rowCount()):
-                self.table_widget.setCellWidget(i, index, CenteredCheckbox())
+            self.model.insert_alternative(index, name)
             self._notify_data_change()
         elif type == "feature":
-            self.table_widget.insertRow(index)
-            self.table_widget.setVerticalHeaderItem(index, QTableWidgetItem(name))
-            for i in range(self.table_widget.columnCount()):
-                self.table_widget.setCellWidget(index, i, CenteredCheckbox())
+            self.model.insert_feature(index, name)
             self._notify_data_change()
 
     def is_empty(self):
-        return self.table_widget.rowCount() == 0 and self.table_widget.columnCount() == 0
+        return self.model.rowCount() == 0 and self.model.columnCount() == 0
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Delete:
@@ -204,26 +195,20 @@ class SystemTable(QWidget):
 
         if selected_rows:
             for index in sorted(selected_rows, reverse=True):
-                self.table_widget.removeRow(index.row())
+                self.model.removeRow(index.row())
             self._notify_data_change()
 
         if selected_columns:
             for index in sorted(selected_columns, reverse=True):
-                self.table_widget.removeColumn(index.column())
+                self.model.removeColumn(index.column())
             self._notify_data_change()
 
+    @traced()
     def to_system_model(self):
         if self.is_empty():
             return SystemModel(self._name)
 
-        data = []
-        for i in range(self.table_widget.rowCount()):
-            row = []
-            for j in range(self.table_widget.columnCount()):
-                row.append(int(self.table_widget.cellWidget(i, j).isChecked()))
-            data.append(row)
-
-        features = [self.table_widget.verticalHeaderItem(i).text() for i in range(self.table_widget.rowCount())]
-        alternatives = [self.table_widget.horizontalHeaderItem(i).text() for i in range(self.table_widget.columnCount())]
-
-        return SystemModel(self._name, data, features=features, alternatives=alternatives)
+        return SystemModel(self._name,
+                           self.model.values.astype(int),
+                           features=list(self.model.features),
+                           alternatives=list(self.model.alternatives))
@@ -1,28 +1,46 @@
+import itertools
+import os
+
 from PyQt5.QtWidgets import (
     QWidget,
     QVBoxLayout,
     QHBoxLayout,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QLabel,
     QPushButton,
     QFileDialog,
     QSizePolicy,
-    QHeaderView
+    QHeaderView,
+    QMessageBox
 )
 from PyQt5.QtCore import Qt
-import pandas as pd
 from src.dtypes import ResultsMap
+from src.engines import SearchStats
+from gui.widgets.models import ResultsTableModel
+
+
+# Excel sheets are limited to 1,048,576 rows, larger results can be saved in the other formats.
+SAVE_FORMATS = {
+    "Excel Files (*.xlsx)": ".xlsx",
+    "MoMo Results (*.momo)": ".momo",
+    "CSV Files (*.csv)": ".csv",
+    "Parquet Files (*.parquet)": ".parquet",
+}
 
 
 class ResultsTab(QWidget):
-    def __init__(self, results: ResultsMap, parent=None):
+    # Unlike `id`, the ids of the shown results are never reused once the results are freed.
+    _results_ids = itertools.count()
+
+    def __init__(self, results: ResultsMap, search_stats: SearchStats | None = None, parent=None):
         super().__init__(parent)
-        self._init_fields(results)
+        self._init_fields(results, search_stats)
         self._init_ui()
 
-    def _init_fields(self, results: ResultsMap):
+    def _init_fields(self, results: ResultsMap, search_stats: SearchStats | None):
         self._results = results
+        self._results_id = next(self._results_ids)
+        self._search_stats = search_stats
         self.colums_len = len(results.systems_names) + 1
 
     def _init_ui(self):
@@ -30,19 +48,22 @@ class ResultsTab(QWidget):
         self.header_layout = QHBoxLayout()
 
         self.label = QLabel("<h2>Results</h2>")
-        self.save_button = QPushButton("Save to Excel")
+        self.truncation_label = QLabel()
+        self.save_button = QPushButton("Save Results")
 
         # Button layout
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(self.save_button)
         buttons_layout.setAlignment(Qt.AlignRight)
 
-        self.table = QTableWidget()
+        self.table = QTableView()
         self.table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
         self.header_layout.addWidget(self.label)
+        self.header_layout.addWidget(self.truncation_label)
         self.header_layout.addLayout(buttons_layout)
         self.main_layout.addLayout(self.header_layout)
 
@@ -56,30 +77,48 @@ class ResultsTab(QWidget):
         self._set_up_table_data()
 
     def _setup_table(self):
-        self.table.setColumnCount(self.colums_len)
-        self.table.setHorizontalHeaderLabels(list(self._results.systems_names) + ["Similarity"])
-        self.table.setSortingEnabled(True)
+        details = []
+        if self._results.is_truncated:
+            details.append(
+                f"Top {len(self._results.similarity_measures):,} of {self._results.evaluated_combinations:,} combinations"
+            )
+        # Only a branch and bound search of the top K visits nodes.
+        if self._search_stats is not None and self._search_stats.visited_nodes:
+            details.append(
+                f"{self._search_stats.visited_nodes:,} nodes visited, {self._search_stats.pruned_nodes:,} pruned"
+            )
+        self.truncation_label.setText("; ".join(details))
+
+        self.colums_len = len(self._results.systems_names) + 1
 
     def _set_up_table_data(self):
-        self.table.clearContents()
-        self.table.setRowCount(0)
-
-        results_df = self._results.results
-        self.table.setRowCount(len(results_df))
-
-        for row_index, row in results_df.iterrows():
-            for col_index, value in enumerate(row):
-                self.table.setItem(row_index, col_index, QTableWidgetItem(str(value)))
-
-        self.table.sortByColumn(self.colums_len - 1, Qt.DescendingOrder)
-        self.table.resizeRowsToContents()
+        # The model only renders the visible rows, so this does not depend on the number of results.
+        self.table.setSortingEnabled(False)
+        self.table.setModel(ResultsTableModel(self._results, parent=self.table))
+        self.table.horizontalHeader().setSortIndicator(self.colums_len - 1, Qt.DescendingOrder)
+        self.table.setSortingEnabled(True)
 
     def _save_to_excel(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Results", "", "Excel Files (*.xlsx)")
-        if file_path:
-            if not file_path.endswith(".xlsx"):
-                file_path += ".xlsx"
-            self._results.to_excel(file_path)
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Save Results", "", ";;".join(SAVE_FORMATS))
+        if not file_path:
+            return
+
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in SAVE_FORMATS.values():
+            extension = SAVE_FORMATS.get(selected_filter, ".xlsx")
+            file_path += extension
+
+        savers = {
+            ".xlsx": self._results.to_excel,
+            ".momo": self._results.to_momo,
+            ".csv": self._results.to_csv,
+            ".parquet": self._results.to_parquet,
+        }
+
+        try:
+            savers[extension](file_path)
+        except (ImportError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Failed to save the results: {e}")
 
     @property
     def results(self):
@@ -94,9 +133,17 @@ class ResultsTab(QWidget):
         Set the results to be displayed in the table.
         """
         self._results = results
+        self._results_id = next(self._results_ids)
         self._setup_table()
         self._set_up_table_data()
 
+    @property
+    def results_id(self):
+        """
+        int: Id of the shown results, unique for the session.
+        """
+        return self._results_id
+
     @property
     def table_results(self):
         """
@@ -73,7 +73,7 @@ class SystemsTab(QWidget):
         self.tabs.setCurrentIndex(self.tabs.count() - 1)
 
         if self.on_content_change is not None:
-            system_table.dataChanged.connect(self.on_content_change)
+            system_table.dataChanged.connect(lambda: self.on_content_change(system_table))
             self.on_content_change()
 
     def add_system_tab_via_dialog_window(self) -> bool:
@@ -171,12 +171,13 @@ class SystemsTab(QWidget):
             self.save_to_file(file_path)
 
     def save_to_file(self, file_path):
+        tabs = []
         for i in range(self.tabs.count()):
             tab_widget = self.tabs.widget(i)
             if isinstance(tab_widget, SystemTable):
-                data = tab_widget.to_system_model().data
-                saver = ExcelSaver(file_path)
-                saver.save_tab(self.tabs.tabText(i), data)
+                tabs.append((self.tabs.tabText(i), tab_widget.to_system_model().data))
+
+        ExcelSaver(file_path).save_tabs(tabs)
 
     def _is_tab_name_exists(self, name: str) -> bool:
         for i in range(self.tabs.count()):
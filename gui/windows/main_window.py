@@ -1,4 +1,4 @@
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtWidgets import (
     ###########################
     QMainWindow,
@@ -10,13 +10,15 @@ from PyQt5.QtWidgets import (
     QFileDialog,
     QApplication,
     QDesktopWidget,
+    QShortcut,
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIcon, QKeySequence
 
 import asyncio
+import logging
+import threading
 from PyQt5.QtWidgets import QProgressDialog
-import pandas as pd
 
 
 from gui.widgets.prototype_gui import PrototypeGUI
@@ -25,19 +27,30 @@ from gui.widgets.tabs.empty_system_tab import EmptySystemsTab
 from gui.widgets.system_table import SystemTable
 from gui.widgets.tabs.systems_tab import SystemsTab
 from gui.widgets.floating_button import FloatingButton
+from gui.widgets.performance_panel import PerformancePanel
 from gui.styles import load_window_style, load_ask_ai_style
-from gui.widgets.ai.chat_widget import ChatAssistantWindow
 from gui.windows.utils.tab_manager import TabManager
 
-from src.file_validator import load_systems_data, ExcelFileValidator
-from src.dtypes import ResultsMap
+from src.file_validator import load_file
+from src.dtypes import ResultsMap, EngineType
+from src.engines import ParallelCalculation, CalculationCancelled, IncrementalScorer
+from src.assistant import AgentProvider
+from src.results_cache import ResultsCache, fingerprint, get_prototype
+from src.tracing import TRACER, traced
 
-from momo.system_models.system_models import SystemModel
-from momo.model import MoMoModel
+from momo.prototype import Prototype
+from momo.system_models.system_models import SystemModel, MultiSystemModel
+
+
+logger = logging.getLogger(__name__)
+
+OPEN_FILE_FILTER = "Excel Files (*.xlsx *.xls);;MoMo Results (*.momo)"
 
 
 class MainWindow(QMainWindow):
     systemsLoaded = pyqtSignal(list)
+    UPDATE_DELAY_MS = 150
+    AGENT_WARM_UP_DELAY_MS = 2000
 
     def __init__(self, systems_data: list[SystemModel] = None, results_map: ResultsMap = None):
         super().__init__()
@@ -48,6 +61,18 @@ class MainWindow(QMainWindow):
         self.prototype_gui = None
         self.cached_prototype = None
         self.chat_window = None
+        self.agent_provider = AgentProvider()
+        self.results_cache = ResultsCache.from_environment()
+        self.incremental_scorer = IncrementalScorer()
+        self.is_calculating = False
+
+        # Edits are coalesced and applied once the user pauses.
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(self.UPDATE_DELAY_MS)
+        self._update_timer.timeout.connect(self._apply_pending_update)
+        self._changed_tables = set()
+        self._full_update_pending = False
 
         self._setup_ui()
 
@@ -60,6 +85,9 @@ class MainWindow(QMainWindow):
         if self.results_map:
             self.tabs_manager.add_result_tab(ResultsTab(results=self.results_map))
 
+        # Build the assistant in the background once the window had time to settle.
+        QTimer.singleShot(self.AGENT_WARM_UP_DELAY_MS, self.agent_provider.warm_up)
+
     def _setup_ui(self):
         self.splitter = QSplitter(Qt.Horizontal, parent=self)
         self.prototype_widget = QWidget(parent=self)
@@ -85,6 +113,7 @@ class MainWindow(QMainWindow):
             self._resize_splitter(left_ratio=0, right_ratio=1)
 
         self._ask_ai_button()
+        self._performance_panel()
 
 
     def _ask_ai_button(self):
@@ -96,16 +125,30 @@ class MainWindow(QMainWindow):
         self.ask_ai_button.show()
 
 
+    def _performance_panel(self):
+        # Hidden until it is toggled, the tracer only records once the panel (or MOMO_TRACE) enables it.
+        self.performance_panel = PerformancePanel(TRACER, parent=self)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.performance_panel)
+        self.performance_panel.hide()
+
+        self.performance_shortcut = QShortcut(QKeySequence("Ctrl+Shift+P"), self)
+        self.performance_shortcut.activated.connect(self.performance_panel.toggleViewAction().trigger)
+
+
     def _show_momo_agent_widget(self):
-        self.chat_window = ChatAssistantWindow(parent=self)
-        self.chat_window.setWindowTitle("MoMo Assistant")
-        self.chat_window.setWindowFlags(Qt.Dialog | Qt.WindowCloseButtonHint | Qt.WindowMinimizeButtonHint)
+        # The chat window is created once and reused, along with the session's agent.
+        if self.chat_window is None:
+            from gui.widgets.ai.chat_widget import ChatAssistantWindow
+
+            self.chat_window = ChatAssistantWindow(self.agent_provider, parent=self)
+            self.chat_window.setWindowTitle("MoMo Assistant")
+            self.chat_window.setWindowFlags(Qt.Dialog | Qt.WindowCloseButtonHint | Qt.WindowMinimizeButtonHint)
+            self.chat_window.finished.connect(self.ask_ai_button.show)
 
         self.chat_window.setGeometry(self.x() + self.width() - 350,
                                     self.y() + self.height() - 360,
                                     350, 400)
         self.ask_ai_button.hide()
-        self.chat_window.finished.connect(self.ask_ai_button.show)
 
         self.chat_window.show()
 
@@ -151,7 +194,7 @@ class MainWindow(QMainWindow):
             prototype = self.results_map.prototype
             measure_type = self.results_map.similarity_measure_type
         else:
-            prototype = MoMoModel(self.systems_data).get_prototype()
+            prototype = get_prototype(self.systems_data)
             measure_type = None
 
             if self.cached_prototype is not None and not self.cached_prototype.empty:
@@ -163,6 +206,7 @@ class MainWindow(QMainWindow):
         self.prototype_gui.calculate_button.clicked.connect(
             lambda: asyncio.create_task(self._calculate_combinations_async())
         )
+        self.prototype_gui.calculate_button.setEnabled(not self.is_calculating)
 
         self.prototype_widget.layout().addWidget(self.prototype_gui)
         self._resize_splitter()
@@ -184,38 +228,66 @@ class MainWindow(QMainWindow):
             try:
                 self.prototype_gui.calculate_button.clicked.disconnect()
             except TypeError:
-                print("Already disconnected")
-                pass
+                logger.debug("The calculate button is already disconnected")
 
             self.prototype_widget.layout().removeWidget(self.prototype_gui)
             self.prototype_gui.hide()
             self.prototype_gui.deleteLater()
             self.prototype_gui = None
             self.cached_prototype = None
+            self.incremental_scorer.clear()
 
             QApplication.processEvents()
 
         self._resize_splitter(left_ratio=0.01, right_ratio=0.99)
 
 
-    def _update_window(self):
+    def _update_window(self, system_table: SystemTable | None = None):
         self.tabs_manager.setCurrentIndex(0)
 
         if not self.systems_tab:
             return
 
-        if self.prototype_gui:
-            self.cached_prototype = self.prototype_gui.get_prototype()
+        # Without a table the tabs themselves changed, so every system is rebuilt.
+        if system_table is None:
+            self._full_update_pending = True
+        else:
+            self._changed_tables.add(system_table)
 
-        if hasattr(self, 'systems_tab'):
-            self.systems_data = []
-            for i in range(self.systems_tab.tabs.count()):
-                tab_widget = self.systems_tab.tabs.widget(i)
-                if isinstance(tab_widget, SystemTable):
-                    self.systems_data.append(tab_widget.to_system_model())
+        self._update_timer.start()
+
+    def _flush_pending_update(self):
+        if self._update_timer.isActive():
+            self._update_timer.stop()
+            self._apply_pending_update()
+
+    def _apply_pending_update(self):
+        if not self.systems_tab:
+            return
+
+        system_tables = [self.systems_tab.tabs.widget(i) for i in range(self.systems_tab.tabs.count())]
+        system_tables = [tab_widget for tab_widget in system_tables if isinstance(tab_widget, SystemTable)]
+
+        if self._full_update_pending or len(system_tables) != len(self.systems_data):
+            self.systems_data = [system_table.to_system_model() for system_table in system_tables]
+        else:
+            for i, system_table in enumerate(system_tables):
+                if system_table in self._changed_tables:
+                    self.systems_data[i] = system_table.to_system_model()
+
+        self._changed_tables.clear()
+        self._full_update_pending = False
 
         self.systemsLoaded.emit(self.systems_data)
-        self._recreate_prototype_gui()
+        self._update_prototype_gui()
+
+    def _update_prototype_gui(self):
+        if not self.prototype_gui or not self.systems_data:
+            self._recreate_prototype_gui()
+            return
+
+        self.prototype_gui.update_prototype(get_prototype(self.systems_data))
+        self.cached_prototype = self.prototype_gui.get_prototype()
 
 
     def _recreate_prototype_gui(self):
@@ -229,28 +301,22 @@ class MainWindow(QMainWindow):
 
 
     def _upload_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Excel Files (*.xlsx *.xls)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", OPEN_FILE_FILTER)
 
         if not file_path:
             return
 
-        file_validator = ExcelFileValidator()
-        is_results_file = file_validator.is_results_file(file_path)
+        # The file is read once, whether it holds results or only systems
+        systems_data, results_map = load_file(file_path)
+        is_results_file = results_map is not None
 
-        # If this is a results file, load it first
         if is_results_file:
-            try:
-                self.results_map = ResultsMap.from_excel(file_path)
-                self.systems_data = load_systems_data(file_path)
-                # Always update cached prototype with results prototype
-                if self.results_map and self.results_map.prototype is not None:
-                    self.cached_prototype = self.results_map.prototype
-            except Exception as e:
-                print(f"Error loading results: {e}")
-                return
-        else:
-            # Regular system file
-            self.systems_data = load_systems_data(file_path)
+            self.results_map = results_map
+            # Always update cached prototype with results prototype
+            if self.results_map.prototype is not None:
+                self.cached_prototype = self.results_map.prototype
+
+        self.systems_data = systems_data
 
         if not self.systems_data:
             return
@@ -269,27 +335,17 @@ class MainWindow(QMainWindow):
 
 
     def _read_from_excel(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Excel Files (*.xlsx *.xls)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open File", "", OPEN_FILE_FILTER)
 
         if not file_path:
             return
 
-        file_validator = ExcelFileValidator()
-        is_results_file = file_validator.is_results_file(file_path)
+        # The file is read once, whether it holds results or only systems
+        new_systems, results_map = load_file(file_path)
 
-        # If this is a results file, load it first
-        if is_results_file:
-            try:
-                self.results_map = ResultsMap.from_excel(file_path)
-                new_systems = load_systems_data(file_path)
-                # Always update cached prototype with results prototype
-                self.cached_prototype = self.results_map.prototype
-            except Exception as e:
-                print(f"Error loading results: {e}")
-                return
-        else:
-            # Regular system file
-            new_systems = load_systems_data(file_path)
+        if results_map is not None:
+            # Always update cached prototype with results prototype
+            self.cached_prototype = results_map.prototype
 
         if not new_systems:
             return
@@ -303,65 +359,195 @@ class MainWindow(QMainWindow):
         self._recreate_prototype_gui()
 
 
-    def _calculate_combinations_sync(self):
-        if not self.systems_data:
-            return None
+    def _create_calculation(self) -> ParallelCalculation:
+        self._flush_pending_update()
 
+        # A copy, the prototype panel keeps changing its own prototype.
         prototype = self.prototype_gui.get_prototype()
-        model = MoMoModel(self.systems_data, prototype)
-        model.u = self.prototype_gui.get_similarity_measure_type()
 
-        pd.set_option('display.max_columns', None)
+        return ParallelCalculation(
+            engine_type=self.prototype_gui.get_engine_type(),
+            systems=self.systems_data,
+            prototype=Prototype(prototype.to_numpy().copy(), index=prototype.index),
+            similarity_measure_type=self.prototype_gui.get_similarity_measure_type(),
+            top_k=self.prototype_gui.get_top_k(),
+            workers=self.prototype_gui.get_workers()
+        )
+
+
+    @staticmethod
+    def _results_key(calculation: ParallelCalculation) -> str:
+        return fingerprint(calculation.systems, calculation.prototype, calculation.similarity_measure_type, calculation.top_k)
+
 
-        results_map = ResultsMap(
-            systems=model.system_models,
-            similarity_measures=model.get_similarity_measures(),
-            prototype=prototype,
-            similarity_measure_type=self.prototype_gui.get_similarity_measure_type()
+    @traced()
+    def _create_results_map(self, calculation: ParallelCalculation, scores: tuple | None = None) -> ResultsMap:
+        # The scores come from the workers of the calculation unless they are given.
+        if scores is None:
+            scores = calculation.merge()
+
+            if calculation.stats is not None:
+                logger.info("Branch and bound search: %s", calculation.stats)
+
+        combinations, similarity, evaluated_combinations = scores
+
+        return ResultsMap(
+            systems=MultiSystemModel(calculation.systems),
+            combinations=combinations,
+            similarity=similarity,
+            prototype=calculation.prototype,
+            similarity_measure_type=calculation.similarity_measure_type,
+            evaluated_combinations=evaluated_combinations
         )
 
-        return results_map
 
+    def _keep_partial_sums(self, calculation: ParallelCalculation, results_map: ResultsMap):
+        # The next calculation of the same systems only re-scores what changed.
+        if calculation.top_k is None:
+            self.incremental_scorer.reset(calculation.systems, calculation.prototype, calculation.similarity_measure_type,
+                                          results_map.combinations, results_map.similarity)
+        else:
+            self.incremental_scorer.reset(calculation.systems, calculation.prototype)
 
-    async def _calculate_combinations_async(self):
-        if not self.systems_data:
-            return
 
-        progress_dialog = QProgressDialog("Calculating...", "Cancel", 0, 0, parent=self)
+    def _can_rescore(self, calculation: ParallelCalculation) -> bool:
+        # The reference engine always scores every combination itself.
+        return calculation.engine_type != EngineType.MoMo and \
+            self.incremental_scorer.can_reuse(calculation.systems,
+                                              calculation.prototype,
+                                              calculation.similarity_measure_type,
+                                              calculation.top_k)
+
+
+    @traced()
+    def _rescore(self, calculation: ParallelCalculation, cancel_event: threading.Event) -> ResultsMap:
+        scores = self.incremental_scorer.score(calculation.systems,
+                                               calculation.prototype,
+                                               calculation.similarity_measure_type,
+                                               calculation.top_k,
+                                               cancel_event)
+        return self._create_results_map(calculation, scores)
+
+
+    def _create_progress_dialog(self, maximum: int) -> QProgressDialog:
+        progress_dialog = QProgressDialog("Calculating...", "Cancel", 0, maximum, parent=self)
         progress_dialog.setFixedSize(300, 100)
         progress_dialog.setWindowTitle("Please wait")
         progress_dialog.setWindowModality(Qt.WindowModal)
+        return progress_dialog
 
-        future = None
 
-        def cancel_calculation():
-            if future:
-                future.cancel()
-            progress_dialog.close()
+    async def _calculate_combinations_async(self):
+        if not self.systems_data or self.is_calculating:
+            return
+
+        calculation = self._create_calculation()
 
-        progress_dialog.canceled.connect(cancel_calculation)
+        # The calculations share the incremental scorer, only one runs at a time.
+        self._set_calculating(True)
 
         try:
-            loop = asyncio.get_running_loop()
-            future = loop.run_in_executor(None, self._calculate_combinations_sync)
+            # Every way of getting the results is traced: the cache, the re-scoring and the workers.
+            with TRACER.span("MainWindow.calculate_combinations", shards=calculation.shards_count):
+                await self._calculate(calculation)
+        finally:
+            self._set_calculating(False)
+
+
+    def _set_calculating(self, is_calculating: bool):
+        self.is_calculating = is_calculating
+
+        if self.prototype_gui:
+            self.prototype_gui.calculate_button.setEnabled(not is_calculating)
 
-            await asyncio.sleep(0.5)
-            if not future.done():
-                progress_dialog.show()
 
-            results_map = await future
+    def _cache_results(self, key: str, results_map: ResultsMap):
+        # Saving large results takes a while, the window does not wait for it.
+        future = asyncio.get_running_loop().run_in_executor(None, self.results_cache.put, key, results_map)
+        future.add_done_callback(self._on_results_cached)
 
-            if progress_dialog.wasCanceled():
-                return
 
-            if results_map is None:
-                return
+    @staticmethod
+    def _on_results_cached(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Failed to cache the results", exc_info=future.exception())
 
+
+    async def _calculate(self, calculation: ParallelCalculation):
+        key = self._results_key(calculation)
+
+        # The same systems, prototype and measure were already calculated.
+        results_map = self.results_cache.get(key)
+        if results_map is not None:
             self.tabs_manager.add_result_tab(ResultsTab(results=results_map))
+            # The next calculation re-scores from these results, not from older ones.
+            self._keep_partial_sums(calculation, results_map)
+            return
 
+        loop = asyncio.get_running_loop()
+
+        # Only the prototype or some alternatives changed since the last calculation, they are re-scored in a thread.
+        if self._can_rescore(calculation):
+            await self._calculate_rescore(calculation, key)
+            return
+
+        progress_dialog = self._create_progress_dialog(calculation.shards_count)
+        # The pool exits in the background, the window does not wait for the workers.
+        progress_dialog.canceled.connect(lambda: calculation.cancel(wait=False))
+
+        show_handle = None
+
+        try:
+            futures = [asyncio.wrap_future(future) for future in calculation.start()]
+            show_handle = loop.call_later(0.5, progress_dialog.show)
+
+            for shards_done, future in enumerate(asyncio.as_completed(futures), start=1):
+                await future
+                progress_dialog.setValue(shards_done)
+
+            # Merging waits for the workers to exit, it runs in a thread like the re-scoring.
+            results_map = await loop.run_in_executor(None, self._create_results_map, calculation)
+            self.tabs_manager.add_result_tab(ResultsTab(results=results_map, search_stats=calculation.stats))
+            self._keep_partial_sums(calculation, results_map)
+            self._cache_results(key, results_map)
+
+        except (CalculationCancelled, asyncio.CancelledError):
+            calculation.cancel(wait=False)
+            return
+        except Exception as e:
+            calculation.cancel(wait=False)
+            logger.exception("Error during calculation: %s", e)
+        finally:
+            if show_handle is not None:
+                show_handle.cancel()
+            # Closing the dialog emits `canceled`, the finished calculation must not be cancelled.
+            progress_dialog.canceled.disconnect()
+            progress_dialog.close()
+
+
+    async def _calculate_rescore(self, calculation: ParallelCalculation, key: str):
+        loop = asyncio.get_running_loop()
+        cancel_event = threading.Event()
+
+        # The re-scoring has no shards to count, the dialog only shows it is busy.
+        progress_dialog = self._create_progress_dialog(0)
+        progress_dialog.canceled.connect(cancel_event.set)
+        show_handle = loop.call_later(0.5, progress_dialog.show)
+
+        try:
+            results_map = await loop.run_in_executor(None, self._rescore, calculation, cancel_event)
+            self.tabs_manager.add_result_tab(ResultsTab(results=results_map))
+            self._cache_results(key, results_map)
+
+        except (CalculationCancelled, asyncio.CancelledError):
+            cancel_event.set()
+            return
         except Exception as e:
-            print(f"Error during calculation: {e}")
+            cancel_event.set()
+            logger.exception("Error during calculation: %s", e)
         finally:
+            show_handle.cancel()
+            progress_dialog.canceled.disconnect()
             progress_dialog.close()
 
 
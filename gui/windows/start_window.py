@@ -14,10 +14,7 @@ from PyQt5.QtWidgets import (
 )
 
 
-from src.file_validator import load_systems_data, ExcelFileValidator
 from gui.styles import load_window_style
-from momo.system_models.system_models import SystemModel
-from src.dtypes import ResultsMap
 
 
 class StartWindow(QMainWindow):
@@ -68,30 +65,27 @@ class StartWindow(QMainWindow):
         self._window_widget.setLayout(systems_layout)
 
     def _load_from_file_action(self):
-        file_name, _ = QFileDialog.getOpenFileName(self, 'Open File', filter="Excel Files (*.xlsx *.xls)")
+        file_name, _ = QFileDialog.getOpenFileName(self, 'Open File', filter="Excel Files (*.xlsx *.xls);;MoMo Results (*.momo)")
 
         if file_name:
-            file_validator = ExcelFileValidator()
-            is_results_file = file_validator.is_results_file(file_name)
+            # pandas and the loaders are only imported when a file is opened.
+            from src.file_validator import load_file
 
-            self._systems_data = load_systems_data(file_name)
+            # The file is read once, whether it holds results or only systems
+            self._systems_data, self._results_map = load_file(file_name)
 
             if not self._systems_data:
                 QMessageBox.warning(self, "Error", "No systems found in the file. Please ensure the file has the correct format or data.")
                 return
 
-            if is_results_file:
-                try:
-                    self._results_map = ResultsMap.from_excel(file_name)
-                except Exception as e:
-                    print(f"Error loading results: {e}")
-
             self.close()
 
     def _create_action(self):
         system_name, ok = QInputDialog.getText(self, "New System", "Enter the name of the new system:")
 
         if ok and system_name:
+            from momo.system_models.system_models import SystemModel
+
             self._systems_data.append(SystemModel(system_name))
             self.close()
 
@@ -1,14 +1,10 @@
-import sys
 import asyncio
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtGui import QWindow
-from qasync import QEventLoop
+import sys
 
-from gui.windows.start_window import StartWindow
-from gui.windows.main_window import MainWindow
+from src.startup_report import StartupReport
 
 
-async def wait_for_close(widget: QWindow):
+async def wait_for_close(widget: "QWindow"):
     while widget.isVisible():
         await asyncio.sleep(0.1)
 
@@ -17,16 +13,35 @@ async def run_app(systems_data=None, results_map=None):
     if not systems_data:
         return
 
+    # The main window and its dependencies are only needed once the start window is closed.
+    from gui.windows.main_window import MainWindow
+
     main_window = MainWindow(systems_data=systems_data, results_map=results_map)
     main_window.show()
 
     await wait_for_close(main_window)
 
 
-if __name__ == "__main__":
+def main():
+    # Created first, so the report covers every import below.
+    startup_report = StartupReport.from_environment()
+
+    # The GUI is only imported here: the spawned calculation workers import this
+    # module as `__mp_main__` and must not load it.
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from qasync import QEventLoop
+
+    from gui.windows.start_window import StartWindow
+    from src.logging_config import configure_logging
+
+    configure_logging()
     app = QApplication(sys.argv)
     start_window = StartWindow()
     start_window.show()
+
+    startup_report.mark("Start window shown")
+    QTimer.singleShot(0, startup_report.report)
     app.exec_()
 
     loop = QEventLoop(app)
@@ -41,3 +56,7 @@ if __name__ == "__main__":
             )
         except RuntimeError:
             loop.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,12 @@
-from .ai import MoMoAgent
+from .agent_provider import AgentProvider
+from .request_scheduler import AssistantRequest, AssistantRequestScheduler
 
-__all__ = ["MoMoAgent"]
+__all__ = ["MoMoAgent", "AgentProvider", "AssistantRequest", "AssistantRequestScheduler"]
+
+
+def __getattr__(name):
+    # The agent pulls in crewai, so it is only imported when it is first used.
+    if name == "MoMoAgent":
+        from .ai import MoMoAgent
+        return MoMoAgent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
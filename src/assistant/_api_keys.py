@@ -1,8 +1,12 @@
+import logging
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+
+logger = logging.getLogger(__name__)
+
 
 class Configs:
     """Container for API keys used by the MoMo assistant"""
@@ -13,12 +17,38 @@ class Configs:
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
         self.model_to_use = os.getenv("MODEL_TO_USE", "gpt-4o-mini")
 
+        # Approximate size of the result context sent with every question
+        self.context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+
+        # Cache of the assistant's responses
+        self.response_cache_path = os.getenv(
+            "RESPONSE_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".momo", "assistant_cache.sqlite3")
+        )
+        self.response_cache_ttl_hours = float(os.getenv("RESPONSE_CACHE_TTL_HOURS", "168"))
+        self.response_cache_max_mb = float(os.getenv("RESPONSE_CACHE_MAX_MB", "20"))
+
         self._validate_keys()
 
     def _validate_keys(self):
         """Validate that required API keys are present"""
         if not self.openai_api_key:
-            print("Warning: OPENAI_API_KEY not found in environment variables")
+            logger.warning("OPENAI_API_KEY not found in environment variables")
+
+
+@lru_cache(maxsize=None)
+def get_configs() -> Configs:
+    """
+    Get the singleton instance of the configs.
+
+    The .env file is loaded on the first call, when the assistant is first used,
+    instead of when the package is imported.
+    """
+    load_dotenv()
+    return Configs()
+
 
-# Create a singleton instance
-CONFIGS = Configs()
+def __getattr__(name):
+    # `CONFIGS` is still available as a module attribute, built on first access.
+    if name == "CONFIGS":
+        return get_configs()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
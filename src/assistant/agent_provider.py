@@ -0,0 +1,60 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class AgentProvider:
+    """
+    Owner of the session's MoMo assistant.
+
+    The agent (its LLM client, crew and crew memory) is built once, in a
+    background thread, and then shared by every chat window of the session.
+    """
+
+    def __init__(self):
+        """Initialize the provider without building the agent"""
+        self._executor = None
+        self._future = None
+
+    def warm_up(self) -> Future:
+        """
+        Start building the agent in the background, if it is not built yet.
+
+        Returns:
+            Future of the agent
+        """
+        if self._future is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="momo-agent")
+            self._future = self._executor.submit(self._build_agent)
+            self._executor.shutdown(wait=False)
+
+        return self._future
+
+    @staticmethod
+    def _build_agent():
+        # Importing the agent pulls in crewai, which is done in the background as well.
+        from .ai import MoMoAgent
+        return MoMoAgent()
+
+    @property
+    def is_ready(self) -> bool:
+        """Check if the agent has been built successfully"""
+        return self._future is not None and self._future.done() and self._future.exception() is None
+
+    def get(self, timeout: float | None = None):
+        """
+        Get the agent, waiting for it to be built if needed.
+
+        Args:
+            timeout: Maximum number of seconds to wait
+
+        Returns:
+            The MoMoAgent instance
+
+        Raises:
+            Exception: The error raised while building the agent
+        """
+        return self.warm_up().result(timeout)
+
+    def reset(self) -> None:
+        """Drop the agent, so the next use builds a new one (e.g. after a failed build)"""
+        self._future = None
+        self._executor = None
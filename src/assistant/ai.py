@@ -1,13 +1,53 @@
-from typing import List, Any
+import threading
+from typing import Callable, List, Any, Optional
 from crewai import Agent, Task, Crew
 from crewai.llm import LLM
+from crewai.utilities.events import crewai_event_bus, LLMCallStartedEvent, LLMStreamChunkEvent
 
 from .core.config_loader import AgentSettingsLoader
+from .core.response_cache import ResponseCache
 from .models.data_model import AssistantData
-from ._api_keys import CONFIGS
+from ._api_keys import get_configs
+from src.tracing import traced
 from crewai_tools import SerperDevTool
 
 
+# The agent writes its reasoning first, the answer to the user follows this marker
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class AnswerCancelled(BaseException):
+    """
+    Raised in the crew's thread to stop a cancelled answer.
+
+    It is a BaseException so that the retries and the error handling of crewai,
+    which catch Exception, let it through.
+    """
+
+
+# The event bus is shared by every agent, its LLM events go to the agent answering a question
+_answering_agent: Optional["MoMoAgent"] = None
+
+
+def _dispatch_llm_call_started(source, event):
+    """Forward the start of an LLM call to the answering agent"""
+    agent = _answering_agent
+    if agent is not None:
+        agent._on_llm_call_started(source, event)
+
+
+def _dispatch_llm_stream_chunk(source, event):
+    """Forward a streamed chunk to the answering agent"""
+    agent = _answering_agent
+    if agent is not None:
+        agent._on_llm_stream_chunk(source, event)
+
+
+# Registered once, so that rebuilding the agent does not add handlers to the bus
+crewai_event_bus.register_handler(LLMCallStartedEvent, _dispatch_llm_call_started)
+crewai_event_bus.register_handler(LLMStreamChunkEvent, _dispatch_llm_stream_chunk)
+
+
 class MoMoAgent:
     """
     MoMo AI Assistant using CrewAI
@@ -26,6 +66,16 @@ class MoMoAgent:
         # Create the crew of AI agents
         self.crew = self._create_crew()
 
+        # Answers to the questions already asked with the same context
+        self.response_cache = self._create_response_cache()
+
+        # Streaming state of the current question
+        self._on_token = None
+        self._cancel_event = None
+        self._llm_output = ""
+        self._answer_start = None
+        self._answer_length = 0
+
     def _create_llm(self) -> Any:
         """
         Create the language model based on available API keys
@@ -33,20 +83,39 @@ class MoMoAgent:
         Returns:
             An LLM instance from CrewAI
         """
+        configs = get_configs()
+
         # Prefer OpenAI if available, fallback to Anthropic
-        if CONFIGS.openai_api_key:
+        if configs.openai_api_key:
             return LLM(
-                api_key=CONFIGS.openai_api_key,
-                model=CONFIGS.model_to_use,
+                api_key=configs.openai_api_key,
+                model=configs.model_to_use,
+                stream=True,
             )
-        elif CONFIGS.anthropic_api_key:
+        elif configs.anthropic_api_key:
             return LLM(
-                api_key=CONFIGS.anthropic_api_key,
-                model=CONFIGS.model_to_use,
+                api_key=configs.anthropic_api_key,
+                model=configs.model_to_use,
+                stream=True,
             )
         else:
             raise ValueError("No API keys available for language models")
 
+    def _create_response_cache(self) -> ResponseCache:
+        """
+        Create the response cache configured by the environment
+
+        Returns:
+            A ResponseCache instance
+        """
+        configs = get_configs()
+
+        return ResponseCache(
+            path=configs.response_cache_path,
+            ttl=configs.response_cache_ttl_hours * 3600,
+            max_bytes=int(configs.response_cache_max_mb * 1024 * 1024)
+        )
+
     def _create_crew(self) -> Crew:
         """
         Create the AI crew with agents and tasks
@@ -55,10 +124,12 @@ class MoMoAgent:
             Configured Crew instance
         """
         # Create tools
+        configs = get_configs()
+
         tools = []
-        if CONFIGS.serper_api_key:
+        if configs.serper_api_key:
             import os
-            os.environ["SERPER_API_KEY"] = CONFIGS.serper_api_key
+            os.environ["SERPER_API_KEY"] = configs.serper_api_key
             tools.append(SerperDevTool())
 
         # Create agent and tasks
@@ -128,24 +199,97 @@ class MoMoAgent:
         self.context_data.metric = metric
         self.context_data.systems = systems
 
-    def ask(self, user_input: str) -> str:
+    def _check_cancelled(self):
+        """Stop the current answer if it has been cancelled"""
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise AnswerCancelled()
+
+    def _on_llm_call_started(self, source, event):
+        """Start collecting the output of a new LLM call"""
+        self._check_cancelled()
+        self._llm_output = ""
+        self._answer_start = None
+        self._answer_length = 0
+
+    def _on_llm_stream_chunk(self, source, event):
+        """Forward the new part of the final answer to the token callback"""
+        self._check_cancelled()
+
+        if self._on_token is None or event.tool_call is not None:
+            return
+
+        self._llm_output += event.chunk
+
+        if self._answer_start is None:
+            marker = self._llm_output.find(FINAL_ANSWER_MARKER)
+            if marker < 0:
+                return
+            self._answer_start = marker + len(FINAL_ANSWER_MARKER)
+
+        answer = self._llm_output[self._answer_start:].lstrip()
+        if len(answer) > self._answer_length:
+            self._on_token(answer[self._answer_length:])
+            self._answer_length = len(answer)
+
+    def _cache_key(self, user_input: str) -> str:
+        """Get the cache key of a question asked with the current context"""
+        return ResponseCache.make_key(user_input, self.context_data, get_configs().model_to_use)
+
+    def get_cached_response(self, user_input: str) -> Optional[str]:
+        """
+        Get the stored answer to a question asked with the current context
+
+        Args:
+            user_input: The user's question or request
+
+        Returns:
+            The cached response, or None if the question has to be asked
+        """
+        return self.response_cache.get(self._cache_key(user_input))
+
+    @traced()
+    def ask(self,
+            user_input: str,
+            on_token: Callable[[str], None] | None = None,
+            cancel_event: threading.Event | None = None) -> Optional[str]:
         """
         Ask a question to the AI assistant
 
         Args:
             user_input: The user's question or request
+            on_token: Called with every new part of the answer while it is generated
+            cancel_event: Stops the answer at the next generated part or LLM call once set
 
         Returns:
-            The assistant's response in HTML format
+            The assistant's response in HTML format, which is also stored in the response cache,
+            or None if the answer has been cancelled
         """
-        # Execute the crew's tasks with inputs
-        response = self.crew.kickoff(inputs={
-            "input": user_input,
-            "prototype": self.context_data.prototype,
-            "results": self.context_data.results,
-            "metric": self.context_data.metric,
-            "systems": self.context_data.systems
-        })
+        global _answering_agent
+
+        cache_key = self._cache_key(user_input)
+        self._on_token = on_token
+        self._cancel_event = cancel_event
+        _answering_agent = self
+
+        try:
+            self._on_llm_call_started(None, None)
+
+            # Execute the crew's tasks with inputs
+            response = self.crew.kickoff(inputs={
+                "input": user_input,
+                "prototype": self.context_data.prototype,
+                "results": self.context_data.results,
+                "metric": self.context_data.metric,
+                "systems": self.context_data.systems
+            })
+        except AnswerCancelled:
+            return None
+        finally:
+            _answering_agent = None
+            self._on_token = None
+            self._cancel_event = None
+
+        self.response_cache.put(cache_key, response.raw)
 
         # Return the response as is (already in HTML format from the YAML prompt)
         return response.raw
@@ -1,3 +1,5 @@
 from .config_loader import AgentSettingsLoader
+from .context_builder import ResultsContextBuilder
+from .response_cache import ResponseCache
 
-__all__ = ["AgentSettingsLoader"]
+__all__ = ["AgentSettingsLoader", "ResultsContextBuilder", "ResponseCache"]
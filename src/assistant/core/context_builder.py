@@ -0,0 +1,182 @@
+import json
+import re
+
+import numpy as np
+
+from src.dtypes import ResultsMap, SimilarityMenshureType
+
+
+class ResultsContextBuilder:
+    """
+    Builds the result context of a question within a token budget.
+
+    Instead of the first rows of the results, the context holds a summary of all
+    of them (score statistics and histogram, ties with the best score, frequency
+    of the alternatives among the best combinations) and the rows most relevant
+    to the question: the best combinations, the ones with the alternatives named
+    in the question and, if asked for, the worst ones.
+
+    Tokens are estimated from the text length, the budget is a soft limit.
+    """
+
+    CHARS_PER_TOKEN = 4
+    HISTOGRAM_BINS = 10
+    TOP_N = 100
+
+    # Shares of the budget of the prototype and systems descriptions, the rows get the rest
+    PROTOTYPE_SHARE = 0.15
+    SYSTEMS_SHARE = 0.25
+
+    WORST_PATTERN = re.compile(r"\b(worst|lowest|least|bottom|bad|poor)", re.IGNORECASE)
+
+    def __init__(self, token_budget: int = 4000):
+        """
+        Initialize the builder
+
+        Args:
+            token_budget: Approximate number of tokens of the whole context
+        """
+        self.token_budget = token_budget
+
+    def _tokens(self, text: str) -> int:
+        return len(text) // self.CHARS_PER_TOKEN + 1
+
+    def _fit_lines(self, lines: list[str], budget: int) -> str:
+        """Join the lines which fit the budget and tell how many were left out"""
+        kept = []
+        used = 0
+
+        for line in lines:
+            used += self._tokens(line)
+            if used > budget and kept:
+                kept.append(f"... ({len(lines) - len(kept)} more)")
+                break
+            kept.append(line)
+
+        return "\n".join(kept)
+
+    def build(self, results: ResultsMap, user_input: str = "") -> dict:
+        """
+        Build the context of a question about the results
+
+        Args:
+            results: The results of the current tab
+            user_input: The user's question, used to choose the rows
+
+        Returns:
+            The prototype, results, metric and systems texts of the context
+        """
+        prototype = self._fit_lines(self._prototype_lines(results), int(self.token_budget * self.PROTOTYPE_SHARE))
+        systems = self._fit_lines(self._systems_lines(results), int(self.token_budget * self.SYSTEMS_SHARE))
+        summary = self._summary(results)
+
+        rows_budget = self.token_budget - self._tokens(prototype) - self._tokens(systems) - self._tokens(summary)
+        rows = self._rows(results, self._relevant_positions(results, user_input), rows_budget)
+
+        return dict(
+            prototype=prototype,
+            results=f"{summary}\n\nMost relevant combinations:\n{rows}",
+            metric=SimilarityMenshureType(results.similarity_measure_type).value,
+            systems=systems
+        )
+
+    def _prototype_lines(self, results: ResultsMap) -> list[str]:
+        """Describe the wanted features of every system, the other features are 0"""
+        prototype = results.prototype
+        lines = []
+
+        for system_name in results.systems_names:
+            states = prototype.xs(system_name, level=0) if system_name in prototype.index.get_level_values(0) else prototype.iloc[:0]
+            wanted = [str(feature) for feature, state in states.items() if state]
+            lines.append(f"{system_name} (1): {', '.join(wanted) if wanted else 'none'}; the other {len(states) - len(wanted)} features are 0")
+
+        return lines
+
+    def _systems_lines(self, results: ResultsMap) -> list[str]:
+        """Describe the features of every alternative, one line per alternative"""
+        lines = []
+
+        for system_name, system in results.systems.systems.items():
+            data = system.data
+            lines.append(f"{system_name}: {len(data.columns)} alternatives, {len(data.index)} features")
+
+            for alternative in data.columns:
+                features = data.index[data[alternative].to_numpy() != 0]
+                lines.append(f"  {alternative}: {', '.join(map(str, features)) or 'no features'}")
+
+        return lines
+
+    def _summary(self, results: ResultsMap) -> str:
+        """Summarize the scores of all the combinations"""
+        similarity = results.similarity
+        nan = np.isnan(similarity)
+        scores = similarity[~nan] if nan.any() else similarity
+
+        lines = [f"Combinations: {len(similarity):,} kept of {results.evaluated_combinations:,} evaluated"]
+
+        if not len(scores):
+            return "\n".join(lines)
+
+        best = scores.max()
+        lines.append(f"Similarity: best {best:.4f}, worst {scores.min():.4f}, mean {scores.mean():.4f}")
+        lines.append(f"Combinations tied with the best score: {np.count_nonzero(scores == best):,}")
+
+        counts, edges = np.histogram(scores, bins=self.HISTOGRAM_BINS)
+        lines.append("Histogram: " + ", ".join(f"[{low:.2f}, {high:.2f}]: {count:,}"
+                                               for low, high, count in zip(edges, edges[1:], counts) if count))
+
+        top = results.sorted_indices()[:self.TOP_N]
+        lines.append(f"Alternatives among the top {len(top)} combinations:")
+        for i, (system_name, names) in enumerate(zip(results.systems_names, results.alternatives)):
+            frequency = np.bincount(results.combinations[top, i].astype(np.int64), minlength=len(names))
+            common = np.argsort(-frequency, kind="stable")[:5]
+            lines.append(f"  {system_name}: " + ", ".join(f"{names[j]} ({frequency[j]})" for j in common if frequency[j]))
+
+        return "\n".join(lines)
+
+    def _relevant_positions(self, results: ResultsMap, user_input: str) -> np.ndarray:
+        """Get the positions of the combinations, most relevant to the question first"""
+        order = results.sorted_indices()
+        question = user_input.casefold()
+
+        # Number of alternatives named in the question in every combination
+        mentions = None
+        for i, names in enumerate(results.alternatives):
+            named = [j for j, name in enumerate(names)
+                     if re.search(rf"(?<!\w){re.escape(str(name).casefold())}(?!\w)", question)]
+            if named:
+                matches = np.isin(results.combinations[:, i], named).astype(np.int16)
+                mentions = matches if mentions is None else mentions + matches
+
+        groups = []
+        if mentions is not None:
+            ordered_mentions = mentions[order]
+            for count in range(int(ordered_mentions.max()), 0, -1):
+                groups.append(order[ordered_mentions == count][:self.TOP_N])
+
+        groups.append(order[:self.TOP_N])
+        if self.WORST_PATTERN.search(user_input):
+            # The combinations without a score are sorted last
+            worst = order[::-1][:self.TOP_N + np.count_nonzero(np.isnan(results.similarity))]
+            groups.append(worst[~np.isnan(results.similarity[worst])][:self.TOP_N])
+
+        positions = np.concatenate(groups)
+        _, first = np.unique(positions, return_index=True)
+        return positions[np.sort(first)]
+
+    def _rows(self, results: ResultsMap, positions: np.ndarray, budget: int) -> str:
+        """Serialize the rows at the positions which fit the budget"""
+        rows = []
+        used = 0
+
+        for position in positions:
+            row = [str(names[index]) for names, index in zip(results.alternatives, results.combinations[position])]
+            row.append(round(float(results.similarity[position]), 4))
+
+            text = json.dumps(row)
+            used += self._tokens(text)
+            if used > budget and rows:
+                break
+            rows.append(text)
+
+        return "[" + ",\n".join(rows) + "]"
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Iterator, Optional
+
+from ..models.data_model import AssistantData
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    On-disk LRU cache of the assistant's responses.
+
+    Responses are stored in a SQLite file, keyed by a hash of the question and of
+    the result context it was asked with. Entries older than the TTL are dropped,
+    and the least recently used ones are evicted once the cache holds more than
+    `max_entries` responses or `max_bytes` of text.
+
+    The cache never breaks the assistant: a failing disk only turns lookups into misses.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_entries: int = 500, max_bytes: int = 20 * 1024 * 1024):
+        """
+        Initialize the cache
+
+        Args:
+            path: Path of the SQLite file, created on first use
+            ttl: Maximum age of a response in seconds
+            max_entries: Maximum number of stored responses
+            max_bytes: Maximum total size of the stored responses
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._initialized = False
+
+    @staticmethod
+    def make_key(user_input: str, context: AssistantData, model: str = "") -> str:
+        """
+        Get the cache key of a question
+
+        Args:
+            user_input: The user's question, compared without case and extra whitespace
+            context: The result context the question is asked with
+            model: The language model answering the question
+
+        Returns:
+            Hex digest identifying the request
+        """
+        question = " ".join(user_input.split()).casefold()
+        payload = json.dumps({"input": question, "context": asdict(context), "model": model}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # A connection per operation, the cache is used from the worker threads.
+        connection = sqlite3.connect(self.path, timeout=5)
+
+        try:
+            if not self._initialized:
+                connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                    """
+                )
+                self._initialized = True
+
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a stored response and mark it as recently used
+
+        Args:
+            key: Key made by `make_key`
+
+        Returns:
+            The response, or None if it is missing or expired
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        now = time.time()
+        try:
+            with self._transaction() as connection:
+                connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                row = connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+
+                connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning("The assistant response cache is not readable: %s", e)
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Store a response and evict the entries over the limits
+
+        Args:
+            key: Key made by `make_key`
+            response: The assistant's response
+        """
+        now = time.time()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+            with self._transaction() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, response, len(response.encode("utf-8")), now, now)
+                )
+                self._evict(connection, now)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("The assistant response cache is not writable: %s", e)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop the expired entries, then the least recently used ones over the limits"""
+        connection.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        connection.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key,
+                           SUM(size) OVER (ORDER BY last_used DESC, created DESC) AS total_size,
+                           ROW_NUMBER() OVER (ORDER BY last_used DESC, created DESC) AS position
+                    FROM responses
+                )
+                WHERE total_size > ? OR position > ?
+            )
+            """,
+            (self.max_bytes, self.max_entries)
+        )
+
+    def clear(self) -> None:
+        """Remove every stored response"""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with self._transaction() as connection:
+                connection.execute("DELETE FROM responses")
+        except sqlite3.Error as e:
+            logger.warning("The assistant response cache is not writable: %s", e)
@@ -0,0 +1,179 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, Optional
+
+from .agent_provider import AgentProvider
+
+
+class AssistantRequest:
+    """
+    A question waiting for, or being answered by, the assistant.
+
+    `future` gets the response and whether it comes from the response cache. It is
+    cancelled when the request is cancelled, and fails with `asyncio.TimeoutError`
+    when the answer takes too long.
+    """
+
+    def __init__(self,
+                 key: tuple,
+                 user_input: str,
+                 build_context: Optional[Callable[[], dict]],
+                 on_token: Optional[Callable[[str], None]],
+                 loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.user_input = user_input
+        self.build_context = build_context
+        self.on_token = on_token
+        self.future = loop.create_future()
+        # Seen by the agent in its thread, which stops at the next generated part
+        self.cancel_event = threading.Event()
+
+    @property
+    def is_done(self) -> bool:
+        return self.future.done()
+
+    def cancel(self) -> None:
+        """Cancel the request, whether it is queued or being answered"""
+        self.cancel_event.set()
+        if not self.future.done():
+            self.future.cancel()
+
+
+class AssistantRequestScheduler:
+    """
+    Queue of the questions to the session's assistant, on the asyncio event loop.
+
+    The requests are answered one at a time, in order, in a single background thread,
+    since the agent and its crew are shared. A question asked again while the same
+    one is still pending is not queued twice. Requests are cancelled cooperatively:
+    a queued request is dropped and a running answer stops at its next generated part,
+    without killing its thread.
+    """
+
+    DEFAULT_TIMEOUT = 180.0
+
+    def __init__(self, agent_provider: AgentProvider, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Initialize the scheduler
+
+        Args:
+            agent_provider: The provider of the session's agent
+            timeout: Maximum number of seconds of an answer, waiting for the agent included
+        """
+        self.agent_provider = agent_provider
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="momo-assistant")
+        self._queue = deque()
+        self._pending = {}
+        self._runner = None
+
+    @staticmethod
+    def make_key(user_input: str, context_key: Hashable = None) -> tuple:
+        """Get the key identifying the same question about the same results"""
+        return " ".join(user_input.split()).casefold(), context_key
+
+    def submit(self,
+               user_input: str,
+               build_context: Optional[Callable[[], dict]] = None,
+               context_key: Hashable = None,
+               on_token: Optional[Callable[[str], None]] = None) -> AssistantRequest:
+        """
+        Queue a question
+
+        Args:
+            user_input: The user's question or request
+            build_context: Builds the results data given to the agent, called in the background thread
+            context_key: Identifies the results the question is about, for de-duplication
+            on_token: Called on the event loop with every new part of the answer
+
+        Returns:
+            The new request, or the pending one with the same question and context
+        """
+        key = self.make_key(user_input, context_key)
+        if key in self._pending:
+            return self._pending[key]
+
+        request = AssistantRequest(key, user_input, build_context, on_token, asyncio.get_event_loop())
+        request.future.add_done_callback(lambda _: self._pending.pop(key, None))
+        self._pending[key] = request
+        self._queue.append(request)
+
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.ensure_future(self._run())
+
+        return request
+
+    @property
+    def pending(self) -> list[AssistantRequest]:
+        """Get the requests which are queued or being answered"""
+        return list(self._pending.values())
+
+    def cancel_all(self) -> None:
+        """Cancel every pending request"""
+        for request in self.pending:
+            request.cancel()
+
+    async def _run(self):
+        """Answer the queued requests one after another"""
+        loop = asyncio.get_event_loop()
+
+        while self._queue:
+            request = self._queue.popleft()
+            if request.is_done:
+                continue
+
+            answer = loop.run_in_executor(self._executor, self._answer, request, loop)
+            # An abandoned answer may still fail later, its error is not reported.
+            answer.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+            # The request's future is cancelled if the user cancels it while it is answered.
+            await asyncio.wait({answer, request.future}, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if request.is_done:
+                # The thread stops at its next generated part, the next answer waits for it.
+                request.cancel_event.set()
+                continue
+
+            if not answer.done():
+                request.cancel_event.set()
+                request.future.set_exception(asyncio.TimeoutError(f"No answer after {self.timeout:g} seconds."))
+                continue
+
+            if answer.exception() is not None:
+                request.future.set_exception(answer.exception())
+            elif answer.result() is None:
+                request.future.cancel()
+            else:
+                request.future.set_result(answer.result())
+
+    def _answer(self, request: AssistantRequest, loop: asyncio.AbstractEventLoop) -> Optional[tuple[str, bool]]:
+        """Answer a request in the background thread, None if it has been cancelled"""
+        try:
+            # Waits here if the agent is still being built.
+            agent = self.agent_provider.get()
+        except Exception as e:
+            self.agent_provider.reset()
+            raise RuntimeError(f"The assistant is not available: {e}") from e
+
+        if request.cancel_event.is_set():
+            return None
+
+        if request.build_context is not None:
+            agent.set_results(**request.build_context())
+
+        response = agent.get_cached_response(request.user_input)
+        if response is not None:
+            return response, True
+
+        def on_token(token):
+            loop.call_soon_threadsafe(self._forward_token, request, token)
+
+        response = agent.ask(request.user_input, on_token=on_token, cancel_event=request.cancel_event)
+        return None if response is None else (response, False)
+
+    @staticmethod
+    def _forward_token(request: AssistantRequest, token: str):
+        if not request.is_done and request.on_token is not None:
+            request.on_token(token)
@@ -1,8 +1,10 @@
 from .result_map_dt import ResultsMap
 from .similiraty_dt import SimilarityMenshureType
+from .engine_type_dt import EngineType
 
 
 __all__ = [
     "ResultsMap",
     "SimilarityMenshureType",
+    "EngineType",
 ]
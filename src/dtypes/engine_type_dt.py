@@ -0,0 +1,19 @@
+##############################################################
+#   _____             _              _____                   #
+#  | ____|_ __   __ _(_)_ __   ___  |_   _|   _ _ __   ___   #
+#  |  _| | '_ \ / _` | | '_ \ / _ \   | || | | | '_ \ / _ \  #
+#  | |___| | | | (_| | | | | |  __/   | || |_| | |_) |  __/  #
+#  |_____|_| |_|\__, |_|_| |_|\___|   |_| \__, | .__/ \___|  #
+#               |___/                     |___/|_|           #
+##############################################################
+
+from enum import Enum
+
+
+class EngineType(str, Enum):
+    """
+    Class for similarity engines types.
+    """
+    NumPy = "numpy"
+    MoMo = "momo"
+    BranchAndBound = "branch_and_bound"
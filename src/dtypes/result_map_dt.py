@@ -7,27 +7,112 @@
 #                                                             |_|                         #
 ###########################################################################################
 
+import logging
+from collections.abc import Mapping
+from typing import Iterator
+
+import numpy as np
 import pandas as pd
 
 from momo.prototype import Prototype
 from momo.model import MultiSystemModel
 from momo.system_models.system_models import SystemModel
+from src.excel_workbook import ExcelWorkbook
+from src.momo_file import MOMO_EXTENSION, read_momo_file, write_momo_file
+from src.tracing import traced
 from .similiraty_dt import SimilarityMenshureType
 
 
+logger = logging.getLogger(__name__)
+
+# Number of loaded combinations logged at the debug level
+DEBUG_ROWS = 10
+
+
+class SimilarityMeasuresView(Mapping):
+    """
+    Read-only dict-like view of the similarity measures stored by ResultsMap.
+
+    Combinations are produced on demand from the columnar storage, so the view
+    does not hold any tuple of alternatives names.
+    """
+
+    def __init__(self, alternatives: list[np.ndarray], combinations: np.ndarray, similarity: np.ndarray):
+        self._alternatives = alternatives
+        self._combinations = combinations
+        self._similarity = similarity
+        self._flat_index = None
+
+    def __len__(self) -> int:
+        return len(self._similarity)
+
+    def __iter__(self) -> Iterator[tuple]:
+        columns = [names[self._combinations[:, i]] for i, names in enumerate(self._alternatives)]
+        return zip(*columns) if columns else iter(())
+
+    def __getitem__(self, combination: tuple) -> float:
+        if len(combination) != len(self._alternatives):
+            raise KeyError(combination)
+
+        try:
+            codes = np.array([[list(names).index(name) for names, name in zip(self._alternatives, combination)]])
+        except ValueError:
+            raise KeyError(combination)
+
+        # Combinations are looked up by their flat number in a lazily built sorted index.
+        if self._flat_index is None:
+            flat = self._flatten(self._combinations)
+            order = np.argsort(flat, kind="stable")
+            self._flat_index = (flat[order], order)
+
+        sorted_flat, order = self._flat_index
+        flat = self._flatten(codes)[0]
+        position = np.searchsorted(sorted_flat, flat)
+
+        if position == len(sorted_flat) or sorted_flat[position] != flat:
+            raise KeyError(combination)
+
+        return float(self._similarity[order[position]])
+
+    def _flatten(self, combinations: np.ndarray) -> np.ndarray:
+        """Number the combinations in the `itertools.product` order"""
+        if not self._alternatives:
+            return np.zeros(len(combinations), dtype=np.int64)
+
+        shape = tuple(max(len(names), 1) for names in self._alternatives)
+        return np.ravel_multi_index(tuple(combinations.T.astype(np.int64)), shape)
+
+    def items(self) -> Iterator[tuple[tuple, float]]:
+        """Iterate over the combinations and their similarity measures"""
+        return zip(self, self._similarity.tolist())
+
+    def values(self) -> Iterator[float]:
+        """Iterate over the similarity measures"""
+        return iter(self._similarity.tolist())
+
+
 class ResultsMap:
     """
     ResultsMap is a data type that holds the results of the similarity measure between systems.
     It stores the essential data without UI components and provides methods to access the data
     in different formats.
+
+    The combinations are stored column-wise: a 2-D array with the index of the alternative of
+    every system, a float64 similarity column and a per system table of alternatives names.
     """
 
+    SIMILARITY_DTYPE = np.float64
+    EXPORT_CHUNK_SIZE = 1 << 18
+
     def __init__(self,
                 data: dict = None,
                 systems: MultiSystemModel = None,
                 similarity_measures: dict[tuple, float] = None,
                 prototype: Prototype = None,
-                similarity_measure_type: SimilarityMenshureType|str = None
+                similarity_measure_type: SimilarityMenshureType|str = None,
+                evaluated_combinations: int = None,
+                combinations: np.ndarray = None,
+                similarity: np.ndarray = None
                 ):
         """
         Initialize the ResultsMap object.
@@ -48,20 +133,41 @@ class ResultsMap:
 
         similarity_measure_type : SimilarityMenshureType|str, optional
             Type of similarity measure used.
+
+        evaluated_combinations : int, optional
+            Number of evaluated combinations. When it is greater than the number of
+            similarity measures, only the best combinations were kept (top K mode).
+
+        combinations : np.ndarray, optional
+            Alternative indices (or an object array of alternatives names) of every
+            combination, one column per system. Used with `similarity` instead of
+            `similarity_measures`.
+
+        similarity : np.ndarray, optional
+            Similarity measure of every combination.
         """
         self._init_empty()
 
         if data is not None:
             self._init_from_data(data, similarity_measure_type)
+        elif all(x is not None for x in [systems, combinations, similarity, prototype, similarity_measure_type]):
+            self._init_from_arrays(systems, combinations, similarity, prototype, similarity_measure_type)
         elif all(x is not None for x in [systems, similarity_measures, prototype, similarity_measure_type]):
             self._init_from_parts(systems, similarity_measures, prototype, similarity_measure_type)
 
+        if evaluated_combinations is not None:
+            self._evaluated_combinations = evaluated_combinations
+
     def _init_empty(self):
         """Initialize with empty data"""
         self._systems = MultiSystemModel()
-        self._similarity_measures = {}
+        self._alternatives = []
+        self._combinations = np.empty((0, 0), dtype=np.uint8)
+        self._similarity = np.empty(0, dtype=self.SIMILARITY_DTYPE)
+        self._order = None
         self._prototype = Prototype()
         self._similarity_measure_type = SimilarityMenshureType.Sorensen_Dice
+        self._evaluated_combinations = None
 
     def _init_from_data(self, data: dict, similarity_measure_type: SimilarityMenshureType|str = None):
         """Initialize from a data dictionary"""
@@ -76,10 +182,11 @@ class ResultsMap:
         if similarity_measure_type is None and data.get("similarity_measure_type") is None:
             raise KeyError("Data should have a key 'similarity_measure_type'")
 
-        self._systems = data["systems"]
-        self._similarity_measures = data["similarity_measures"]
-        self._prototype = Prototype(data["prototype"])
-        self._similarity_measure_type = similarity_measure_type or data["similarity_measure_type"]
+        self._init_from_parts(data["systems"],
+                              data["similarity_measures"],
+                              Prototype(data["prototype"]),
+                              similarity_measure_type or data["similarity_measure_type"])
+        self._evaluated_combinations = data.get("evaluated_combinations")
 
     def _init_from_parts(self,
                         systems: MultiSystemModel,
@@ -87,11 +194,63 @@ class ResultsMap:
                         prototype: Prototype,
                         similarity_measure_type: SimilarityMenshureType|str):
         """Initialize from individual components"""
+        names = np.empty((len(similarity_measures), len(systems.get_system_names())), dtype=object)
+        if len(similarity_measures):
+            names[:] = list(similarity_measures.keys())
+
+        similarity = np.fromiter(similarity_measures.values(), dtype=np.float64, count=len(similarity_measures))
+        self._init_from_arrays(systems, names, similarity, prototype, similarity_measure_type)
+
+    def _init_from_arrays(self,
+                          systems: MultiSystemModel,
+                          combinations: np.ndarray,
+                          similarity: np.ndarray,
+                          prototype: Prototype,
+                          similarity_measure_type: SimilarityMenshureType|str):
+        """Initialize from the columnar arrays"""
         self._systems = systems
-        self._similarity_measures = similarity_measures
+        self._alternatives = self._system_alternatives(systems)
+
+        if combinations.dtype == object:
+            combinations = self._encode_columns(combinations)
+
+        self._set_columns(combinations, similarity)
         self._prototype = prototype
         self._similarity_measure_type = similarity_measure_type
 
+    @staticmethod
+    def _system_alternatives(systems: MultiSystemModel) -> list[np.ndarray]:
+        """Build the table of alternatives names of every system"""
+        return [np.asarray(system.get_alternatives(), dtype=object) for system in systems.systems.values()]
+
+    def _encode_columns(self, names: np.ndarray) -> np.ndarray:
+        """
+        Convert the alternatives names of the combinations into indices.
+
+        Names unknown to a system are appended to its table of alternatives names.
+        """
+        combinations = np.empty(names.shape, dtype=np.int64)
+
+        for i in range(names.shape[1]):
+            codes = pd.Index(self._alternatives[i]).get_indexer(names[:, i])
+            unknown = codes < 0
+
+            if unknown.any():
+                extra = pd.unique(names[unknown, i])
+                self._alternatives[i] = np.concatenate((self._alternatives[i], np.asarray(extra, dtype=object)))
+                codes[unknown] = len(self._alternatives[i]) - len(extra) + pd.Index(extra).get_indexer(names[unknown, i])
+
+            combinations[:, i] = codes
+
+        return combinations
+
+    def _set_columns(self, combinations: np.ndarray, similarity: np.ndarray):
+        """Store the columns using the smallest index type"""
+        largest_index = max((len(names) for names in self._alternatives), default=1) - 1
+        self._combinations = np.asarray(combinations).astype(np.min_scalar_type(max(largest_index, 0)), copy=False)
+        self._similarity = np.asarray(similarity).astype(self.SIMILARITY_DTYPE, copy=False)
+        self._order = None
+
     @property
     def systems_names(self) -> list[str]:
         """Get list of system names"""
@@ -103,9 +262,24 @@ class ResultsMap:
         return self._systems
 
     @property
-    def similarity_measures(self) -> dict[tuple, float]:
+    def alternatives(self) -> list[np.ndarray]:
+        """Get the table of alternatives names of every system"""
+        return self._alternatives
+
+    @property
+    def combinations(self) -> np.ndarray:
+        """Get the alternative indices of every combination, one column per system"""
+        return self._combinations
+
+    @property
+    def similarity(self) -> np.ndarray:
+        """Get the similarity measure of every combination"""
+        return self._similarity
+
+    @property
+    def similarity_measures(self) -> SimilarityMeasuresView:
         """Get the similarity measures between systems"""
-        return self._similarity_measures
+        return SimilarityMeasuresView(self._alternatives, self._combinations, self._similarity)
 
     @property
     def prototype(self) -> Prototype:
@@ -117,24 +291,112 @@ class ResultsMap:
         """Get the similarity measure type"""
         return self._similarity_measure_type
 
+    @property
+    def evaluated_combinations(self) -> int:
+        """Get the number of evaluated combinations"""
+        if self._evaluated_combinations is None:
+            return len(self._similarity)
+        return self._evaluated_combinations
+
+    @property
+    def is_truncated(self) -> bool:
+        """Check if only the best combinations were kept"""
+        return self.evaluated_combinations > len(self._similarity)
+
     @property
     def data(self) -> dict:
         """Get all data as a dictionary"""
         return {
             "systems": self._systems,
-            "similarity_measures": self._similarity_measures,
+            "similarity_measures": self.similarity_measures,
             "prototype": self._prototype,
-            "similarity_measure_type": self._similarity_measure_type
+            "similarity_measure_type": self._similarity_measure_type,
+            "evaluated_combinations": self.evaluated_combinations
         }
 
+    def sorted_indices(self) -> np.ndarray:
+        """Get the positions of the combinations sorted by similarity, most similar first"""
+        if self._order is None:
+            self._order = np.argsort(-self._similarity, kind="stable")
+        return self._order
+
     @property
+    @traced()
     def results(self) -> pd.DataFrame:
         """Get results as a pandas DataFrame"""
-        columns = list(self.systems_names) + ["Similarity"]
-        data = [(*list(combinations), similarity_result)
-                for combinations, similarity_result in self._similarity_measures.items()]
-        return pd.DataFrame(data=data, columns=columns).sort_values(by="Similarity", ascending=False)
+        return self._results_frame(self.sorted_indices())
+
+    def _results_frame(self, order: np.ndarray) -> pd.DataFrame:
+        """Build the results DataFrame of the combinations at the given positions"""
+        data = {
+            system_name: pd.Categorical.from_codes(self._combinations[order, i], categories=pd.Index(names, dtype=object))
+            for i, (system_name, names) in enumerate(zip(self.systems_names, self._alternatives))
+        }
+        data["Similarity"] = self._similarity[order]
+        return pd.DataFrame(data=data, index=order)
+
+    def iter_results(self, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Get the results like `results`, as consecutive DataFrames of at most `chunk_size` rows.
+
+        Only one chunk is materialized at a time, so the memory used does not
+        depend on the number of combinations.
+        """
+        order = self.sorted_indices()
+        for start in range(0, len(order), chunk_size):
+            yield self._results_frame(order[start:start + chunk_size])
+
+    def to_csv(self, file_path: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> None:
+        """
+        Save the results to a CSV file, chunk by chunk
 
+        Parameters:
+        -----------
+        file_path : str
+            Path to save the CSV file
+
+        chunk_size : int, optional
+            Number of rows written at once
+        """
+        with open(file_path, "w", newline="", encoding="utf-8") as file:
+            header = True
+            for chunk in self.iter_results(chunk_size):
+                chunk.to_csv(file, header=header, index=False)
+                header = False
+
+            if header:
+                self._results_frame(np.empty(0, dtype=np.int64)).to_csv(file, index=False)
+
+    def to_parquet(self, file_path: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> None:
+        """
+        Save the results to a Parquet file, one row group per chunk
+
+        Requires the optional `pyarrow` package.
+
+        Parameters:
+        -----------
+        file_path : str
+            Path to save the Parquet file
+
+        chunk_size : int, optional
+            Number of rows of every row group
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires the 'pyarrow' package.") from e
+
+        empty = pa.Table.from_pandas(self._results_frame(np.empty(0, dtype=np.int64)), preserve_index=False)
+
+        with pq.ParquetWriter(file_path, empty.schema) as writer:
+            for chunk in self.iter_results(chunk_size):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=empty.schema, preserve_index=False))
+
+            if len(self._similarity) == 0:
+                writer.write_table(empty)
+
+    @traced()
     def to_excel(self, file_path: str) -> None:
         """
         Save all data to an Excel file, including system states and results
@@ -149,7 +411,8 @@ class ResultsMap:
                 'file_type': 'MoMo_Results',
                 'version': '1.0',
                 'date': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'similarity_measure_type': self.similarity_measure_type
+                'similarity_measure_type': SimilarityMenshureType(self.similarity_measure_type).value,
+                'evaluated_combinations': self.evaluated_combinations
             }])
             metadata.to_excel(writer, sheet_name='Metadata', index=False)
             self.results.to_excel(writer, sheet_name="Similarity_Results", index=False)
@@ -168,92 +431,195 @@ class ResultsMap:
                     system.data.to_excel(writer, sheet_name=f"System_{system_name}")
 
     @classmethod
-    def from_excel(cls, file_path: str):
+    @traced()
+    def from_excel(cls, file_path: str | ExcelWorkbook):
         """
         Load results from an Excel file
 
         Parameters:
         -----------
-        file_path : str
-            Path to the Excel file containing saved results
+        file_path : str | ExcelWorkbook
+            Path to the Excel file containing saved results, or an already opened workbook.
+            Every sheet is parsed once.
 
         Returns:
         --------
         ResultsMap
             A new ResultsMap object with the loaded data
         """
-        def is_valide_file(file_path: str) -> bool:
+        def is_valide_file(workbook: ExcelWorkbook) -> bool:
             """Check if the file is a valid results file"""
             try:
-                excel_file = pd.ExcelFile(file_path)
-                if "Metadata" in excel_file.sheet_names:
-                    metadata = pd.read_excel(file_path, sheet_name="Metadata")
+                if "Metadata" in workbook.sheet_names:
+                    metadata = workbook.parse("Metadata")
                     return "file_type" in metadata.columns and "MoMo_Results" in metadata["file_type"].values
                 return False
             except Exception as e:
-                print(f"Error validating file: {e}")
+                logger.warning("Error validating file: %s", e)
                 return False
 
 
-        def load_prototype_data(file_path: str) -> Prototype:
+        def load_prototype_data(workbook: ExcelWorkbook) -> Prototype:
             """Read prototype data from the Excel file"""
-            prototype_df = pd.read_excel(file_path, sheet_name="Prototype", index_col=(0, 1))
+            prototype_df = workbook.parse("Prototype", index_col=(0, 1))
             return Prototype(prototype_df.iloc[:, 0].values, index=prototype_df.index)
 
 
-        def load_systems_data(file_path: str) -> list[SystemModel]:
+        def load_systems_data(workbook: ExcelWorkbook) -> list[SystemModel]:
             """Read systems data from the Excel file"""
             systems_data = []
-            with pd.ExcelFile(file_path) as excel_file:
-                for sheet_name in excel_file.sheet_names:
-                    if sheet_name.startswith("System_"):
-                        sheet_data = excel_file.parse(sheet_name, index_col=0)
-                        system_name = sheet_name.replace("System_", "")
-                        systems_data.append(SystemModel(system_name, sheet_data))
+            for sheet_name in workbook.sheet_names:
+                if sheet_name.startswith("System_"):
+                    sheet_data = workbook.parse(sheet_name, index_col=0)
+                    system_name = sheet_name.replace("System_", "")
+                    systems_data.append(SystemModel(system_name, sheet_data))
 
             return systems_data
 
-        def load_similarity_measures(file_path: str) -> dict[tuple, float]:
-            """Read similarity measures from the Excel file"""
-            results_df = pd.read_excel(file_path, sheet_name="Similarity_Results", header=0)
-            similarity_measures = {}
-
-            for _, row in results_df.iterrows():
-                combination = tuple(row.iloc[:-1].values)
-                similarity = float(row.iloc[-1])
-                print(f"Combination: {combination}, Similarity: {similarity}")
-                similarity_measures[combination] = similarity
-
-            return similarity_measures
+        def load_similarity_results(workbook: ExcelWorkbook) -> pd.DataFrame:
+            """Read similarity results from the Excel file"""
+            return workbook.parse("Similarity_Results", header=0)
 
-        def load_similarity_measure_type(file_path: str) -> SimilarityMenshureType:
+        def load_similarity_measure_type(workbook: ExcelWorkbook) -> SimilarityMenshureType:
             """Read similarity measure type from the Excel file"""
-            metadata_df = pd.read_excel(file_path, sheet_name="Metadata")
+            metadata_df = workbook.parse("Metadata")
             if 'similarity_measure_type' in metadata_df.columns:
                 return SimilarityMenshureType(metadata_df['similarity_measure_type'].iloc[0])
             return SimilarityMenshureType.Sorensen_Dice
 
+        def load_evaluated_combinations(workbook: ExcelWorkbook) -> int | None:
+            """Read the number of evaluated combinations from the Excel file"""
+            metadata_df = workbook.parse("Metadata")
+            if 'evaluated_combinations' in metadata_df.columns:
+                return int(metadata_df['evaluated_combinations'].iloc[0])
+            return None
+
         try:
-            if not is_valide_file(file_path):
-                raise ValueError("Invalid results file format")
+            with ExcelWorkbook.session(file_path) as workbook:
+                if not is_valide_file(workbook):
+                    raise ValueError("Invalid results file format")
 
-            systems = MultiSystemModel(load_systems_data(file_path))
-            print(f"Loaded systems:\n {systems}")
+                systems = MultiSystemModel(load_systems_data(workbook))
+                logger.info("Loaded systems: %s", systems.get_system_names())
 
-            similarity_measures = load_similarity_measures(file_path)
-            print(f"Loaded similarity measures:\n {similarity_measures}")
+                results_df = load_similarity_results(workbook)
+                logger.info("Loaded %d similarity results", len(results_df))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("First loaded similarity results:\n%s%s", results_df.head(DEBUG_ROWS),
+                                 f"\n... ({len(results_df) - DEBUG_ROWS} more)" if len(results_df) > DEBUG_ROWS else "")
 
-            prototype = load_prototype_data(file_path)
-            print(f"Loaded prototype:\n {prototype}")
+                prototype = load_prototype_data(workbook)
+                logger.debug("Loaded prototype:\n%s", prototype)
 
-            similarity_measure_type = load_similarity_measure_type(file_path)
-            print(f"Loaded similarity measure type from the file: {similarity_measure_type}")
+                similarity_measure_type = load_similarity_measure_type(workbook)
+                logger.info("Loaded similarity measure type from the file: %s", similarity_measure_type)
+
+                evaluated_combinations = load_evaluated_combinations(workbook)
 
             return cls(
                 systems=systems,
-                similarity_measures=similarity_measures,
+                combinations=results_df.iloc[:, :-1].to_numpy(dtype=object),
+                similarity=results_df.iloc[:, -1].to_numpy(dtype=np.float64),
                 prototype=prototype,
                 similarity_measure_type=similarity_measure_type,
+                evaluated_combinations=evaluated_combinations,
             )
         except Exception as e:
             raise ValueError(f"Failed to load results: {str(e)}")
+
+    def to_momo(self, file_path: str) -> None:
+        """
+        Save all data to a native MoMo results file.
+
+        The combinations, similarity measures and their sorted order are stored as
+        raw arrays, so the file can be opened without parsing or sorting the results.
+
+        Parameters:
+        -----------
+        file_path : str
+            Path to save the MoMo results file
+        """
+        header = {
+            "file_type": "MoMo_Results",
+            "date": pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "similarity_measure_type": self.similarity_measure_type,
+            "evaluated_combinations": self.evaluated_combinations,
+            "prototype": [list(index) for index in self.prototype.index],
+            "systems": [
+                {
+                    "name": system_name,
+                    "features": list(self._systems.systems[system_name].data.index),
+                    "alternatives": list(self._systems.systems[system_name].data.columns),
+                }
+                for system_name in self.systems_names
+            ],
+            "alternatives": [names.tolist() for names in self._alternatives],
+        }
+
+        arrays = {
+            "combinations": self._combinations,
+            "similarity": self._similarity,
+            "order": self.sorted_indices().astype(np.min_scalar_type(max(len(self._similarity) - 1, 0))),
+            "prototype": self.prototype.to_numpy(dtype=np.int64),
+        }
+        for i, system_name in enumerate(self.systems_names):
+            arrays[f"system_{i}"] = self._systems.systems[system_name].data.to_numpy(dtype=np.int64)
+
+        write_momo_file(file_path, header, arrays)
+
+    @classmethod
+    def from_momo(cls, file_path: str):
+        """
+        Load results from a native MoMo results file
+
+        The results columns are memory-mapped, so opening a file does not depend
+        on the number of combinations it holds.
+
+        Parameters:
+        -----------
+        file_path : str
+            Path to the MoMo results file
+
+        Returns:
+        --------
+        ResultsMap
+            A new ResultsMap object with the loaded data
+        """
+        try:
+            header, arrays = read_momo_file(file_path)
+
+            if header.get("file_type") != "MoMo_Results":
+                raise ValueError("Invalid results file format")
+
+            systems = MultiSystemModel([
+                SystemModel(system["name"],
+                            np.array(arrays[f"system_{i}"]),
+                            features=system["features"],
+                            alternatives=system["alternatives"])
+                for i, system in enumerate(header["systems"])
+            ])
+
+            if header["prototype"]:
+                prototype_index = pd.MultiIndex.from_tuples([tuple(index) for index in header["prototype"]])
+                prototype = Prototype(np.array(arrays["prototype"]), index=prototype_index)
+            else:
+                prototype = Prototype()
+
+            results = cls(evaluated_combinations=header.get("evaluated_combinations"))
+            results._systems = systems
+            results._alternatives = [np.asarray(names, dtype=object) for names in header["alternatives"]]
+            results._set_columns(arrays["combinations"], arrays["similarity"])
+            results._order = arrays["order"]
+            results._prototype = prototype
+            results._similarity_measure_type = SimilarityMenshureType(header["similarity_measure_type"])
+
+            return results
+        except Exception as e:
+            raise ValueError(f"Failed to load results: {str(e)}")
+
+    @classmethod
+    def from_file(cls, file_path: str):
+        """Load results from a MoMo results file or an Excel file, depending on the extension"""
+        if file_path.endswith(MOMO_EXTENSION):
+            return cls.from_momo(file_path)
+        return cls.from_excel(file_path)
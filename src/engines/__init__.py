@@ -0,0 +1,21 @@
+from .base import SimilarityEngine, CalculationCancelled
+from .momo_engine import MoMoEngine
+from .numpy_engine import NumpyEngine, EncodedModel
+from .branch_and_bound import BranchAndBoundEngine, SearchStats
+from .factory import create_engine
+from .parallel import ParallelCalculation
+from .incremental import IncrementalScorer
+
+
+__all__ = [
+    "SimilarityEngine",
+    "CalculationCancelled",
+    "MoMoEngine",
+    "NumpyEngine",
+    "EncodedModel",
+    "BranchAndBoundEngine",
+    "SearchStats",
+    "create_engine",
+    "ParallelCalculation",
+    "IncrementalScorer",
+]
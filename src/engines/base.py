@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+import numpy as np
+
+from momo.prototype import Prototype
+from momo.system_models.system_models import MultiSystemModel, SystemModel
+from src.dtypes import SimilarityMenshureType
+from .top_k import TopK
+
+
+class CalculationCancelled(Exception):
+    """Raised by an engine when its calculation has been cancelled"""
+
+
+class SimilarityEngine(ABC):
+    """
+    Base class for the engines which score every combination of the systems
+    alternatives against the prototype.
+    """
+
+    # Coefficient `u` of the momo similarity formula:
+    # 2|A ∩ B| / ((1 + u)(|A| + |B|) - 2u|A ∩ B|)
+    _U_COEFFICIENTS = {
+        SimilarityMenshureType.Sorensen_Dice: 0,
+        SimilarityMenshureType.Jaccard: 1,
+    }
+
+    def __init__(self, cancel_event=None):
+        """
+        Initialize the engine.
+
+        Parameters:
+        -----------
+        cancel_event : threading.Event | multiprocessing.Event, optional
+            Event which stops the calculation once it is set.
+        """
+        self.cancel_event = cancel_event
+
+    def check_cancelled(self) -> None:
+        """Raise `CalculationCancelled` if the cancel event is set"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise CalculationCancelled()
+
+    @abstractmethod
+    def get_similarity_measures(self,
+                                systems: MultiSystemModel | list[SystemModel],
+                                prototype: Prototype,
+                                similarity_measure_type: SimilarityMenshureType | str) -> dict[tuple, float]:
+        """
+        Calculate the similarity measure for every combination of alternatives.
+
+        Parameters:
+        -----------
+        systems : MultiSystemModel | list[SystemModel]
+            Systems whose alternatives are combined.
+
+        prototype : Prototype
+            Prototype the combinations are compared with.
+
+        similarity_measure_type : SimilarityMenshureType | str
+            Type of similarity measure to use.
+
+        Returns:
+        --------
+        dict[tuple, float]
+            Similarity measure keyed by the combination of alternatives names.
+        """
+        pass
+
+    @classmethod
+    def get_u(cls, similarity_measure_type: SimilarityMenshureType | str) -> int:
+        """Get the `u` coefficient for the given similarity measure type"""
+        return cls._U_COEFFICIENTS[SimilarityMenshureType(similarity_measure_type)]
+
+    @abstractmethod
+    def iter_similarity_measures(self,
+                                 systems: MultiSystemModel | list[SystemModel],
+                                 prototype: Prototype,
+                                 similarity_measure_type: SimilarityMenshureType | str) -> Iterator[tuple[tuple, float]]:
+        """
+        Stream the similarity measure of every combination of alternatives.
+
+        Yields:
+        -------
+        tuple[tuple, float]
+            Combination of alternatives names and its similarity measure,
+            in the `itertools.product` order.
+        """
+        pass
+
+    def get_top_similarity_measures(self,
+                                    systems: MultiSystemModel | list[SystemModel],
+                                    prototype: Prototype,
+                                    similarity_measure_type: SimilarityMenshureType | str,
+                                    k: int) -> tuple[dict[tuple, float], int]:
+        """
+        Calculate the K combinations most similar to the prototype.
+
+        The combinations are streamed through a bounded heap, so only K of them
+        are held in memory at any time.
+
+        Parameters:
+        -----------
+        k : int
+            Number of the best combinations to keep.
+
+        Returns:
+        --------
+        tuple[dict[tuple, float], int]
+            The best combinations, best first, and the number of evaluated combinations.
+        """
+        top = TopK(k)
+        evaluated = 0
+
+        for combination, similarity in self.iter_similarity_measures(systems, prototype, similarity_measure_type):
+            top.push(similarity, evaluated, combination)
+            evaluated += 1
+
+        return dict(top.items()), evaluated
+
+    def score(self,
+              systems: MultiSystemModel | list[SystemModel],
+              prototype: Prototype,
+              similarity_measure_type: SimilarityMenshureType | str,
+              top_k: int | None = None) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Score the combinations into the columnar form stored by `ResultsMap`.
+
+        Parameters:
+        -----------
+        top_k : int, optional
+            Number of the best combinations to keep, all of them by default.
+
+        Returns:
+        --------
+        tuple[np.ndarray, np.ndarray, int]
+            Alternative indices of the combinations, one column per system, their
+            similarity measures and the number of evaluated combinations.
+        """
+        systems = MultiSystemModel(systems)
+
+        if top_k is None:
+            similarity_measures = self.get_similarity_measures(systems, prototype, similarity_measure_type)
+            evaluated_combinations = len(similarity_measures)
+        else:
+            similarity_measures, evaluated_combinations = self.get_top_similarity_measures(
+                systems, prototype, similarity_measure_type, top_k
+            )
+
+        lookups = [{name: index for index, name in enumerate(system.get_alternatives())}
+                   for system in systems.systems.values()]
+        combinations = np.array([[lookup[name] for lookup, name in zip(lookups, combination)]
+                                 for combination in similarity_measures], dtype=np.int64)
+        similarities = np.fromiter(similarity_measures.values(), dtype=np.float64, count=len(similarity_measures))
+
+        return combinations.reshape(len(similarity_measures), len(lookups)), similarities, evaluated_combinations
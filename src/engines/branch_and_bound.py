@@ -0,0 +1,120 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.dtypes import SimilarityMenshureType
+from .numpy_engine import NumpyEngine, EncodedModel, similarity
+from .top_k import TopK
+
+
+@dataclass
+class SearchStats:
+    """Statistics of a branch and bound search"""
+    visited_nodes: int = 0
+    pruned_nodes: int = 0
+    scored_combinations: int = 0
+
+
+class BranchAndBoundEngine(NumpyEngine):
+    """
+    Engine which finds the K best combinations without enumerating all of them.
+
+    The combination space is a tree whose level `d` fixes the alternative of the
+    system `d`. For a node, the similarity of any combination below it is bounded
+    from above by taking the largest remaining intersections and the smallest
+    remaining cardinalities. Subtrees whose bound cannot beat the current K-th best
+    combination are skipped. The trailing systems form the leaves, which are scored
+    as whole grids like in `NumpyEngine`.
+
+    The search is exact: it keeps the same combinations as the brute force top K,
+    ties included. Without top K nothing can be pruned, so the engine falls back
+    to the brute force scoring.
+    """
+
+    DEFAULT_LEAF_SIZE = 1 << 12
+
+    def __init__(self,
+                 block_size: int = NumpyEngine.DEFAULT_BLOCK_SIZE,
+                 leaf_size: int = DEFAULT_LEAF_SIZE,
+                 cancel_event=None):
+        """
+        Initialize the engine.
+
+        Parameters:
+        -----------
+        block_size : int, optional
+            Approximate number of combinations scored at once by the brute force scoring.
+
+        leaf_size : int, optional
+            Maximal number of combinations in a leaf grid.
+
+        cancel_event : threading.Event | multiprocessing.Event, optional
+            Event which stops the calculation once it is set.
+        """
+        super().__init__(block_size, cancel_event)
+        self.leaf_size = leaf_size
+        self.stats = SearchStats()
+
+    def _find_top(self, encoded: EncodedModel, similarity_measure_type: SimilarityMenshureType | str, k: int) -> TopK:
+        self.stats = SearchStats()
+
+        if encoded.size == 0 or encoded.prototype_cardinality == 0:
+            # Every similarity is zero or NaN, there is nothing to bound.
+            self.stats.scored_combinations = encoded.size
+            return super()._find_top(encoded, similarity_measure_type, k)
+
+        top = TopK(k)
+        self._search(encoded, self.get_u(similarity_measure_type), top)
+        return top
+
+    def _search(self, encoded: EncodedModel, u: int, top: TopK) -> None:
+        """Run the depth-first search over the combination tree"""
+        shape = encoded.shape
+        prototype_cardinality = encoded.prototype_cardinality
+
+        split = len(shape)
+        leaf_size = 1
+        while split > 0 and leaf_size * shape[split - 1] <= self.leaf_size:
+            split -= 1
+            leaf_size *= shape[split]
+
+        leaf_intersections = self._outer_sum(encoded.intersections[split:])
+        leaf_cardinalities = self._outer_sum(encoded.cardinalities[split:])
+
+        # Best possible contribution of the systems from `depth` to the end.
+        max_intersections = np.cumsum([0] + [values.max() for values in reversed(encoded.intersections)])[::-1]
+        min_cardinalities = np.cumsum([0] + [values.min() for values in reversed(encoded.cardinalities)])[::-1]
+        subtree_sizes = np.cumprod((1,) + shape[::-1])[::-1]
+
+        def upper_bound(intersection: np.ndarray, cardinality: np.ndarray) -> np.ndarray:
+            # A combination never has more common features than features.
+            return similarity(intersection, np.maximum(cardinality, intersection), prototype_cardinality, u)
+
+        def visit(depth: int, prefix: int, intersection: int, cardinality: int) -> None:
+            self.check_cancelled()
+            self.stats.visited_nodes += 1
+
+            if depth == split:
+                scores = similarity(intersection + leaf_intersections,
+                                    cardinality + leaf_cardinalities,
+                                    prototype_cardinality, u)
+                top.push_block(prefix * leaf_size, scores)
+                self.stats.scored_combinations += len(scores)
+                return
+
+            child_intersections = intersection + encoded.intersections[depth]
+            child_cardinalities = cardinality + encoded.cardinalities[depth]
+            bounds = upper_bound(child_intersections + max_intersections[depth + 1],
+                                 child_cardinalities + min_cardinalities[depth + 1])
+
+            # Visit the most promising children first to raise the K-th best score early.
+            for child in np.argsort(-bounds, kind="stable").tolist():
+                child_prefix = prefix * shape[depth] + child
+
+                if not top.can_improve(float(bounds[child]), child_prefix * int(subtree_sizes[depth + 1])):
+                    self.stats.pruned_nodes += 1
+                    continue
+
+                visit(depth + 1, child_prefix, child_intersections[child], child_cardinalities[child])
+
+        visit(0, 0, 0, 0)
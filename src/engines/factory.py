@@ -0,0 +1,27 @@
+from src.dtypes import EngineType
+from .base import SimilarityEngine
+from .momo_engine import MoMoEngine
+from .numpy_engine import NumpyEngine
+from .branch_and_bound import BranchAndBoundEngine
+
+
+_ENGINES = {
+    EngineType.NumPy: NumpyEngine,
+    EngineType.MoMo: MoMoEngine,
+    EngineType.BranchAndBound: BranchAndBoundEngine,
+}
+
+
+def create_engine(engine_type: EngineType | str = EngineType.NumPy, **kwargs) -> SimilarityEngine:
+    """
+    Create the similarity engine of the given type.
+
+    Parameters:
+    -----------
+    engine_type : EngineType | str, optional
+        Type of the engine, NumPy by default.
+
+    **kwargs
+        Arguments passed to the engine constructor.
+    """
+    return _ENGINES[EngineType(engine_type)](**kwargs)
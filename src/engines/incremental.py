@@ -0,0 +1,301 @@
+import threading
+
+import numpy as np
+
+from momo.prototype import Prototype
+from momo.system_models.system_models import SystemModel
+
+from src.dtypes import SimilarityMenshureType
+from .base import CalculationCancelled
+from .numpy_engine import NumpyEngine, EncodedModel, similarity
+from .branch_and_bound import BranchAndBoundEngine
+
+
+class SystemsEdit:
+    """
+    Alternatives of every system changed since the last scored systems.
+
+    The systems must have the same names and features. Alternatives are matched by
+    name: for every system, `kept` holds the previous indices of the alternatives
+    which are still there and `kept_at` their new indices, and `changed` holds the
+    new indices of the added alternatives and of the kept ones whose features changed.
+    """
+
+    def __init__(self,
+                 kept: list[np.ndarray],
+                 kept_at: list[np.ndarray],
+                 changed: list[np.ndarray],
+                 keeps_layout: bool):
+        self.kept = kept
+        self.kept_at = kept_at
+        self.changed = changed
+        # Every alternative stayed at its index, so the combinations are the same
+        self.keeps_layout = keeps_layout
+
+    @property
+    def is_empty(self) -> bool:
+        return self.keeps_layout and not any(len(changed) for changed in self.changed)
+
+
+class IncrementalScorer:
+    """
+    Re-scores the combinations of the last scored systems after a small change.
+
+    The per alternative intersections |A ∩ B| and cardinalities |A| of the last run
+    are kept in an `EncodedModel`, along with a snapshot of the systems and, without
+    top K, the combinations and their scores in the product order.
+
+    - A new prototype only changes the intersections of the systems owning the
+      changed features, which are updated by their delta. Every combination is
+      scored again from the sums, without encoding the systems or starting worker
+      processes.
+    - An edited system only changes the scores of the combinations with its edited
+      or added alternatives, which are the only ones scored again. The scores of the
+      other combinations are reused, moved to their new position in the product
+      order if alternatives were added or removed. When the edit touches more than
+      `MAX_RESCORED_FRACTION` of the combinations, they are all scored again.
+
+    The scores are the same as the ones of a full calculation, whatever its engine.
+    """
+
+    BLOCK_SIZE = NumpyEngine.DEFAULT_BLOCK_SIZE
+    # Scoring the grids of the edited alternatives costs more per combination than a full pass.
+    MAX_RESCORED_FRACTION = 0.5
+
+    def __init__(self):
+        self._snapshot = None
+        self._encoded = None
+        self._combinations = None
+        self._similarity = None
+        self._similarity_measure_type = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _take_snapshot(systems: list[SystemModel]) -> list[tuple]:
+        return [(system.name, tuple(system.data.index), tuple(system.data.columns), system.data.to_numpy() != 0)
+                for system in systems]
+
+    def _edit(self, snapshot: list[tuple]) -> SystemsEdit | None:
+        """Compare the systems with the last scored ones, None if they are not comparable"""
+        if self._snapshot is None or len(snapshot) != len(self._snapshot):
+            return None
+
+        kept, kept_at, changed = [], [], []
+        keeps_layout = True
+
+        for (name, features, alternatives, values), (old_name, old_features, old_alternatives, old_values) \
+                in zip(snapshot, self._snapshot):
+            if name != old_name or features != old_features:
+                return None
+
+            old_positions = {alternative: position for position, alternative in enumerate(old_alternatives)}
+            system_kept_at = np.array([position for position, alternative in enumerate(alternatives)
+                                       if alternative in old_positions], dtype=np.int64)
+            system_kept = np.array([old_positions[alternatives[position]] for position in system_kept_at], dtype=np.int64)
+
+            is_changed = np.ones(len(alternatives), dtype=bool)
+            is_changed[system_kept_at] = (values[:, system_kept_at] != old_values[:, system_kept]).any(axis=0)
+
+            kept.append(system_kept)
+            kept_at.append(system_kept_at)
+            changed.append(np.flatnonzero(is_changed))
+            keeps_layout = keeps_layout and alternatives == old_alternatives
+
+        return SystemsEdit(kept, kept_at, changed, keeps_layout)
+
+    def can_reuse(self,
+                  systems: list[SystemModel],
+                  prototype: Prototype,
+                  similarity_measure_type: SimilarityMenshureType | str,
+                  top_k: int | None = None) -> bool:
+        """
+        Check if scoring the systems reuses the last run.
+
+        The last run must have kept every combination, with the same measure and
+        without top K, and either only the prototype or only some alternatives
+        changed since. Anything else is better scored by a full calculation.
+        """
+        if top_k is not None:
+            return False
+
+        snapshot = self._take_snapshot(systems)
+
+        with self._lock:
+            if self._similarity is None or SimilarityMenshureType(similarity_measure_type) != self._similarity_measure_type:
+                return False
+
+            edit = self._edit(snapshot)
+            if edit is None or not prototype.index.equals(self._encoded.prototype_index):
+                return False
+
+            prototype_changed = not np.array_equal(prototype.to_numpy() != 0, self._encoded.prototype_values)
+            return edit.is_empty == prototype_changed
+
+    def reset(self,
+              systems: list[SystemModel],
+              prototype: Prototype,
+              similarity_measure_type: SimilarityMenshureType | str | None = None,
+              combinations: np.ndarray | None = None,
+              similarity: np.ndarray | None = None) -> None:
+        """
+        Keep the partial sums of systems scored by a full calculation.
+
+        Parameters:
+        -----------
+        combinations, similarity : np.ndarray, optional
+            Alternative indices and scores of every combination, in the product order,
+            if the calculation kept all of them.
+        """
+        snapshot = self._take_snapshot(systems)
+        encoded = EncodedModel(systems, prototype)
+        is_complete = combinations is not None and len(combinations) == encoded.size
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._encoded = encoded
+            self._combinations = combinations if is_complete else None
+            self._similarity = similarity if is_complete and similarity is not None else None
+            self._similarity_measure_type = SimilarityMenshureType(similarity_measure_type) \
+                if self._similarity is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._encoded = None
+            self._combinations = None
+            self._similarity = None
+            self._similarity_measure_type = None
+
+    def score(self,
+              systems: list[SystemModel],
+              prototype: Prototype,
+              similarity_measure_type: SimilarityMenshureType | str,
+              top_k: int | None = None,
+              cancel_event=None) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Score the combinations of the systems, like `SimilarityEngine.score`.
+
+        Only what changed since the last scored systems is scored again. Systems which
+        are not comparable with them are encoded and scored from scratch.
+
+        Raises:
+        -------
+        CalculationCancelled
+            If the cancel event is set, the kept state is then dropped.
+        """
+        similarity_measure_type = SimilarityMenshureType(similarity_measure_type)
+        snapshot = self._take_snapshot(systems)
+
+        with self._lock:
+            try:
+                return self._score(systems, snapshot, prototype, similarity_measure_type, top_k, cancel_event)
+            except CalculationCancelled:
+                # The prototype of the kept sums may already be updated.
+                self._snapshot = self._encoded = self._combinations = self._similarity = None
+                self._similarity_measure_type = None
+                raise
+
+    def _score(self,
+               systems: list[SystemModel],
+               snapshot: list[tuple],
+               prototype: Prototype,
+               similarity_measure_type: SimilarityMenshureType,
+               top_k: int | None,
+               cancel_event) -> tuple[np.ndarray, np.ndarray, int]:
+        """Score the combinations, the lock must be held"""
+        edit = self._edit(snapshot)
+        previous = self._encoded
+
+        if edit is not None and edit.is_empty:
+            prototype_changed = previous.update_prototype(prototype) > 0
+            encoded = previous
+        else:
+            encoded = EncodedModel(systems, prototype)
+            prototype_changed = edit is None or not np.array_equal(encoded.prototype_values, previous.prototype_values)
+
+        keeps_layout = edit is not None and edit.keeps_layout
+        scores_reusable = (top_k is None and edit is not None and not prototype_changed
+                           and self._similarity is not None
+                           and similarity_measure_type == self._similarity_measure_type)
+
+        if scores_reusable:
+            combinations, scores = self._rescore_edit(encoded, previous, edit, similarity_measure_type, cancel_event)
+        else:
+            # Pruning finds the top K faster than scoring every combination.
+            engine_class = BranchAndBoundEngine if top_k is not None else NumpyEngine
+            engine = engine_class(cancel_event=cancel_event)
+            combinations, scores, _ = engine.score_encoded(
+                encoded, similarity_measure_type, top_k, self._combinations if keeps_layout else None
+            )
+
+        self._snapshot = snapshot
+        self._encoded = encoded
+
+        if top_k is None:
+            self._combinations = combinations
+            self._similarity = scores
+            self._similarity_measure_type = similarity_measure_type
+        else:
+            self._combinations = self._combinations if keeps_layout else None
+            self._similarity = None
+            self._similarity_measure_type = None
+
+        return combinations, scores, encoded.size
+
+    @staticmethod
+    def _grid_positions(shape: tuple, axes: list[np.ndarray]) -> np.ndarray:
+        """Get the flat positions, in the product order of the shape, of the grid of the given alternatives"""
+        strides = np.cumprod((1,) + shape[:0:-1], dtype=np.int64)[::-1]
+        return NumpyEngine._outer_sum([axis * stride for axis, stride in zip(axes, strides)])
+
+    def _rescore_edit(self,
+                      encoded: EncodedModel,
+                      previous: EncodedModel,
+                      edit: SystemsEdit,
+                      similarity_measure_type: SimilarityMenshureType,
+                      cancel_event=None) -> tuple[np.ndarray, np.ndarray]:
+        """Score the combinations with changed alternatives, reusing the scores of the others"""
+        shape = encoded.shape
+        engine = NumpyEngine(self.BLOCK_SIZE, cancel_event)
+
+        # Each system with changed alternatives scores the grid of these alternatives and every alternative of the others.
+        rescored = sum(encoded.size // size * len(changed) for size, changed in zip(shape, edit.changed) if size)
+        if rescored > self.MAX_RESCORED_FRACTION * encoded.size:
+            combinations, scores, _ = engine.score_encoded(
+                encoded, similarity_measure_type, None, self._combinations if edit.keeps_layout else None
+            )
+            return combinations, scores
+
+        if edit.keeps_layout:
+            combinations = self._combinations
+            # A copy, the previous scores may be held by the previous results.
+            scores = self._similarity.copy()
+        else:
+            index_dtype = np.min_scalar_type(max(max(shape, default=1) - 1, 0))
+            combinations = np.empty((encoded.size, len(shape)), dtype=index_dtype)
+            for start in range(0, encoded.size, self.BLOCK_SIZE):
+                stop = min(start + self.BLOCK_SIZE, encoded.size)
+                combinations[start:stop] = encoded.unravel(np.arange(start, stop))
+
+            scores = np.empty(encoded.size, dtype=self._similarity.dtype)
+            if all(len(kept) for kept in edit.kept):
+                previous_scores = self._similarity.reshape(previous.shape)[np.ix_(*edit.kept)]
+                scores[self._grid_positions(shape, edit.kept_at)] = previous_scores.ravel()
+
+        u = NumpyEngine.get_u(similarity_measure_type)
+
+        for system_index, changed in enumerate(edit.changed):
+            if not len(changed):
+                continue
+
+            engine.check_cancelled()
+
+            # The combinations with a changed alternative of this system
+            axes = [np.arange(size) for size in shape]
+            axes[system_index] = changed
+
+            intersection = NumpyEngine._outer_sum([values[axis] for values, axis in zip(encoded.intersections, axes)])
+            cardinality = NumpyEngine._outer_sum([values[axis] for values, axis in zip(encoded.cardinalities, axes)])
+            scores[self._grid_positions(shape, axes)] = similarity(intersection, cardinality, encoded.prototype_cardinality, u)
+
+        return combinations, scores
@@ -0,0 +1,37 @@
+from typing import Iterator
+
+from momo.model import MoMoModel
+from momo.prototype import Prototype
+from momo.system_models.system_models import MultiSystemModel, SystemModel
+
+from src.dtypes import SimilarityMenshureType
+from .base import SimilarityEngine
+
+
+class MoMoEngine(SimilarityEngine):
+    """
+    Engine which scores the combinations one at a time, the way `MoMoModel` does.
+    """
+
+    def get_similarity_measures(self,
+                                systems: MultiSystemModel | list[SystemModel],
+                                prototype: Prototype,
+                                similarity_measure_type: SimilarityMenshureType | str) -> dict[tuple, float]:
+        return dict(self.iter_similarity_measures(systems, prototype, similarity_measure_type))
+
+    def iter_similarity_measures(self,
+                                 systems: MultiSystemModel | list[SystemModel],
+                                 prototype: Prototype,
+                                 similarity_measure_type: SimilarityMenshureType | str) -> Iterator[tuple[tuple, float]]:
+        model = MoMoModel(systems, prototype)
+        u = self.get_u(similarity_measure_type)
+        card_prototype = model.prototype.sum()
+
+        # Same computation as `MoMoModel.get_similarity_measures`, one combination at a time.
+        for combination, compared_system in model.system_models.generate_combinations():
+            self.check_cancelled()
+
+            intersection_num = (model.prototype & compared_system).sum()
+            card_compared_system = compared_system.sum()
+
+            yield combination, 2 * intersection_num / ((1 + u) * (card_prototype + card_compared_system) - 2 * u * intersection_num)
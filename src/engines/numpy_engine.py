@@ -0,0 +1,340 @@
+from functools import reduce
+from typing import Iterator
+
+import numpy as np
+
+from momo.prototype import Prototype
+from momo.system_models.system_models import MultiSystemModel, SystemModel
+
+from src.dtypes import SimilarityMenshureType
+from .base import SimilarityEngine
+from .top_k import TopK
+
+
+# Number of set bits for every possible byte value.
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.int64)
+
+
+def _popcount(packed: np.ndarray) -> np.ndarray:
+    """Count the set bits of every bit-packed row"""
+    return _POPCOUNT[packed].sum(axis=-1, dtype=np.int64)
+
+
+def similarity(intersection: np.ndarray,
+               cardinality: np.ndarray,
+               prototype_cardinality: int,
+               u: int) -> np.ndarray:
+    """
+    Vectorized version of the momo similarity formula.
+
+    The operations are done in the same order and with the same integer types
+    as `MoMoModel`, so the results are bit-for-bit identical.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 2 * intersection / ((1 + u) * (prototype_cardinality + cardinality) - 2 * u * intersection)
+
+
+class EncodedModel:
+    """
+    Bit-packed representation of the systems compared with a prototype.
+
+    Every alternative of every system is encoded as a bit-packed feature vector.
+    Since the features of a combination are the union of the features owned by
+    each system, the intersection with the prototype and the cardinality of a
+    combination are the sums of the per alternative values, which are stored in
+    `intersections` and `cardinalities`.
+    """
+
+    def __init__(self, systems: MultiSystemModel | list[SystemModel], prototype: Prototype):
+        """
+        Encode the systems.
+
+        Parameters:
+        -----------
+        systems : MultiSystemModel | list[SystemModel]
+            Systems whose alternatives are combined.
+
+        prototype : Prototype
+            Prototype the combinations are compared with.
+        """
+        systems = MultiSystemModel(systems)
+        related_features = systems.get_features_related_to_system()
+
+        if not prototype.index.equals(systems.get_prototype().index):
+            raise ValueError("The prototype must have the same index as the system models.")
+
+        prototype_values = prototype.to_numpy() != 0
+
+        self.system_names = systems.get_system_names()
+        self.alternatives = []
+        self.packed_alternatives = []
+        self.packed_prototypes = []
+        self.intersections = []
+        self.cardinalities = []
+        self.owned_slots = []
+        self.owned_values = []
+        self.prototype_index = prototype.index
+        self.prototype_values = prototype_values
+        self.prototype_cardinality = int(np.count_nonzero(prototype_values))
+
+        owned_rows = self._owned_rows(systems, related_features)
+
+        for system_index, system_name in enumerate(self.system_names):
+            system = systems.systems[system_name]
+            rows, slots = owned_rows[system_index]
+
+            values = system.data.to_numpy()[rows, :] != 0
+            packed_alternatives = np.packbits(values.T, axis=1)
+            packed_prototype = np.packbits(prototype_values[slots])
+
+            self.alternatives.append(np.asarray(system.get_alternatives(), dtype=object))
+            self.packed_alternatives.append(packed_alternatives)
+            self.packed_prototypes.append(packed_prototype)
+            self.intersections.append(_popcount(packed_alternatives & packed_prototype))
+            self.cardinalities.append(_popcount(packed_alternatives))
+            self.owned_slots.append(np.asarray(slots, dtype=np.int64))
+            self.owned_values.append(values)
+
+        self.shape = tuple(len(alternatives) for alternatives in self.alternatives)
+        self.size = int(np.prod(self.shape, dtype=np.int64)) if self.shape else 0
+
+    @staticmethod
+    def _owned_rows(systems: MultiSystemModel, related_features: tuple) -> list[tuple[list[int], list[int]]]:
+        """
+        Find the prototype slots owned by the rows of every system.
+
+        `MultiSystemModel.generate_combinations` writes every feature into the first
+        related feature that contains its name, and later systems overwrite earlier
+        ones. The same placement is reproduced here so both engines agree even when
+        systems share feature names.
+        """
+        first_slot = {}
+        for slot, related_feature in enumerate(related_features):
+            for part in related_feature:
+                first_slot.setdefault(part, slot)
+
+        owners = {}
+        for system_index, system in enumerate(systems.systems.values()):
+            for row, feature in enumerate(system.data.index):
+                owners[first_slot[feature]] = (system_index, row)
+
+        owned_rows = [([], []) for _ in systems.systems]
+        for slot, (system_index, row) in sorted(owners.items()):
+            owned_rows[system_index][0].append(row)
+            owned_rows[system_index][1].append(slot)
+
+        return owned_rows
+
+    def update_prototype(self, prototype: Prototype) -> int:
+        """
+        Compare the same systems with a new prototype.
+
+        A changed feature only changes the intersections of the alternatives of the
+        system owning it, which are updated by the changed features instead of being
+        encoded again. The arrays of the previous prototype are replaced, not changed.
+
+        Returns:
+        --------
+        int
+            Number of changed features.
+        """
+        if not prototype.index.equals(self.prototype_index):
+            raise ValueError("The prototype must have the same index as the encoded prototype.")
+
+        prototype_values = prototype.to_numpy() != 0
+        changed = np.flatnonzero(prototype_values != self.prototype_values)
+
+        for system_index, slots in enumerate(self.owned_slots):
+            rows = np.flatnonzero(np.isin(slots, changed))
+            if not len(rows):
+                continue
+
+            # +1 for a feature added to the prototype, -1 for a removed one
+            signs = np.where(prototype_values[slots[rows]], 1, -1)
+            delta = signs @ self.owned_values[system_index][rows].astype(np.int64)
+
+            self.intersections[system_index] = self.intersections[system_index] + delta
+            self.packed_prototypes[system_index] = np.packbits(prototype_values[slots])
+
+        self.prototype_values = prototype_values
+        self.prototype_cardinality = int(np.count_nonzero(prototype_values))
+        return len(changed)
+
+    def unravel(self, flat_indices: np.ndarray) -> np.ndarray:
+        """
+        Convert flat combination numbers into per system alternative indices.
+
+        Combinations are numbered in the `itertools.product` order used by momo.
+        """
+        return np.stack(np.unravel_index(flat_indices, self.shape), axis=1)
+
+    def combinations(self, indices: np.ndarray) -> Iterator[tuple]:
+        """Get the alternatives names of the combinations given by their indices"""
+        return zip(*(alternatives[indices[:, i]] for i, alternatives in enumerate(self.alternatives)))
+
+
+class NumpyEngine(SimilarityEngine):
+    """
+    Engine which scores whole blocks of the cartesian product at once.
+
+    The trailing systems form a grid which is scored with NumPy broadcasting
+    and reused for every combination of the leading systems.
+    """
+
+    DEFAULT_BLOCK_SIZE = 1 << 20
+
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE, cancel_event=None):
+        """
+        Initialize the engine.
+
+        Parameters:
+        -----------
+        block_size : int, optional
+            Approximate number of combinations scored at once.
+
+        cancel_event : threading.Event | multiprocessing.Event, optional
+            Event which stops the calculation once it is set.
+        """
+        super().__init__(cancel_event)
+        self.block_size = block_size
+
+    def encode(self, systems: MultiSystemModel | list[SystemModel], prototype: Prototype) -> EncodedModel:
+        """Encode the systems as bit-packed feature vectors"""
+        return EncodedModel(systems, prototype)
+
+    def iter_similarity_blocks(self,
+                               encoded: EncodedModel,
+                               similarity_measure_type: SimilarityMenshureType | str) -> Iterator[tuple[int, np.ndarray]]:
+        """
+        Score the combinations block by block.
+
+        Yields:
+        -------
+        tuple[int, np.ndarray]
+            Flat number of the first combination of the block and the similarity
+            measures of the block, in the `itertools.product` order.
+        """
+        if encoded.size == 0:
+            return
+
+        u = self.get_u(similarity_measure_type)
+
+        split = len(encoded.shape)
+        tail_size = 1
+        while split > 0 and tail_size * encoded.shape[split - 1] <= self.block_size:
+            split -= 1
+            tail_size *= encoded.shape[split]
+
+        tail_intersections = self._outer_sum(encoded.intersections[split:])
+        tail_cardinalities = self._outer_sum(encoded.cardinalities[split:])
+
+        head_shape = encoded.shape[:split]
+        head_size = int(np.prod(head_shape, dtype=np.int64))
+        heads_per_block = max(1, self.block_size // tail_size)
+
+        for head_start in range(0, head_size, heads_per_block):
+            self.check_cancelled()
+
+            heads = np.arange(head_start, min(head_start + heads_per_block, head_size))
+            head_indices = np.unravel_index(heads, head_shape) if head_shape else ()
+
+            head_intersections = np.zeros(len(heads), dtype=np.int64)
+            head_cardinalities = np.zeros(len(heads), dtype=np.int64)
+            for i, alternatives in enumerate(head_indices):
+                head_intersections += encoded.intersections[i][alternatives]
+                head_cardinalities += encoded.cardinalities[i][alternatives]
+
+            intersection = (head_intersections[:, None] + tail_intersections[None, :]).ravel()
+            cardinality = (head_cardinalities[:, None] + tail_cardinalities[None, :]).ravel()
+
+            yield head_start * tail_size, similarity(intersection, cardinality, encoded.prototype_cardinality, u)
+
+    @staticmethod
+    def _outer_sum(values: list[np.ndarray]) -> np.ndarray:
+        """Sum every combination of the given per alternative values"""
+        return reduce(np.add.outer, values, np.zeros((), dtype=np.int64)).ravel()
+
+    def get_similarity_measures(self,
+                                systems: MultiSystemModel | list[SystemModel],
+                                prototype: Prototype,
+                                similarity_measure_type: SimilarityMenshureType | str) -> dict[tuple, float]:
+        return dict(self.iter_similarity_measures(systems, prototype, similarity_measure_type))
+
+    def iter_similarity_measures(self,
+                                 systems: MultiSystemModel | list[SystemModel],
+                                 prototype: Prototype,
+                                 similarity_measure_type: SimilarityMenshureType | str) -> Iterator[tuple[tuple, float]]:
+        encoded = self.encode(systems, prototype)
+
+        for start, block in self.iter_similarity_blocks(encoded, similarity_measure_type):
+            indices = encoded.unravel(np.arange(start, start + len(block)))
+            yield from zip(encoded.combinations(indices), block)
+
+    def get_top_similarity_measures(self,
+                                    systems: MultiSystemModel | list[SystemModel],
+                                    prototype: Prototype,
+                                    similarity_measure_type: SimilarityMenshureType | str,
+                                    k: int) -> tuple[dict[tuple, float], int]:
+        encoded = self.encode(systems, prototype)
+        combinations, similarities = self._top_to_arrays(encoded, self._find_top(encoded, similarity_measure_type, k))
+        return dict(zip(encoded.combinations(combinations), similarities)), encoded.size
+
+    def _find_top(self, encoded: EncodedModel, similarity_measure_type: SimilarityMenshureType | str, k: int) -> TopK:
+        """Find the K best combinations, identified by their flat numbers"""
+        top = TopK(k)
+
+        for start, block in self.iter_similarity_blocks(encoded, similarity_measure_type):
+            top.push_block(start, block)
+
+        return top
+
+    @staticmethod
+    def _top_to_arrays(encoded: EncodedModel, top: TopK) -> tuple[np.ndarray, np.ndarray]:
+        """Convert the heap of flat combination numbers into alternative indices and similarities"""
+        items = top.items()
+        flat_indices = np.fromiter((flat_index for flat_index, _ in items), dtype=np.int64, count=len(items))
+        similarities = np.fromiter((similarity for _, similarity in items), dtype=np.float64, count=len(items))
+        return encoded.unravel(flat_indices).reshape(len(items), len(encoded.shape)), similarities
+
+    def score(self,
+              systems: MultiSystemModel | list[SystemModel],
+              prototype: Prototype,
+              similarity_measure_type: SimilarityMenshureType | str,
+              top_k: int | None = None) -> tuple[np.ndarray, np.ndarray, int]:
+        return self.score_encoded(self.encode(systems, prototype), similarity_measure_type, top_k)
+
+    def score_encoded(self,
+                      encoded: EncodedModel,
+                      similarity_measure_type: SimilarityMenshureType | str,
+                      top_k: int | None = None,
+                      combinations: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Score the combinations of already encoded systems, like `score`.
+
+        Parameters:
+        -----------
+        combinations : np.ndarray, optional
+            Alternative indices of every combination in the product order, from a
+            previous scoring of the same systems. They do not depend on the prototype,
+            so they are reused instead of being enumerated again without top K.
+        """
+        if top_k is not None:
+            combinations, similarities = self._top_to_arrays(encoded, self._find_top(encoded, similarity_measure_type, top_k))
+            return combinations, similarities, encoded.size
+
+        if combinations is None:
+            index_dtype = np.min_scalar_type(max(max(encoded.shape, default=1) - 1, 0))
+            combinations = np.empty((encoded.size, len(encoded.shape)), dtype=index_dtype)
+            fill_combinations = True
+        else:
+            fill_combinations = False
+
+        similarities = np.empty(encoded.size, dtype=np.float64)
+
+        for start, block in self.iter_similarity_blocks(encoded, similarity_measure_type):
+            stop = start + len(block)
+            if fill_combinations:
+                combinations[start:stop] = encoded.unravel(np.arange(start, stop))
+            similarities[start:stop] = block
+
+        return combinations, similarities, encoded.size
@@ -0,0 +1,246 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from momo.prototype import Prototype
+from momo.system_models.system_models import SystemModel
+
+from src.dtypes import EngineType, SimilarityMenshureType
+from .base import CalculationCancelled
+from .branch_and_bound import SearchStats
+from .factory import create_engine
+
+
+# Cancel event of the current worker process, set by `_init_worker`.
+_cancel_event = None
+
+
+def _init_worker(cancel_event) -> None:
+    global _cancel_event
+    _cancel_event = cancel_event
+
+
+@dataclass
+class ShardResult:
+    """Result of the scoring of one shard"""
+    combinations: np.ndarray
+    similarity: np.ndarray
+    evaluated_combinations: int
+    stats: SearchStats | None = None
+
+
+def _score_shard(engine_type: EngineType | str,
+                 systems: list[SystemModel],
+                 prototype: Prototype,
+                 similarity_measure_type: SimilarityMenshureType | str,
+                 top_k: int | None) -> ShardResult:
+    """Score one shard in a worker process"""
+    engine = create_engine(engine_type, cancel_event=_cancel_event)
+    combinations, similarity, evaluated_combinations = engine.score(systems, prototype, similarity_measure_type, top_k)
+    return ShardResult(combinations, similarity, evaluated_combinations, getattr(engine, "stats", None))
+
+
+class ParallelCalculation:
+    """
+    Scores the combinations in a pool of worker processes.
+
+    The combination space is split into shards, one per alternative of the first
+    system, and every shard is scored by its own engine in a worker process.
+    The shards follow the `itertools.product` order, so merging them in order gives
+    the same result as a single process calculation.
+
+    Cancelling sets an event shared with the workers: the running engines stop at
+    their next check and the pending shards are never started.
+
+    The pool of a calculation is joined once it is merged or cancelled, so its
+    workers never outlive the event they were started with.
+    """
+
+    def __init__(self,
+                 engine_type: EngineType | str,
+                 systems: list[SystemModel],
+                 prototype: Prototype,
+                 similarity_measure_type: SimilarityMenshureType | str,
+                 top_k: int | None = None,
+                 workers: int | None = None):
+        """
+        Initialize the calculation.
+
+        Parameters:
+        -----------
+        engine_type : EngineType | str
+            Type of the engine used by the workers.
+
+        systems : list[SystemModel]
+            Systems whose alternatives are combined.
+
+        prototype : Prototype
+            Prototype the combinations are compared with.
+
+        similarity_measure_type : SimilarityMenshureType | str
+            Type of similarity measure to use.
+
+        top_k : int, optional
+            Number of the best combinations to keep, all of them by default.
+
+        workers : int, optional
+            Number of worker processes, the number of CPUs by default.
+        """
+        self.engine_type = engine_type
+        self.systems = list(systems)
+        self.prototype = prototype
+        self.similarity_measure_type = similarity_measure_type
+        self.top_k = top_k
+        self.workers = workers or os.cpu_count() or 1
+
+        # Spawned workers do not inherit the state of the (Qt) parent process.
+        self._context = multiprocessing.get_context("spawn")
+        self._cancel_event = self._context.Event()
+        self._executor = None
+        self._shutdown_thread = None
+        self._futures = []
+
+    @property
+    def shards_count(self) -> int:
+        """Get the number of shards"""
+        if not self.systems:
+            return 0
+        return len(self.systems[0].get_alternatives())
+
+    def _shard_systems(self, shard: int) -> list[SystemModel]:
+        """Get the systems of the shard where the first system is fixed to its `shard`-th alternative"""
+        first_system = self.systems[0]
+        shard_system = SystemModel(first_system.name)
+        shard_system.data = first_system.data.iloc[:, [shard]]
+        return [shard_system] + self.systems[1:]
+
+    def start(self) -> list[Future]:
+        """
+        Submit every shard to the worker processes.
+
+        Returns:
+        --------
+        list[Future]
+            Futures of the shards results, in the shards order.
+        """
+        self._executor = ProcessPoolExecutor(
+            max_workers=max(1, min(self.workers, self.shards_count)),
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._cancel_event,),
+        )
+
+        self._futures = [
+            self._executor.submit(_score_shard,
+                                  self.engine_type,
+                                  self._shard_systems(shard),
+                                  self.prototype,
+                                  self.similarity_measure_type,
+                                  self.top_k)
+            for shard in range(self.shards_count)
+        ]
+
+        return self._futures
+
+    def cancel(self, wait: bool = True) -> None:
+        """Stop the workers, drop the pending shards and shut the pool down, see `close`"""
+        self._cancel_event.set()
+
+        for future in self._futures:
+            future.cancel()
+
+        self.close(wait)
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Shut the worker processes down, the running shards are finished first.
+
+        Parameters:
+        -----------
+        wait : bool
+            Wait for the workers to exit. Otherwise they exit in the background, so the
+            (GUI) thread is not blocked, and a later `close` still waits for them.
+        """
+        if self._executor is not None:
+            self._shutdown_thread = threading.Thread(target=self._executor.shutdown,
+                                                     kwargs={"cancel_futures": True},
+                                                     name="ParallelCalculation.shutdown")
+            self._shutdown_thread.start()
+            self._executor = None
+
+        if wait and self._shutdown_thread is not None:
+            self._shutdown_thread.join()
+
+    @property
+    def is_cancelled(self) -> bool:
+        """Check if the calculation has been cancelled"""
+        return self._cancel_event.is_set()
+
+    def run(self) -> tuple[np.ndarray, np.ndarray, int]:
+        """Score every shard and wait for the merged result"""
+        wait(self.start())
+        return self.merge()
+
+    def merge(self) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Merge the results of the shards.
+
+        Returns:
+        --------
+        tuple[np.ndarray, np.ndarray, int]
+            Alternative indices of the combinations, their similarity measures and
+            the number of evaluated combinations, like `SimilarityEngine.score`.
+
+        Raises:
+        -------
+        CalculationCancelled
+            If the calculation has been cancelled.
+        """
+        if self.is_cancelled:
+            self.close()
+            raise CalculationCancelled()
+
+        try:
+            results = [future.result() for future in self._futures]
+        finally:
+            self.close()
+        evaluated_combinations = sum(result.evaluated_combinations for result in results)
+
+        if not results:
+            return np.empty((0, len(self.systems)), dtype=np.int64), np.empty(0), evaluated_combinations
+
+        index_dtype = np.result_type(np.min_scalar_type(self.shards_count - 1),
+                                     *(result.combinations.dtype for result in results))
+        combinations = np.concatenate([result.combinations.astype(index_dtype, copy=False) for result in results])
+        similarity = np.concatenate([result.similarity for result in results])
+
+        # Every shard fixed the first system to its own alternative.
+        combinations[:, 0] = np.repeat(np.arange(len(results)), [len(result.similarity) for result in results])
+
+        if self.top_k is None:
+            return combinations, similarity, evaluated_combinations
+
+        # Keep the K best of the shards tops, ties in the product order like `TopK` does.
+        shape = tuple(len(system.get_alternatives()) for system in self.systems)
+        flat_indices = np.ravel_multi_index(tuple(combinations.T.astype(np.int64)), shape)
+        ranks = np.where(np.isnan(similarity), -np.inf, similarity)
+        best = np.lexsort((flat_indices, -ranks))[:self.top_k]
+
+        return combinations[best], similarity[best], evaluated_combinations
+
+    @property
+    def stats(self) -> SearchStats | None:
+        """Get the summed search statistics of the finished shards, if the engine has any"""
+        shard_stats = [future.result().stats for future in self._futures
+                       if future.done() and not future.cancelled() and future.exception() is None]
+        shard_stats = [stats for stats in shard_stats if stats is not None]
+
+        if not shard_stats:
+            return None
+
+        return SearchStats(*(sum(getattr(stats, field.name) for stats in shard_stats)
+                             for field in fields(SearchStats)))
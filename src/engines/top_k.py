@@ -0,0 +1,100 @@
+import heapq
+import math
+from typing import Any
+
+import numpy as np
+
+
+class TopK:
+    """
+    Bounded min-heap which keeps the K best scored items seen so far.
+
+    Equal scores are resolved in favour of the item pushed with the lower order,
+    so the kept items do not depend on how the combinations were split into blocks.
+    NaN scores are ranked below every other score.
+    """
+
+    def __init__(self, k: int):
+        """
+        Initialize the heap.
+
+        Parameters:
+        -----------
+        k : int
+            Maximal number of kept items.
+        """
+        if k <= 0:
+            raise ValueError("The number of kept items must be positive.")
+
+        self.k = k
+        self._heap = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @staticmethod
+    def _rank(score: float) -> float:
+        return -math.inf if math.isnan(score) else score
+
+    def can_improve(self, score: float, order: int) -> bool:
+        """
+        Check if an item with the given score and order would be kept.
+
+        Since ties are resolved by the order, this is also true for every item
+        with a lower score or a greater order than the given ones.
+        """
+        return len(self._heap) < self.k or (self._rank(score), -order) > self._heap[0][:2]
+
+    def push(self, score: float, order: int, item: Any) -> None:
+        """
+        Offer an item to the heap.
+
+        Parameters:
+        -----------
+        score : float
+            Score of the item, higher is better.
+
+        order : int
+            Position of the item in the stream, used to break ties.
+
+        item : Any
+            The item itself.
+        """
+        entry = (self._rank(score), -order, score, item)
+
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def push_block(self, start: int, scores: np.ndarray) -> None:
+        """
+        Offer a block of consecutive items to the heap.
+
+        Only the K best items of the block reach the heap, so a block costs
+        O(len(scores)) NumPy work and O(K log K) heap work. The items are
+        identified by their order, i.e. `start` plus their position in the block.
+        """
+        ranks = np.where(np.isnan(scores), -np.inf, scores)
+        positions = np.arange(len(ranks))
+
+        if len(self._heap) == self.k:
+            positions = np.flatnonzero(ranks >= self._heap[0][0])
+            ranks = ranks[positions]
+
+        if len(ranks) == 0:
+            return
+
+        k = min(self.k, len(ranks))
+
+        kth_best = np.partition(ranks, len(ranks) - k)[len(ranks) - k]
+        better = np.flatnonzero(ranks > kth_best)
+        equal = np.flatnonzero(ranks == kth_best)[:k - len(better)]
+
+        for position in positions[np.concatenate((better, equal))].tolist():
+            order = start + position
+            self.push(float(scores[position]), order, order)
+
+    def items(self) -> list[tuple[Any, float]]:
+        """Get the kept items with their scores, best first"""
+        return [(item, score) for _, _, score, item in sorted(self._heap, reverse=True)]
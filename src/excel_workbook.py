@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+import pandas as pd
+
+
+class ExcelWorkbook:
+    """
+    Session over an Excel workbook.
+
+    The file is opened once (read-only for .xlsx files) and every sheet is parsed
+    at most once per set of parsing options, so the validator and the loaders can
+    share a single pass over the file.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Open the workbook.
+
+        Parameters:
+        -----------
+        file_path : str
+            Path to the Excel file.
+        """
+        self.file_path = file_path
+        self._excel_file = pd.ExcelFile(file_path)
+        self._sheets = {}
+
+    @classmethod
+    @contextmanager
+    def session(cls, source: "str | ExcelWorkbook") -> Iterator["ExcelWorkbook"]:
+        """
+        Use an already opened workbook, or open the file for the duration of the block.
+        """
+        if isinstance(source, ExcelWorkbook):
+            yield source
+            return
+
+        with cls(source) as workbook:
+            yield workbook
+
+    @property
+    def sheet_names(self) -> list[str]:
+        return self._excel_file.sheet_names
+
+    def parse(self, sheet_name: str, **kwargs) -> pd.DataFrame:
+        """Parse a sheet, or get it from the already parsed sheets"""
+        key = (sheet_name, repr(sorted(kwargs.items())))
+
+        if key not in self._sheets:
+            self._sheets[key] = self._excel_file.parse(sheet_name, **kwargs)
+
+        return self._sheets[key]
+
+    def close(self) -> None:
+        self._excel_file.close()
+        self._sheets.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
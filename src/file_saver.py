@@ -1,4 +1,8 @@
+from typing import Iterable
+
 import pandas as pd
+from openpyxl import Workbook, load_workbook
+
 
 class ExcelSaver:
     def __init__(self, file_path):
@@ -13,3 +17,40 @@ class ExcelSaver:
         except FileNotFoundError:
             with pd.ExcelWriter(self.file_path, mode='w', engine='openpyxl') as writer:
                 data.to_excel(writer, sheet_name=tab_name)
+
+    def save_tabs(self, tabs: Iterable[tuple[str, pd.DataFrame]]):
+        tabs = list(tabs)
+        if not tabs:
+            return
+
+        # Every sheet is streamed into a new write-only workbook, which is written to the file once.
+        workbook = Workbook(write_only=True)
+        self._copy_other_sheets(workbook, {tab_name for tab_name, _ in tabs})
+
+        for tab_name, data in tabs:
+            sheet = workbook.create_sheet(title=tab_name)
+            sheet.append([data.index.name] + list(data.columns))
+
+            # Missing values are left empty, as pandas writes them.
+            for index, row in zip(data.index, data.astype(object).where(data.notna(), None).to_numpy().tolist()):
+                sheet.append([None if pd.isna(index) else index] + row)
+
+        workbook.save(self.file_path)
+
+    def _copy_other_sheets(self, workbook: Workbook, tab_names: set[str]):
+        # The sheets of an existing file are kept, like `save_tab` keeps them, the saved tabs replace theirs.
+        try:
+            existing = load_workbook(self.file_path, read_only=True)
+        except FileNotFoundError:
+            return
+
+        try:
+            for sheet in existing.worksheets:
+                if sheet.title in tab_names:
+                    continue
+
+                copy = workbook.create_sheet(title=sheet.title)
+                for row in sheet.iter_rows(values_only=True):
+                    copy.append(row)
+        finally:
+            existing.close()
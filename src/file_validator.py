@@ -1,7 +1,13 @@
+import logging
 from abc import ABC, abstractmethod
-import pandas as pd
 from momo.system_models.system_models import SystemModel
 from src.dtypes import ResultsMap
+from src.excel_workbook import ExcelWorkbook
+from src.momo_file import MOMO_EXTENSION, is_momo_file
+from src.tracing import traced
+
+
+logger = logging.getLogger(__name__)
 
 
 class FileValidator(ABC):
@@ -15,14 +21,26 @@ class FileValidator(ABC):
 
 
 class ExcelFileValidator(FileValidator):
-    def validate(self, file_path: str):
+    """
+    Validator of Excel files.
+
+    Every method accepts either a file path or an opened `ExcelWorkbook`, so a
+    caller holding a workbook session does not make the file be parsed again.
+    """
+
+    def validate(self, file_path: str | ExcelWorkbook):
         try:
-            self._validate_file_path(file_path)
-            self._validate_file_extension(file_path)
+            path = self._path_of(file_path)
+            self._validate_file_path(path)
+            self._validate_file_extension(path)
             self._validate_sheets_name(file_path)
         except Exception as e:
             raise e
 
+    @staticmethod
+    def _path_of(file_path: str | ExcelWorkbook) -> str:
+        return file_path.file_path if isinstance(file_path, ExcelWorkbook) else file_path
+
     def _validate_file_path(self, file_path: str):
         if not file_path:
             raise ValueError("No file path provided.")
@@ -31,58 +49,80 @@ class ExcelFileValidator(FileValidator):
         if not file_path.endswith(('.xlsx', '.xls')):
             raise ValueError("Invalid file extension. Please provide an Excel file.")
 
-    def _validate_sheets_name(self, file_path: str):
-        if not pd.ExcelFile(file_path).sheet_names:
-            raise ValueError("No sheets found in the Excel file.")
+    def _validate_sheets_name(self, file_path: str | ExcelWorkbook):
+        with ExcelWorkbook.session(file_path) as workbook:
+            if not workbook.sheet_names:
+                raise ValueError("No sheets found in the Excel file.")
 
-    def is_results_file(self, file_path: str) -> bool:
+    def is_results_file(self, file_path: str | ExcelWorkbook) -> bool:
         """Check if the file is a results file by looking for the Metadata sheet"""
+        if self._path_of(file_path).endswith(MOMO_EXTENSION):
+            return is_momo_file(self._path_of(file_path))
+
         try:
-            excel_file = pd.ExcelFile(file_path)
-            if "Metadata" in excel_file.sheet_names:
-                metadata = pd.read_excel(file_path, sheet_name="Metadata")
-                return "file_type" in metadata.columns and "MoMo_Results" in metadata["file_type"].values
-            return False
+            with ExcelWorkbook.session(file_path) as workbook:
+                if "Metadata" in workbook.sheet_names:
+                    metadata = workbook.parse("Metadata")
+                    return "file_type" in metadata.columns and "MoMo_Results" in metadata["file_type"].values
+                return False
         except:
             return False
 
-    def get_systems_data(self, file_path: str) -> dict:
+    def get_systems_data(self, file_path: str | ExcelWorkbook) -> dict:
         return self._read_systems_data(file_path)
 
-    def _read_systems_data(self, file_path) -> list[SystemModel]:
-        with pd.ExcelFile(file_path) as excel_file:
+    def _read_systems_data(self, file_path: str | ExcelWorkbook) -> list[SystemModel]:
+        with ExcelWorkbook.session(file_path) as workbook:
             systems_data = []
-            for sheet_name in excel_file.sheet_names:
+            for sheet_name in workbook.sheet_names:
                 if sheet_name == "Metadata":
                     continue
 
-                sheet_data = excel_file.parse(sheet_name, index_col=0)
+                sheet_data = workbook.parse(sheet_name, index_col=0)
                 try:
                     systems_data.append(SystemModel(sheet_name, sheet_data))
                 except Exception as e:
-                    print(f"Error processing sheet '{sheet_name}': {e}")
+                    logger.warning("Error processing sheet '%s': %s", sheet_name, e)
                     continue
             return systems_data
 
 
-def load_systems_data(file_path: str, file_validator_class: FileValidator = ExcelFileValidator, **karg) -> list[SystemModel]:
+@traced()
+def load_file(file_path: str,
+              file_validator_class: FileValidator = ExcelFileValidator,
+              **karg) -> tuple[list[SystemModel], ResultsMap | None]:
+    """
+    Load the systems of a file, and its results if it is a results file.
+
+    An Excel file is opened and parsed only once, whatever its kind.
+    """
     file_validator = file_validator_class(**karg)
 
     try:
-        if file_validator.is_results_file(file_path):
-            print("File is a results file.")
-            results_map = ResultsMap.from_excel(file_path)
-            systems = []
-            for system_name in results_map.systems_names:
-                system = results_map.systems.systems.get(system_name)
-                print(f"System name: {system_name}")
-                if system is not None:
-                    systems.append(system)
-            return systems
-
-        # Regular system file
-        file_validator.validate(file_path)
-        return file_validator.get_systems_data(file_path)
+        if file_path.endswith(MOMO_EXTENSION):
+            results_map = ResultsMap.from_momo(file_path)
+            return list(results_map.systems.systems.values()), results_map
+
+        with ExcelWorkbook(file_path) as workbook:
+            if file_validator.is_results_file(workbook):
+                logger.info("%s is a results file", file_path)
+                results_map = ResultsMap.from_excel(workbook)
+                systems = []
+                for system_name in results_map.systems_names:
+                    system = results_map.systems.systems.get(system_name)
+                    logger.debug("System name: %s", system_name)
+                    if system is not None:
+                        systems.append(system)
+                return systems, results_map
+
+            # Regular system file
+            file_validator.validate(workbook)
+            return file_validator.get_systems_data(workbook), None
     except Exception as e:
-        print(f"Error loading file: {e}")
-        return []
+        logger.error("Error loading file %s: %s", file_path, e)
+        return [], None
+
+
+@traced()
+def load_systems_data(file_path: str, file_validator_class: FileValidator = ExcelFileValidator, **karg) -> list[SystemModel]:
+    return load_file(file_path, file_validator_class, **karg)[0]
@@ -0,0 +1,70 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops the records of a call site logged more than `burst` times in `interval` seconds.
+
+    Keeps diagnostics logged once per row or per item from flooding the output. The
+    first record let through after some were dropped tells how many were.
+    """
+
+    def __init__(self, burst: int = 20, interval: float = 1.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+
+        with self._lock:
+            window_start, count, dropped = self._sites.get(site, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+
+            if count >= self.burst:
+                self._sites[site] = (window_start, count, dropped + 1)
+                return False
+
+            self._sites[site] = (window_start, count + 1, 0)
+
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar messages suppressed)"
+        return True
+
+
+ENVIRONMENT_VARIABLE = "MOMO_LOG_LEVEL"
+DEFAULT_LEVEL = "WARNING"
+LOG_FORMAT = "%(asctime)s %(levelname)-8s %(name)s: %(message)s"
+
+
+def configure_logging(level: str | int | None = None) -> None:
+    """
+    Log the application's messages to stderr.
+
+    The level is taken from the MOMO_LOG_LEVEL environment variable if not given,
+    WARNING by default. Repeated messages of a call site are rate limited.
+    """
+    if level is None:
+        level = os.environ.get(ENVIRONMENT_VARIABLE, DEFAULT_LEVEL)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            level = logging.getLevelName(DEFAULT_LEVEL)
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(RateLimitFilter())
+
+    for name in ("src", "gui"):
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.handlers[:] = [handler]
+        logger.propagate = False
@@ -0,0 +1,112 @@
+import json
+import struct
+
+import numpy as np
+
+
+MOMO_EXTENSION = ".momo"
+MAGIC = b"MOMORES\0"
+VERSION = 1
+
+# Magic, format version and length of the JSON header.
+_PREAMBLE = struct.Struct("<8sIQ")
+_ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def is_momo_file(file_path: str) -> bool:
+    """Check if the file starts with the MoMo results signature"""
+    try:
+        with open(file_path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_momo_file(file_path: str, header: dict, arrays: dict[str, np.ndarray]) -> None:
+    """
+    Write a MoMo results container.
+
+    The file starts with a fixed preamble and a JSON header, followed by the raw
+    bytes of every array at an aligned offset. The header records the dtype, shape
+    and offset of every array, so the arrays can be memory-mapped without parsing.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path of the written file.
+
+    header : dict
+        JSON serializable metadata.
+
+    arrays : dict[str, np.ndarray]
+        Named arrays stored in the data blocks.
+    """
+    blocks = {}
+    layout = {}
+    offset = 0
+
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        blocks[name] = array
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps({**header, "arrays": layout}, default=str).encode("utf-8")
+    data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    with open(file_path, "wb") as file:
+        file.write(_PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        file.write(header_bytes)
+
+        for name, array in blocks.items():
+            file.seek(data_start + layout[name]["offset"])
+            file.write(array.tobytes(order="C"))
+
+        file.truncate(data_start + offset)
+
+
+def read_momo_file(file_path: str) -> tuple[dict, dict[str, np.ndarray]]:
+    """
+    Read a MoMo results container.
+
+    Returns:
+    --------
+    tuple[dict, dict[str, np.ndarray]]
+        The JSON header and the arrays, which are read-only memory maps of the file.
+
+    Raises:
+    -------
+    ValueError
+        If the file is not a MoMo results file or has an unsupported version.
+    """
+    with open(file_path, "rb") as file:
+        preamble = file.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError("The file is not a MoMo results file.")
+
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError("The file is not a MoMo results file.")
+        if version > VERSION:
+            raise ValueError(f"Unsupported MoMo results file version: {version}.")
+
+        header = json.loads(file.read(header_length).decode("utf-8"))
+
+    data_start = _aligned(_PREAMBLE.size + header_length)
+    arrays = {}
+
+    for name, block in header.pop("arrays").items():
+        dtype = np.dtype(block["dtype"])
+        shape = tuple(block["shape"])
+
+        if 0 in shape:
+            # Empty arrays cannot be memory-mapped.
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(file_path, dtype=dtype, mode="r", offset=data_start + block["offset"], shape=shape)
+
+    return header, arrays
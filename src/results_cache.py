@@ -0,0 +1,277 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from momo.prototype import Prototype
+from momo.system_models.system_models import MultiSystemModel, SystemModel
+
+from src.dtypes import ResultsMap, SimilarityMenshureType
+from src.momo_file import MOMO_EXTENSION
+
+
+logger = logging.getLogger(__name__)
+
+
+def _update_with_labels(digest, labels) -> None:
+    digest.update(json.dumps([str(label) for label in labels]).encode("utf-8"))
+
+
+def systems_fingerprint(systems: list[SystemModel]) -> str:
+    """Get the content fingerprint of the names, features, alternatives and data of the systems"""
+    digest = hashlib.sha256()
+
+    for system in systems:
+        data = system.data
+        _update_with_labels(digest, [system.name])
+        _update_with_labels(digest, data.index)
+        _update_with_labels(digest, data.columns)
+        digest.update(np.ascontiguousarray(data.to_numpy(dtype=np.int64)).tobytes())
+
+    return digest.hexdigest()
+
+
+def fingerprint(systems: list[SystemModel],
+                prototype: Prototype,
+                similarity_measure_type: SimilarityMenshureType | str,
+                top_k: int | None = None) -> str:
+    """
+    Get the content fingerprint of a calculation.
+
+    Two calculations with the same systems data, prototype vector, similarity measure
+    and number of kept combinations give the same results, whatever the engine.
+
+    Returns:
+    --------
+    str
+        Hex digest identifying the calculation.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([SimilarityMenshureType(similarity_measure_type).value, top_k]).encode("utf-8"))
+    digest.update(systems_fingerprint(systems).encode("utf-8"))
+
+    _update_with_labels(digest, prototype.index.to_flat_index())
+    digest.update(np.ascontiguousarray(prototype.to_numpy(dtype=np.int64)).tobytes())
+
+    return digest.hexdigest()
+
+
+class ResultsCache:
+    """
+    LRU cache of the calculated results, in memory and optionally on disk.
+
+    Results are keyed by the `fingerprint` of their calculation. The most recently
+    used ones are kept in memory. With a directory, every result is also saved as a
+    `.momo` file, so it outlives the session. The least recently used results are
+    evicted once the memory or the directory holds more than its size limit.
+
+    The cache never breaks a calculation: a failing disk only turns lookups into misses.
+    """
+
+    ENVIRONMENT_DIRECTORY = "MOMO_RESULTS_CACHE_DIR"
+    ENVIRONMENT_MAX_MB = "MOMO_RESULTS_CACHE_MAX_MB"
+
+    DEFAULT_MAX_MEMORY_BYTES = 256 * 1024 * 1024
+    DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+    def __init__(self,
+                 directory: str | None,
+                 max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        """
+        Initialize the cache.
+
+        Parameters:
+        -----------
+        directory : str, optional
+            Directory of the saved results, created on first use. Results are only
+            kept in memory without one.
+
+        max_memory_bytes : int
+            Maximum size of the results kept in memory.
+
+        max_disk_bytes : int
+            Maximum size of the saved results files.
+        """
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> "ResultsCache":
+        """
+        Create a cache saving the results to disk only if MOMO_RESULTS_CACHE_DIR is set.
+
+        The directory is limited to MOMO_RESULTS_CACHE_MAX_MB, 0 keeps the results in memory.
+        """
+        directory = os.environ.get(cls.ENVIRONMENT_DIRECTORY)
+
+        try:
+            max_disk_bytes = int(float(os.environ[cls.ENVIRONMENT_MAX_MB]) * 1024 * 1024)
+        except (KeyError, ValueError):
+            max_disk_bytes = cls.DEFAULT_MAX_DISK_BYTES
+
+        return cls(directory if max_disk_bytes > 0 else None, max_disk_bytes=max_disk_bytes)
+
+    @staticmethod
+    def _size(results_map: ResultsMap) -> int:
+        return results_map.combinations.nbytes + results_map.similarity.nbytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + MOMO_EXTENSION)
+
+    def get(self, key: str) -> ResultsMap | None:
+        """
+        Get the results of a calculation and mark them as recently used.
+
+        Parameters:
+        -----------
+        key : str
+            Fingerprint of the calculation.
+
+        Returns:
+        --------
+        ResultsMap | None
+            The results, or None if they are not cached.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        if self.directory is None:
+            return None
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            results_map = ResultsMap.from_momo(path)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Dropping the unreadable cached results %s: %s", path, e)
+            self._remove_file(path)
+            return None
+
+        self._remember(key, results_map)
+        return results_map
+
+    def put(self, key: str, results_map: ResultsMap) -> None:
+        """
+        Store the results of a calculation and evict the entries over the limits.
+
+        The results are saved to disk in the calling thread, which may take a while
+        for large results.
+        """
+        self._remember(key, results_map)
+
+        if self.directory is None or self._size(results_map) > self.max_disk_bytes:
+            return
+
+        path = self._path(key)
+        if os.path.exists(path):
+            # Already saved, it is only marked as recently used.
+            try:
+                os.utime(path)
+                return
+            except OSError:
+                pass
+
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            results_map.to_momo(temporary_path)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            logger.warning("The results cache is not writable: %s", e)
+            self._remove_file(temporary_path)
+            return
+
+        self._evict_files()
+
+    def _remember(self, key: str, results_map: ResultsMap) -> None:
+        """Keep the results in memory, evicting the least recently used ones over the limit"""
+        size = self._size(results_map)
+        if size > self.max_memory_bytes:
+            return
+
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._size(self._memory.pop(key))
+
+            self._memory[key] = results_map
+            self._memory_bytes += size
+
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= self._size(evicted)
+
+    def _evict_files(self) -> None:
+        """Remove the least recently used files over the disk limit"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.is_file() and entry.name.endswith(MOMO_EXTENSION)]
+            files = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries), reverse=True)
+        except OSError as e:
+            logger.warning("The results cache is not readable: %s", e)
+            return
+
+        total_size = 0
+        for _, size, path in files:
+            total_size += size
+            if total_size > self.max_disk_bytes:
+                self._remove_file(path)
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            # Missing, or still memory-mapped by a results tab on Windows.
+            pass
+
+    def clear(self) -> None:
+        """Remove every cached result"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+        if self.directory is None or not os.path.isdir(self.directory):
+            return
+
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(MOMO_EXTENSION):
+                self._remove_file(entry.path)
+
+
+# Prototypes of the last systems structures, the prototype only depends on the features of the systems.
+_prototypes = OrderedDict()
+_PROTOTYPES_SIZE = 16
+
+
+def get_prototype(systems: list[SystemModel]) -> Prototype:
+    """
+    Get the empty prototype of the systems, memoized on the names and features of the systems.
+
+    Returns a copy, which the caller may change.
+    """
+    key = tuple((system.name, tuple(system.data.index)) for system in systems)
+
+    if key in _prototypes:
+        _prototypes.move_to_end(key)
+    else:
+        _prototypes[key] = MultiSystemModel(list(systems)).get_prototype()
+        if len(_prototypes) > _PROTOTYPES_SIZE:
+            _prototypes.popitem(last=False)
+
+    prototype = _prototypes[key]
+    return Prototype(prototype.to_numpy().copy(), index=prototype.index)
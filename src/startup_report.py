@@ -0,0 +1,102 @@
+import builtins
+import os
+import sys
+import time
+from collections import defaultdict
+
+
+class StartupReport:
+    """
+    Startup time report: time to the named milestones and an import-time breakdown.
+
+    While enabled, every first import of a module goes through a timing wrapper
+    of `builtins.__import__`, which records its inclusive time (with the modules
+    it imports) and its self time. A disabled report installs nothing.
+    """
+
+    ENVIRONMENT_VARIABLE = "MOMO_STARTUP_REPORT"
+    COMMAND_LINE_FLAG = "--startup-report"
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._start = time.perf_counter()
+        self._milestones = []
+        self._inclusive = defaultdict(float)
+        self._self = defaultdict(float)
+        self._stack = []
+        self._original_import = None
+
+        if enabled:
+            self._install()
+
+    @classmethod
+    def from_environment(cls, argv: list[str] | None = None) -> "StartupReport":
+        """Create a report enabled by the command line flag or the environment variable"""
+        argv = sys.argv if argv is None else argv
+        enabled = cls.COMMAND_LINE_FLAG in argv or bool(os.environ.get(cls.ENVIRONMENT_VARIABLE))
+
+        if cls.COMMAND_LINE_FLAG in argv:
+            argv.remove(cls.COMMAND_LINE_FLAG)
+
+        return cls(enabled)
+
+    def _install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Relative and already loaded imports are counted in the importing module.
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+
+            self._inclusive[name] += elapsed
+            self._self[name] += elapsed - nested
+
+    def mark(self, milestone: str) -> None:
+        """Record the time elapsed since the start of the report"""
+        if self.enabled:
+            self._milestones.append((milestone, time.perf_counter() - self._start))
+
+    def packages(self) -> list[tuple[str, float]]:
+        """Get the import time of every top level package, slowest first"""
+        packages = defaultdict(float)
+        for name, elapsed in self._self.items():
+            packages[name.partition(".")[0]] += elapsed
+        return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+    def format(self, top: int = 15) -> str:
+        lines = ["Startup report", "--------------"]
+        lines += [f"{milestone:<40} {elapsed * 1000:9.1f} ms" for milestone, elapsed in self._milestones]
+
+        lines += ["", f"Import time by package (top {top})"]
+        lines += [f"{package:<40} {elapsed * 1000:9.1f} ms" for package, elapsed in self.packages()[:top]]
+
+        lines += ["", f"Slowest imports, with their own imports (top {top})"]
+        slowest = sorted(self._inclusive.items(), key=lambda item: item[1], reverse=True)[:top]
+        lines += [f"{name:<40} {elapsed * 1000:9.1f} ms" for name, elapsed in slowest]
+
+        return "\n".join(lines)
+
+    def report(self) -> None:
+        """Stop timing the imports and print the report"""
+        if not self.enabled:
+            return
+
+        self._uninstall()
+        print(self.format(), file=sys.stderr)
+        self.enabled = False
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable, Iterator
+
+
+@dataclass
+class Span:
+    """A finished traced operation"""
+    name: str
+    start: float
+    wall_time: float
+    cpu_time: float
+    memory_delta: int | None
+    thread_id: int
+    thread_name: str
+    args: dict = field(default_factory=dict)
+
+
+class Tracer:
+    """
+    Records spans of the hot paths: their wall time, CPU time of their thread and,
+    if asked for, the change of the memory allocated by Python while they run.
+
+    A disabled tracer records nothing, the traced functions only check one flag.
+    Memory tracing relies on `tracemalloc`, which slows down every allocation, so
+    it is only started with `trace_memory`.
+    """
+
+    ENVIRONMENT_VARIABLE = "MOMO_TRACE"
+    MAX_SPANS = 10000
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = False
+        self.trace_memory = False
+        self._started_tracemalloc = False
+        self._spans = deque(maxlen=self.MAX_SPANS)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+        if enabled:
+            self.enable()
+
+    @classmethod
+    def from_environment(cls) -> "Tracer":
+        """Create a tracer enabled by the environment variable, "memory" also traces the memory"""
+        value = os.environ.get(cls.ENVIRONMENT_VARIABLE, "").lower()
+        tracer = cls(enabled=bool(value))
+        if value == "memory":
+            tracer.set_trace_memory(True)
+        return tracer
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        self.set_trace_memory(False)
+
+    def set_trace_memory(self, trace_memory: bool) -> None:
+        """Start or stop tracing the memory allocations"""
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif not trace_memory and self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.trace_memory = trace_memory
+
+    def add_listener(self, listener: Callable[[Span], None]) -> None:
+        """Call the listener with every finished span, from the thread of the span"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Span], None]) -> None:
+        self._listeners.remove(listener)
+
+    def span(self, name: str, **args):
+        """Context manager recording a span, which does nothing if the tracer is disabled"""
+        if not self.enabled:
+            return nullcontext()
+        return self._record(name, args)
+
+    @contextmanager
+    def _record(self, name: str, args: dict) -> Iterator[None]:
+        trace_memory = self.trace_memory and tracemalloc.is_tracing()
+        memory_start = tracemalloc.get_traced_memory()[0] if trace_memory else None
+        cpu_start = time.thread_time()
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start
+            cpu_time = time.thread_time() - cpu_start
+            memory_delta = tracemalloc.get_traced_memory()[0] - memory_start if trace_memory and tracemalloc.is_tracing() else None
+
+            thread = threading.current_thread()
+            span = Span(name, start - self._origin, wall_time, cpu_time, memory_delta, thread.ident, thread.name, args)
+
+            with self._lock:
+                self._spans.append(span)
+
+            for listener in list(self._listeners):
+                listener(span)
+
+    def traced(self, name: str | None = None) -> Callable:
+        """Decorator recording a span of every call of the function"""
+        def decorator(function: Callable) -> Callable:
+            span_name = name or function.__qualname__
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self._record(span_name, {}):
+                    return function(*args, **kwargs)
+
+            return wrapper
+        return decorator
+
+    @property
+    def spans(self) -> list[Span]:
+        """Get the recorded spans, oldest first"""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def to_chrome_trace(self) -> dict:
+        """Get the spans as Chrome trace events, for chrome://tracing or Perfetto"""
+        pid = os.getpid()
+        events = []
+        threads = {}
+
+        for span in self.spans:
+            threads[span.thread_id] = span.thread_name
+            args = {"cpu_ms": round(span.cpu_time * 1000, 3), **{key: str(value) for key, value in span.args.items()}}
+            if span.memory_delta is not None:
+                args["memory_delta_kb"] = round(span.memory_delta / 1024, 1)
+
+            events.append({
+                "name": span.name,
+                "cat": span.name.partition(".")[0],
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.wall_time * 1e6,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": args,
+            })
+
+        events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+                   for thread_id, thread_name in threads.items()]
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, file_path: str) -> None:
+        """Save the spans as a Chrome trace-event JSON file"""
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+# Tracer of the application, enabled by the MOMO_TRACE environment variable or the performance panel
+TRACER = Tracer.from_environment()
+traced = TRACER.traced
@@ -0,0 +1,58 @@
+import numpy as np
+
+from momo.model import MoMoModel
+from momo.prototype import Prototype
+from momo.system_models.system_models import MultiSystemModel, SystemModel
+
+from src.dtypes import ResultsMap
+from src.engines import create_engine
+
+
+MEASURES = ["sorensen_dice", "jaccard"]
+
+
+def make_systems(alternatives: tuple = (4, 3, 5), features: int = 5, seed: int = 0) -> list[SystemModel]:
+    """Random systems with the given number of alternatives, the first two share some feature names"""
+    rng = np.random.default_rng(seed)
+    systems = []
+
+    for i, count in enumerate(alternatives):
+        names = [f"Feature {i + 1}.{j + 1}" for j in range(features)]
+        if i == 1:
+            names[:2] = [f"Feature 1.{j + 1}" for j in range(2)]
+        systems.append(SystemModel(f"System {i + 1}",
+                                   rng.integers(0, 2, (features, count)).tolist(),
+                                   names,
+                                   [f"Alternative {i + 1}.{k + 1}" for k in range(count)]))
+
+    return systems
+
+
+def make_prototype(systems: list[SystemModel], seed: int = 0) -> Prototype:
+    prototype = MoMoModel(systems).get_prototype()
+    prototype[:] = np.random.default_rng(seed + 1).integers(0, 2, len(prototype))
+    return prototype
+
+
+def reference_scores(systems: list[SystemModel], prototype: Prototype, measure: str, top_k: int | None = None):
+    """Scores of the momo reference engine"""
+    return create_engine("momo").score(systems, prototype, measure, top_k)
+
+
+def make_results_map(systems: list[SystemModel], prototype: Prototype, measure: str = "jaccard", top_k: int | None = None) -> ResultsMap:
+    combinations, similarity, evaluated_combinations = create_engine("numpy").score(systems, prototype, measure, top_k)
+    return ResultsMap(systems=MultiSystemModel(systems),
+                      combinations=combinations,
+                      similarity=similarity,
+                      prototype=prototype,
+                      similarity_measure_type=measure,
+                      evaluated_combinations=evaluated_combinations)
+
+
+def assert_same_scores(scores, expected):
+    combinations, similarity, evaluated_combinations = scores
+    expected_combinations, expected_similarity, expected_evaluated_combinations = expected
+
+    np.testing.assert_array_equal(combinations, expected_combinations)
+    np.testing.assert_allclose(similarity, expected_similarity, rtol=0, atol=1e-12)
+    assert evaluated_combinations == expected_evaluated_combinations
@@ -0,0 +1,79 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.engines import BranchAndBoundEngine, CalculationCancelled, NumpyEngine, create_engine
+from tests.helpers import MEASURES, assert_same_scores, make_prototype, make_systems, reference_scores
+
+
+@pytest.mark.parametrize("measure", MEASURES)
+@pytest.mark.parametrize("engine_type", ["numpy", "branch_and_bound"])
+def test_scores_match_momo(engine_type, measure):
+    systems = make_systems()
+    prototype = make_prototype(systems)
+
+    scores = create_engine(engine_type).score(systems, prototype, measure)
+
+    assert_same_scores(scores, reference_scores(systems, prototype, measure))
+
+
+@pytest.mark.parametrize("measure", MEASURES)
+@pytest.mark.parametrize("engine_type", ["numpy", "branch_and_bound"])
+def test_top_k_matches_momo(engine_type, measure):
+    systems = make_systems((5, 4, 6), seed=1)
+    prototype = make_prototype(systems, seed=1)
+
+    combinations, similarity, _ = create_engine(engine_type).score(systems, prototype, measure, top_k=7)
+    expected_combinations, expected_similarity, _ = reference_scores(systems, prototype, measure, top_k=7)
+
+    np.testing.assert_array_equal(combinations, expected_combinations)
+    np.testing.assert_allclose(similarity, expected_similarity, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("measure", MEASURES)
+def test_empty_prototype_matches_momo(measure):
+    systems = make_systems()
+    prototype = make_prototype(systems)
+    prototype[:] = 0
+
+    combinations, similarity, _ = NumpyEngine().score(systems, prototype, measure)
+    expected_combinations, expected_similarity, _ = reference_scores(systems, prototype, measure)
+
+    np.testing.assert_array_equal(combinations, expected_combinations)
+    np.testing.assert_allclose(similarity, expected_similarity, rtol=0, atol=1e-12)
+
+
+def test_small_blocks_give_the_same_scores():
+    systems = make_systems((6, 5, 4))
+    prototype = make_prototype(systems)
+
+    assert_same_scores(NumpyEngine(block_size=7).score(systems, prototype, "jaccard"),
+                       NumpyEngine().score(systems, prototype, "jaccard"))
+
+
+def test_branch_and_bound_prunes_combinations():
+    systems = make_systems((8, 8, 8), features=6, seed=2)
+    prototype = make_prototype(systems, seed=2)
+
+    # Leaves of one system, so the first two levels of the tree can be pruned.
+    engine = BranchAndBoundEngine(leaf_size=8)
+    combinations, similarity, evaluated_combinations = engine.score(systems, prototype, "sorensen_dice", top_k=3)
+    expected_combinations, expected_similarity, _ = NumpyEngine().score(systems, prototype, "sorensen_dice", top_k=3)
+
+    # The evaluated combinations of the results are the whole space, the search only scores part of it.
+    assert evaluated_combinations == 8 ** 3
+    assert engine.stats.pruned_nodes > 0
+    assert engine.stats.scored_combinations < 8 ** 3
+    np.testing.assert_array_equal(combinations, expected_combinations)
+    np.testing.assert_allclose(similarity, expected_similarity, rtol=0, atol=1e-12)
+
+
+def test_cancelled_engine_stops():
+    systems = make_systems()
+    prototype = make_prototype(systems)
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(CalculationCancelled):
+        NumpyEngine(cancel_event=cancel_event).score(systems, prototype, "jaccard")
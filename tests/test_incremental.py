@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from momo.prototype import Prototype
+from momo.system_models.system_models import SystemModel
+
+from src.engines import CalculationCancelled, IncrementalScorer, NumpyEngine
+from tests.helpers import MEASURES, assert_same_scores, make_prototype, make_systems, reference_scores
+
+
+def flip(prototype: Prototype, *positions: int) -> Prototype:
+    values = prototype.to_numpy().copy()
+    values[list(positions)] = 1 - values[list(positions)]
+    return Prototype(values, index=prototype.index)
+
+
+def edit_system(systems: list[SystemModel], index: int, data: pd.DataFrame) -> list[SystemModel]:
+    systems = list(systems)
+    systems[index] = SystemModel(systems[index].name, data)
+    return systems
+
+
+def scored(systems, prototype, measure) -> IncrementalScorer:
+    scorer = IncrementalScorer()
+    combinations, similarity, _ = NumpyEngine().score(systems, prototype, measure)
+    scorer.reset(systems, prototype, measure, combinations, similarity)
+    return scorer
+
+
+@pytest.mark.parametrize("measure", MEASURES)
+def test_prototype_change_matches_momo(measure):
+    systems = make_systems()
+    prototype = make_prototype(systems)
+    scorer = scored(systems, prototype, measure)
+
+    for positions in [(0,), (3, 7), (1, 5, 9)]:
+        prototype = flip(prototype, *positions)
+        assert scorer.can_reuse(systems, prototype, measure)
+        assert_same_scores(scorer.score(systems, prototype, measure), reference_scores(systems, prototype, measure))
+
+
+@pytest.mark.parametrize("measure", MEASURES)
+def test_system_edits_match_momo(measure):
+    systems = make_systems((6, 5, 7), features=6)
+    prototype = make_prototype(systems)
+    scorer = scored(systems, prototype, measure)
+
+    data = systems[1].data.copy()
+    data.iloc[2, 3] = 1 - data.iloc[2, 3]
+    changed = edit_system(systems, 1, data)
+    added = edit_system(changed, 2, changed[2].data.assign(**{"Alternative 3.8": 1}))
+    removed = edit_system(added, 0, added[0].data.drop(columns="Alternative 1.2"))
+    renamed = edit_system(removed, 2, removed[2].data.rename(columns={"Alternative 3.1": "Renamed"}))
+
+    for edited in [changed, added, removed, renamed]:
+        assert scorer.can_reuse(edited, prototype, measure)
+        assert_same_scores(scorer.score(edited, prototype, measure), reference_scores(edited, prototype, measure))
+
+
+def test_large_edit_scores_everything_again():
+    systems = make_systems((6, 5, 7))
+    prototype = make_prototype(systems)
+    scorer = scored(systems, prototype, "jaccard")
+
+    data = systems[0].data.copy()
+    data.iloc[:, :4] = 1 - data.iloc[:, :4]
+    edited = edit_system(systems, 0, data)
+
+    assert_same_scores(scorer.score(edited, prototype, "jaccard"), reference_scores(edited, prototype, "jaccard"))
+
+
+def test_only_reuses_one_kind_of_change():
+    systems = make_systems()
+    prototype = make_prototype(systems)
+    scorer = scored(systems, prototype, "jaccard")
+
+    data = systems[0].data.copy()
+    data.iloc[0, 0] = 1 - data.iloc[0, 0]
+    edited = edit_system(systems, 0, data)
+
+    assert not scorer.can_reuse(systems, prototype, "jaccard")
+    assert not scorer.can_reuse(edited, flip(prototype, 0), "jaccard")
+    assert not scorer.can_reuse(systems, flip(prototype, 0), "sorensen_dice")
+    assert not scorer.can_reuse(systems, flip(prototype, 0), "jaccard", top_k=5)
+    assert not scorer.can_reuse(make_systems(features=4), prototype, "jaccard")
+    assert not IncrementalScorer().can_reuse(systems, prototype, "jaccard")
+
+
+@pytest.mark.parametrize("measure", MEASURES)
+def test_top_k_and_measure_changes_match_momo(measure):
+    systems = make_systems((5, 4, 6), seed=1)
+    prototype = make_prototype(systems, seed=1)
+    scorer = scored(systems, prototype, "jaccard")
+
+    prototype = flip(prototype, 2)
+    combinations, similarity, _ = scorer.score(systems, prototype, measure, top_k=7)
+    expected_combinations, expected_similarity, _ = reference_scores(systems, prototype, measure, top_k=7)
+    np.testing.assert_array_equal(combinations, expected_combinations)
+    np.testing.assert_allclose(similarity, expected_similarity, rtol=0, atol=1e-12)
+
+    prototype = flip(prototype, 4)
+    assert_same_scores(scorer.score(systems, prototype, measure), reference_scores(systems, prototype, measure))
+
+
+def test_cancelled_score_drops_the_kept_sums():
+    systems = make_systems()
+    prototype = make_prototype(systems)
+    scorer = scored(systems, prototype, "jaccard")
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    flipped = flip(prototype, 0)
+    with pytest.raises(CalculationCancelled):
+        scorer.score(systems, flipped, "jaccard", cancel_event=cancel_event)
+
+    assert not scorer.can_reuse(systems, prototype, "jaccard")
+    assert_same_scores(scorer.score(systems, flipped, "jaccard"), reference_scores(systems, flipped, "jaccard"))
+
+
+def test_previous_scores_are_not_changed():
+    systems = make_systems()
+    prototype = make_prototype(systems)
+    scorer = IncrementalScorer()
+    _, similarity, _ = scorer.score(systems, prototype, "jaccard")
+    previous = similarity.copy()
+
+    data = systems[2].data.copy()
+    data.iloc[1, 1] = 1 - data.iloc[1, 1]
+    scorer.score(edit_system(systems, 2, data), prototype, "jaccard")
+
+    np.testing.assert_array_equal(similarity, previous)
@@ -0,0 +1,62 @@
+import multiprocessing
+
+import pytest
+
+from src.engines import CalculationCancelled, ParallelCalculation
+from tests.helpers import MEASURES, assert_same_scores, make_prototype, make_systems, reference_scores
+
+
+@pytest.mark.parametrize("measure", MEASURES)
+@pytest.mark.parametrize("engine_type", ["numpy", "branch_and_bound"])
+def test_merged_shards_match_momo(engine_type, measure):
+    systems = make_systems()
+    prototype = make_prototype(systems)
+
+    scores = ParallelCalculation(engine_type, systems, prototype, measure, workers=2).run()
+
+    assert_same_scores(scores, reference_scores(systems, prototype, measure))
+
+
+@pytest.mark.parametrize("measure", MEASURES)
+def test_merged_top_k_matches_momo(measure):
+    systems = make_systems((5, 4, 6), seed=1)
+    prototype = make_prototype(systems, seed=1)
+
+    combinations, similarity, _ = ParallelCalculation("branch_and_bound", systems, prototype, measure,
+                                                      top_k=7, workers=2).run()
+    expected_combinations, expected_similarity, _ = reference_scores(systems, prototype, measure, top_k=7)
+
+    assert combinations.tolist() == expected_combinations.tolist()
+    assert similarity.tolist() == pytest.approx(expected_similarity.tolist())
+
+
+def test_one_shard_per_alternative_of_the_first_system():
+    systems = make_systems((4, 3, 5))
+
+    calculation = ParallelCalculation("numpy", systems, make_prototype(systems), "jaccard", workers=2)
+
+    assert calculation.shards_count == 4
+
+
+def test_cancelled_calculation_joins_its_pool():
+    systems = make_systems()
+    calculation = ParallelCalculation("numpy", systems, make_prototype(systems), "jaccard", workers=2)
+
+    calculation.start()
+    calculation.cancel()
+
+    with pytest.raises(CalculationCancelled):
+        calculation.merge()
+    assert not multiprocessing.active_children()
+
+
+def test_cancel_without_waiting_joins_the_pool_on_close():
+    systems = make_systems()
+    calculation = ParallelCalculation("numpy", systems, make_prototype(systems), "jaccard", workers=2)
+
+    calculation.start()
+    calculation.cancel(wait=False)
+    calculation.close()
+
+    assert calculation.is_cancelled
+    assert not multiprocessing.active_children()
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from src.assistant import AssistantRequestScheduler
+
+
+class FakeAgent:
+    """Answers with the question, streamed word by word, and stops when cancelled"""
+
+    def __init__(self, cached: dict | None = None, block: bool = False):
+        self.cached = cached or {}
+        self.block = block
+        self.asked = []
+        self.results = None
+
+    def set_results(self, **results):
+        self.results = results
+
+    def get_cached_response(self, user_input):
+        return self.cached.get(user_input)
+
+    def ask(self, user_input, on_token=None, cancel_event=None):
+        self.asked.append(user_input)
+        if self.block:
+            cancel_event.wait(5)
+        if cancel_event.is_set():
+            return None
+
+        for word in user_input.split():
+            on_token(word)
+        return user_input.upper()
+
+
+class FakeProvider:
+    def __init__(self, agent=None, error=None):
+        self.agent = agent
+        self.error = error
+        self.resets = 0
+
+    def get(self, timeout=None):
+        if self.error is not None:
+            raise self.error
+        return self.agent
+
+    def reset(self):
+        self.resets += 1
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_requests_are_answered_in_order():
+    agent = FakeAgent(cached={"cached question": "cached answer"})
+    scheduler = AssistantRequestScheduler(FakeProvider(agent))
+    tokens = []
+
+    async def ask():
+        first = scheduler.submit("first question", build_context=lambda: {"data": 1}, on_token=tokens.append)
+        second = scheduler.submit("cached question")
+        return await first.future, await second.future
+
+    assert run(ask()) == (("FIRST QUESTION", False), ("cached answer", True))
+    assert tokens[:2] == ["first", "question"]
+    assert agent.asked[0] == "first question"
+    assert agent.results == {"data": 1}
+
+
+def test_same_pending_question_is_not_queued_twice():
+    scheduler = AssistantRequestScheduler(FakeProvider(FakeAgent()))
+
+    async def ask():
+        first = scheduler.submit("What is  the best?", context_key="results")
+        second = scheduler.submit("what is the best?", context_key="results")
+        other = scheduler.submit("what is the best?", context_key="other results")
+        await asyncio.gather(first.future, other.future)
+        return first, second, other
+
+    first, second, other = run(ask())
+
+    assert first is second
+    assert other is not first
+
+
+def test_cancelled_queued_request_is_not_answered():
+    agent = FakeAgent()
+    scheduler = AssistantRequestScheduler(FakeProvider(agent))
+
+    async def ask():
+        first = scheduler.submit("first")
+        second = scheduler.submit("second")
+        second.cancel()
+        await first.future
+        await asyncio.sleep(0.05)
+        return second
+
+    second = run(ask())
+
+    assert second.future.cancelled()
+    assert agent.asked == ["first"]
+    assert not scheduler.pending
+
+
+def test_slow_answer_times_out_and_stops_the_agent():
+    agent = FakeAgent(block=True)
+    scheduler = AssistantRequestScheduler(FakeProvider(agent), timeout=0.1)
+
+    async def ask():
+        request = scheduler.submit("slow question")
+        with pytest.raises(asyncio.TimeoutError):
+            await request.future
+        return request
+
+    request = run(ask())
+
+    assert request.cancel_event.is_set()
+
+
+def test_unavailable_agent_fails_the_request():
+    provider = FakeProvider(error=ValueError("no API key"))
+    scheduler = AssistantRequestScheduler(provider)
+
+    async def ask():
+        with pytest.raises(RuntimeError, match="no API key"):
+            await scheduler.submit("question").future
+
+    run(ask())
+
+    assert provider.resets == 1
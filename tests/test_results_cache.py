@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.results_cache import ResultsCache, fingerprint, get_prototype
+from tests.helpers import make_prototype, make_results_map, make_systems
+
+
+@pytest.fixture
+def systems():
+    return make_systems()
+
+
+@pytest.fixture
+def prototype(systems):
+    return make_prototype(systems)
+
+
+def test_fingerprint_depends_on_every_input(systems, prototype):
+    key = fingerprint(systems, prototype, "jaccard")
+
+    flipped = prototype.copy()
+    flipped.iloc[0] = 1 - flipped.iloc[0]
+
+    assert fingerprint(make_systems(), make_prototype(systems), "jaccard") == key
+    assert fingerprint(systems, flipped, "jaccard") != key
+    assert fingerprint(systems, prototype, "sorensen_dice") != key
+    assert fingerprint(systems, prototype, "jaccard", top_k=5) != key
+    assert fingerprint(make_systems(seed=1), prototype, "jaccard") != key
+
+
+def test_memory_cache_evicts_least_recently_used(systems, prototype):
+    results_map = make_results_map(systems, prototype)
+    size = results_map.combinations.nbytes + results_map.similarity.nbytes
+    cache = ResultsCache(None, max_memory_bytes=2 * size)
+
+    cache.put("a", results_map)
+    cache.put("b", results_map)
+    assert cache.get("a") is results_map
+    cache.put("c", results_map)
+
+    assert cache.get("a") is results_map
+    assert cache.get("b") is None
+    assert cache.get("c") is results_map
+
+
+def test_disk_cache_outlives_the_session(systems, prototype, tmp_path):
+    results_map = make_results_map(systems, prototype)
+    ResultsCache(str(tmp_path)).put("key", results_map)
+
+    loaded = ResultsCache(str(tmp_path)).get("key")
+
+    np.testing.assert_array_equal(loaded.similarity, results_map.similarity)
+    np.testing.assert_array_equal(loaded.combinations, results_map.combinations)
+
+
+def test_unreadable_file_is_a_miss(tmp_path):
+    (tmp_path / "key.momo").write_bytes(b"not a results file")
+
+    assert ResultsCache(str(tmp_path)).get("key") is None
+    assert not (tmp_path / "key.momo").exists()
+
+
+def test_disk_cache_is_opt_in(monkeypatch, tmp_path):
+    monkeypatch.delenv(ResultsCache.ENVIRONMENT_DIRECTORY, raising=False)
+    assert ResultsCache.from_environment().directory is None
+
+    monkeypatch.setenv(ResultsCache.ENVIRONMENT_DIRECTORY, str(tmp_path))
+    assert ResultsCache.from_environment().directory == str(tmp_path)
+
+    monkeypatch.setenv(ResultsCache.ENVIRONMENT_MAX_MB, "0")
+    assert ResultsCache.from_environment().directory is None
+
+
+def test_clear_removes_every_result(systems, prototype, tmp_path):
+    cache = ResultsCache(str(tmp_path))
+    cache.put("key", make_results_map(systems, prototype))
+
+    cache.clear()
+
+    assert cache.get("key") is None
+    assert not os.listdir(tmp_path)
+
+
+def test_memoized_prototype_is_a_copy(systems):
+    prototype = get_prototype(systems)
+    prototype[:] = 1
+
+    assert not get_prototype(systems).any()
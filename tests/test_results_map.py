@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dtypes import ResultsMap, SimilarityMenshureType
+from tests.helpers import make_prototype, make_results_map, make_systems
+
+
+@pytest.fixture
+def results_map() -> ResultsMap:
+    systems = make_systems()
+    return make_results_map(systems, make_prototype(systems))
+
+
+def assert_same_results(loaded: ResultsMap, results_map: ResultsMap):
+    pd.testing.assert_frame_equal(loaded.results.reset_index(drop=True), results_map.results.reset_index(drop=True),
+                                  check_categorical=False)
+    assert loaded.similarity_measure_type == results_map.similarity_measure_type
+    assert loaded.prototype.equals(results_map.prototype)
+
+
+def test_similarity_keeps_double_precision(results_map):
+    assert results_map.similarity.dtype == np.float64
+
+
+def test_momo_file_round_trip(results_map, tmp_path):
+    path = str(tmp_path / "results.momo")
+    results_map.to_momo(path)
+
+    loaded = ResultsMap.from_file(path)
+
+    np.testing.assert_array_equal(loaded.combinations, results_map.combinations)
+    np.testing.assert_array_equal(loaded.similarity, results_map.similarity)
+    assert loaded.evaluated_combinations == results_map.evaluated_combinations
+    assert_same_results(loaded, results_map)
+
+
+def test_excel_round_trip(results_map, tmp_path):
+    path = str(tmp_path / "results.xlsx")
+    results_map.to_excel(path)
+
+    assert_same_results(ResultsMap.from_file(path), results_map)
+
+
+def test_top_k_round_trip(tmp_path):
+    systems = make_systems()
+    results_map = make_results_map(systems, make_prototype(systems), "sorensen_dice", top_k=5)
+    path = str(tmp_path / "results.momo")
+    results_map.to_momo(path)
+
+    loaded = ResultsMap.from_momo(path)
+
+    assert loaded.is_truncated
+    assert loaded.similarity_measure_type == SimilarityMenshureType.Sorensen_Dice
+    assert_same_results(loaded, results_map)
+
+
+def test_csv_export(results_map, tmp_path):
+    path = tmp_path / "results.csv"
+    results_map.to_csv(str(path), chunk_size=7)
+
+    exported = pd.read_csv(path, float_precision="round_trip")
+
+    assert list(exported.columns) == list(results_map.results.columns)
+    np.testing.assert_array_equal(exported["Similarity"].to_numpy(), results_map.results["Similarity"].to_numpy())
+
+
+def test_parquet_export(results_map, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "results.parquet"
+    results_map.to_parquet(str(path), chunk_size=7)
+
+    exported = pd.read_parquet(path)
+
+    assert len(exported) == len(results_map.similarity)
+    np.testing.assert_array_equal(exported["Similarity"].to_numpy(), results_map.results["Similarity"].to_numpy())
+
+
+def test_empty_results_round_trip(tmp_path):
+    path = str(tmp_path / "empty.momo")
+    ResultsMap().to_momo(path)
+
+    assert len(ResultsMap.from_momo(path).similarity) == 0